@@ -3,16 +3,29 @@ Python file which conatins functions to perform baseline runs given the indexer
 """
 from parse_queries import parse_query_text_file
 import collections
+import heapq
+import itertools
 import math
 import os
 import errno
 
 
-def get_relevance_information(rel_info_fname):
+# Number of documents kept per query by the scorers
+# write_top_100_scores_to_txt only writes the top 100
+# Every scorer takes a top_k argument with this default, None keeps the full
+# ranking of all the scored documents( see sort_dict_according_to_scores and
+# bm25_engine.rank_documents). The scorers also take query_ids, the ids of the
+# only queries to score( see parallel_queries.py)
+DEFAULT_TOP_K = 100
+
+
+def get_relevance_information(rel_info_fname, doc_table=None):
     """
     Function that reads the cac.rel file and gets the relevance information that
     will be used for the BM25 model
     :param rel_info_fname: The path to the file containing the relevance information
+    :param doc_table: a DocTable. If given, the relevant docs are returned as
+    integer doc ids instead of doc names
     : Will return a dictionary of the form
     {query_numb : [ <list of all docs relevant to query 1] }
     """
@@ -35,11 +48,18 @@ def get_relevance_information(rel_info_fname):
 
             # print("Split items = ", items)
             # So items will be ["1", "Q0", "CACM-1410", "1"]
+            # Note: The doc table matches doc names with or without the zero
+            # padding, so there is no need to rewrite the doc name
+            if doc_table is not None:
+                doc = doc_table.doc_id(items[2])
+            else:
+                doc = append_proper_zeros(items[2])
+
             # Store this in a dictionary
             if int(items[0]) in rel_docs_dict:
-                rel_docs_dict[int(items[0])].append(append_proper_zeros(items[2]))
+                rel_docs_dict[int(items[0])].append(doc)
             else:
-                rel_docs_dict[int(items[0])] = [append_proper_zeros(items[2])]
+                rel_docs_dict[int(items[0])] = [doc]
 
     rel_fd.close()
 
@@ -65,13 +85,12 @@ def append_proper_zeros(given_str):
     return "-".join(temp_list)
 
 
-def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevant_docs_fname, rel_info_enabled=False, normal_query_file=False):
+def new_bm25_scores(collection_stats, indexed_data, query_text_file_name, relevant_docs_fname, rel_info_enabled=False, normal_query_file=False, doc_table=None, top_k=DEFAULT_TOP_K, query_ids=None):
     """
     Function that performs BM25 ranking
-    :param collection_data: A dictionary containing the parsed output of teh entire
-    collection. This dictionary is of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
+    :param collection_stats: The CollectionStats of the collection( doc
+    lengths, average doc length, total number of words..) precomputed at
+    indexing time
     :param indexed_data: The inverted index
     {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
     term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
@@ -83,6 +102,9 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
     :param normal_query_file: If the query file input to this method contains
     <DOC></DOC> strings then this argument is False else if its a normal text
     file as in queries written line by line then this is TRUE
+    :param doc_table: a DocTable. Must be given when the collection and the
+    index are keyed on integer doc ids, so that the relevance information
+    is keyed on the same integer doc ids
     :return: Will return a dictionary with values as lists made up of tuples that are sorted
     {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
     """
@@ -105,7 +127,7 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
     # file. We need to get the relevance information
     # rel_docs_dict i sof the form:
     # {query_numb: [ < list of all docs relevant to query 1]}
-    rel_docs_dict = get_relevance_information(relevant_docs_fname)
+    rel_docs_dict = get_relevance_information(relevant_docs_fname, doc_table)
     # print("The rel docsc dict is ", rel_docs_dict)
 
     # query_dict is of the form
@@ -115,15 +137,17 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
     else:
         query_dict = parse_normal_query_text_file(query_text_file_name)
 
+    query_dict = select_queries(query_dict, query_ids)
+
     # N -> Total number of collections in the data
-    N = len(collection_data)
+    N = collection_stats.num_docs
 
     # The constants
     k1 = 1.2
     b = 0.75
     k2 = 100
 
-    avg_doc_length = get_avg_doc_length(collection_data)
+    avg_doc_length = collection_stats.avg_doc_length
 
     for q in query_dict:
         # R ->  Total number of relevant documents for this query
@@ -145,8 +169,10 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
             if term in indexed_data:
 
                 # n_i -> The number of documents containing this query term
-                # for each document containing this query term
-                n_i = len(indexed_data[term])
+                # Note: Taken from the collection statistics( same as the
+                # length of the postings), a shard of the index only holds
+                # part of the postings( see sharded_index.py)
+                n_i = collection_stats.document_frequency(term)
 
                 # q_i -> frequency of this term in the entire query
                 q_fi = query_dict[q].split().count(term)
@@ -161,8 +187,7 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
                     # NOTE: In this way we are avoiding any
                     # document having f_i as 0
                     f_i = indexed_data[term][doc]
-                    K = k1 * ((1 - b) + b * len(
-                        collection_data[doc].split()) / avg_doc_length)
+                    K = k1 * ((1 - b) + b * collection_stats.doc_length(doc) / avg_doc_length)
                     z = ((k1 + 1) * f_i / (K + f_i)) * ((k2 + 1) * q_fi) / (
                                 k2 + q_fi)
                     numerator = ((r_i + 0.5) / (R - r_i + 0.5)) * z
@@ -175,7 +200,7 @@ def new_bm25_scores(collection_data, indexed_data, query_text_file_name, relevan
                     else:
                         new_bm25_scores_dict[q][doc] = temp_score
 
-    sort_dict_according_to_scores(new_bm25_scores_dict)
+    sort_dict_according_to_scores(new_bm25_scores_dict, top_k)
     return new_bm25_scores_dict
 
 
@@ -198,16 +223,24 @@ def calculate_r_i(rel_docs_list, indexed_data, term):
     return r_i
 
 
-def sort_dict_according_to_scores(given_dict):
+def sort_dict_according_to_scores(given_dict, top_k=None):
     """
     Helper function to sort the dictionary based on the scores
     :param given_dict: the bm25_scores dictionary which is of the form
     {query_1 : {doc_id_1 : score_1, doc_id_2: score_2..}, query_2 : {....}}
+    :param top_k: If given, only the top_k documents of every query are
+    selected( with a bounded heap instead of sorting every scored document)
+    By default all the documents are sorted
     :return: The sorted dictionary
     """
 
     for k, v in given_dict.items():
-        given_dict[k] = sorted(v.items(), key=lambda x: x[1],reverse=True)
+        if top_k is None:
+            given_dict[k] = sorted(v.items(), key=lambda x: x[1],reverse=True)
+        else:
+            # Note: nlargest keeps the same order as sorting and slicing,
+            # documents with equal scores stay in their original order
+            given_dict[k] = heapq.nlargest(top_k, v.items(), key=lambda x: x[1])
 
 
 def get_avg_doc_length(col_data):
@@ -225,7 +258,7 @@ def get_avg_doc_length(col_data):
     return total_length / len(col_data)
 
 
-def write_top_100_scores_to_txt(score_dict, fname, method_name):
+def write_top_100_scores_to_txt(score_dict, fname, method_name, doc_table=None):
     """
     Function that will write the top 100 scores of the baseline run to a .txt file
     :param score_dict: is a dictionary of the form
@@ -233,6 +266,8 @@ def write_top_100_scores_to_txt(score_dict, fname, method_name):
     Note: This dictionary is sorted
     :param: fname -> The txt file which will have all the information regarding
     the
+    :param doc_table: a DocTable. If given, the docs in score_dict are integer
+    doc ids and are translated back to doc names here
     :return: Write this data into a text file ( only the top 100) in the format
     Query_ID Q0 doc_id rank score baseline_method
     """
@@ -257,16 +292,22 @@ def write_top_100_scores_to_txt(score_dict, fname, method_name):
             fd.write("--------------\n")
             continue
         for idx, item in enumerate(inner_dict[:100]):
-            to_write = str(q) + " " + "Q0" + " " + item[0] + " " + str(idx + 1) + " " + str(item[1]) + " " + method_name + "\n"
+            doc = item[0] if doc_table is None else doc_table.doc_name(item[0])
+            to_write = str(q) + " " + "Q0" + " " + doc + " " + str(idx + 1) + " " + str(item[1]) + " " + method_name + "\n"
             fd.write(to_write)
 
         fd.write("-----------------------\n")
     fd.close()
 
 
-def tf_idf(collection_data_arg, indexed_data_arg, query_text_file_name, normal_query_file=False):
+def tf_idf(collection_stats, indexed_data_arg, query_text_file_name, normal_query_file=False, top_k=DEFAULT_TOP_K, query_ids=None):
     """
     Function that calculates the tf_idf_scores for each document
+    Only the postings of the query terms are walked, every document that
+    contains none of the query terms gets a score of 0
+    :param collection_stats: The CollectionStats of the collection( doc
+    lengths, average doc length, total number of words..) precomputed at
+    indexing time
     :param normal_query_file: Indicates whether the query file is text file
     with no <DOC></DOC> tags( if True)
     :return: a sorted list of documents in the form as below:
@@ -275,9 +316,9 @@ def tf_idf(collection_data_arg, indexed_data_arg, query_text_file_name, normal_q
 
     tf_idf_scores = {}
 
-    # Populate the dictionary with empty inner dictionaries
+    # Populate the dictionary with empty inner lists
     for i in range(1, 65):
-        tf_idf_scores[i] = {}
+        tf_idf_scores[i] = []
 
     # query_dict is of the form
     # {q_id: < Parsed Query >, q_id_2: < Parsed Query 2 >}
@@ -286,32 +327,40 @@ def tf_idf(collection_data_arg, indexed_data_arg, query_text_file_name, normal_q
     else:
         query_dict = parse_normal_query_text_file(query_text_file_name)
 
-    # N -> Total number of collections in the data
-    N = len(collection_data_arg)
-
-    for q in query_dict:
-        # Iterate through the entire collection
-        for doc in collection_data_arg:
-            score = 0
-            # Iterate through all terms in the query
-            for term in query_dict[q].split():
-                # Initialize the term frequency and n_k
-                # with respect to each term
-                # in the query
-                t_f, n_k = 0, 0
+    query_dict = select_queries(query_dict, query_ids)
 
-                if term in indexed_data_arg:
-                    if doc in indexed_data_arg[term]:
-                        t_f = indexed_data_arg[term][doc]
+    # N -> Total number of collections in the data
+    N = collection_stats.num_docs
 
-                    n_k = len(indexed_data_arg[term])
+    # idf of the query terms, computed once per term
+    idf_cache = {}
 
-                if t_f > 0 and n_k > 0:
-                    score += t_f * math.log(N / n_k)
+    for q in query_dict:
+        # Only walk the postings of the query terms, the documents that
+        # contain none of them keep a score of 0
+        # Note: The terms are added in query order, so the score of every
+        # document is summed in the same order as before
+        doc_scores = {}
+        for term in query_dict[q].split():
+            if term not in indexed_data_arg:
+                continue
+
+            postings = indexed_data_arg[term]
+            if term not in idf_cache:
+                # n_k -> The number of documents containing this term
+                n_k = len(postings)
+                idf_cache[term] = math.log(N / n_k)
+            idf = idf_cache[term]
+
+            for doc, t_f in postings.items():
+                if t_f > 0:
+                    if doc in doc_scores:
+                        doc_scores[doc] += t_f * idf
+                    else:
+                        doc_scores[doc] = t_f * idf
 
-            tf_idf_scores[q][doc] = score
+        tf_idf_scores[q] = rank_with_background_score(doc_scores, 0, collection_stats.doc_ids(), top_k)
 
-    sort_dict_according_to_scores(tf_idf_scores)
     return tf_idf_scores
 
 
@@ -334,6 +383,23 @@ def parse_normal_query_text_file(query_fname):
     return query_dict
 
 
+def select_queries(query_dict, query_ids=None):
+    """
+    Helper function which keeps only some of the parsed queries, the scorers
+    use it to score the share of the queries of a worker process( see
+    parallel_queries.py)
+    :param query_dict: a dictionary of the form
+    {q_id : <Parsed Query>, q_id_2 : <Parse Query 2>}
+    :param query_ids: the ids of the queries to keep, None keeps all of them
+    :return: a dictionary of the same form
+    """
+
+    if query_ids is None:
+        return query_dict
+
+    return {q: query_dict[q] for q in query_ids if q in query_dict}
+
+
 def get_total_number_of_terms_in_collection(collection_data):
     """
     Helper function which returns the total number of words in teh entire
@@ -371,14 +437,15 @@ def get_query_term_freq_in_collection(term, inverted_index):
     return c_q_i
 
 
-def jm_likelihood_scores(collection_data, indexed_data, query_text_file_name,
-                         normal_query_file=False):
+def jm_likelihood_scores(collection_stats, indexed_data, query_text_file_name,
+                         normal_query_file=False, top_k=DEFAULT_TOP_K, query_ids=None):
     """
     Function that calculates the likelihood scores for all the documents
-    :param collection_data: A dictionary containing the parsed output of teh entire
-    collection. This dictionary is of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
+    Only the documents containing at least one query term are scored one by
+    one, all the other documents get the same( background only) score
+    :param collection_stats: The CollectionStats of the collection( doc
+    lengths, average doc length, total number of words..) precomputed at
+    indexing time
     :param indexed_data: The inverted index
     {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
     term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
@@ -392,18 +459,18 @@ def jm_likelihood_scores(collection_data, indexed_data, query_text_file_name,
     # Given lam
     lam = 0.35
 
-    C = get_total_number_of_terms_in_collection(collection_data)
+    C = collection_stats.total_terms
 
     print("the total number of words in the collection is ", C)
 
     # We will maintain a dictionary for the jm scores
     # The format of thsi dictionary will be
-    # {query_id : {doc_id, jm_score_doc_1...}...}
+    # {query_id : [(doc_id, jm_score_doc_1)...]...}
     jm_scores = {}
 
-    # Populate the dictionary with empty inner dictionaries
+    # Populate the dictionary with empty inner lists
     for i in range(1, 65):
-        jm_scores[i] = {}
+        jm_scores[i] = []
 
     # query_dict is of the form
     # {q_id: < Parsed Query >, q_id_2: < Parsed Query 2 >}
@@ -412,50 +479,76 @@ def jm_likelihood_scores(collection_data, indexed_data, query_text_file_name,
     else:
         query_dict = parse_normal_query_text_file(query_text_file_name)
 
-    # Maintain the length of all the documents in the dictionary'
-    # Lenght of documents do not change
-    # Therefore we will store it in a dictionary in the form
-    # {doc_name : lenght_of_doc}
+    query_dict = select_queries(query_dict, query_ids)
 
-    D_dict = {}
-
-    for document, text in collection_data.items():
-        D_dict[document] = len(text.split())
+    # Note: The length of all the documents and the collection frequency of
+    # every term are precomputed in collection_stats
 
     for q in query_dict:
-        # Iterate through the entire collection
-        for doc in collection_data:
+        query_terms = query_dict[q].split()
+
+        # The collection part of the score of every query term, it is the
+        # same for all the documents
+        second_terms = [(lam * collection_stats.collection_frequency(term)) / C
+                        for term in query_terms]
+
+        # A document that contains none of the query terms only gets the
+        # collection part: log((lam * c_qi) / C) for every query term
+        background_score = 0
+        for second_term in second_terms:
+            if second_term != 0:
+                background_score += math.log(second_term)
+
+        # Only the documents in the postings of the query terms need to be
+        # scored one by one
+        postings = [indexed_data.get(term, {}) for term in query_terms]
+        matched_docs = set()
+        for term_postings in postings:
+            matched_docs.update(term_postings)
+
+        doc_scores = {}
+        for doc in sorted(matched_docs):
             score = 0
-            # Initialize document length as 0
-            D = 0
+            D = collection_stats.doc_length(doc)
 
             # Iterate through all terms in the query
-            for term in query_dict[q].split():
-
-                # Initialize the query term frequency
-                # with respect to each document as 0
-                f_qi_D = 0
-
+            for term_postings, second_term in zip(postings, second_terms):
                 # Frequency of this query term in document D
-                if term in indexed_data:
-                    if doc in indexed_data[term]:
-                        f_qi_D = indexed_data[term][doc]
-
-                D = D_dict[doc]
-
-                # Initialize c_qi -> The number of terms the query term occurs
-                # in the entire collection
-                c_qi = get_query_term_freq_in_collection(term, indexed_data)
+                f_qi_D = term_postings.get(doc, 0)
 
                 first_term = ((1 - lam) * f_qi_D / D)
-                second_term = ((lam * c_qi) / C)
                 if first_term + second_term != 0:
                     score += math.log(first_term + second_term)
 
-            jm_scores[q][doc] = score
+            doc_scores[doc] = score
+
+        jm_scores[q] = rank_with_background_score(doc_scores, background_score,
+                                                  collection_stats.doc_ids(), top_k)
 
-    sort_dict_according_to_scores(jm_scores)
     return jm_scores
 
 
+def rank_with_background_score(doc_scores, background_score, all_doc_ids, top_k=None):
+    """
+    Helper function which ranks all the documents of the collection when only
+    some of them were scored and every other document has the same score
+    :param doc_scores: dictionary of the form {doc_id : score} of the scored
+    documents
+    :param background_score: the score of every document not in doc_scores
+    :param all_doc_ids: all the integer doc ids, in increasing order
+    :param top_k: If given, only the top_k documents are returned
+    :return: a list of tuples sorted on the score
+    [(doc_id_1, score_1), (doc_id_2, score_2)....]
+    Note: Documents with equal scores are ordered on the doc id, like
+    sort_dict_according_to_scores does when every document is scored
+    """
+
+    ranked_docs = sorted(doc_scores.items(), key=lambda x: (-x[1], x[0]))
+    background_docs = ((doc, background_score) for doc in all_doc_ids if doc not in doc_scores)
+
+    # Both lists are sorted, only the top_k documents of the merge are read
+    merged = heapq.merge(ranked_docs, background_docs, key=lambda x: (-x[1], x[0]))
+    return list(itertools.islice(merged, top_k))
+
+
 
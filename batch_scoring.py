@@ -0,0 +1,299 @@
+"""
+Python file which scores all the queries at once with sparse matrix products
+( requires numpy and scipy)
+
+The inverted index is turned into a term-document CSR matrix( one row per
+term, i.e one row per postings list) and the queries into a query-term CSR
+matrix of the query term counts. The scores of every query for every document
+are then given by a single sparse matrix product
+
+tf_idf -> score(q, d) = sum_t count(q, t) * tf(t, d) * idf(t)
+BM25   -> log( idf part * saturation * query part) is split into
+          log(saturation(t, d))( precomputed for every posting) and a query
+          weight count(q, t) * (log(query part) + log(idf part))
+JM     -> score(q, d) = background(q) +
+          sum_t count(q, t) * log(1 + ((1 - lam) * tf(t, d) / |D|) / (lam * cf(t) / |C|))
+          where background(q) is the score of a document containing none of
+          the query terms
+
+The models are the same as in baseline_runs.py( tf_idf, new_bm25_scores,
+jm_likelihood_scores) and documents with equal scores are ranked in the same
+order. The sums are done in a different order so the scores can differ in the
+last digits, and two documents whose scores only differ in these digits can
+swap ranks with the loop scorers( Example: one query of each model on the
+stopped index)
+
+Building the term-document matrix is the costly part of a batch, it is built
+once per index and reused while the same index is scored( see batch_scorer)
+"""
+
+import numpy as np
+from scipy import sparse
+from parse_queries import parse_query_text_file
+from baseline_runs import get_relevance_information, parse_normal_query_text_file, select_queries, DEFAULT_TOP_K
+from bm25_engine import postings_arrays, rank_documents
+
+
+class BatchScorer:
+    """
+    Scores batches of queries against a term-document matrix built from the
+    inverted index
+    """
+
+    def __init__(self, collection_stats, indexed_data):
+        """
+        :param collection_stats: The CollectionStats of the collection
+        :param indexed_data: a BinaryInvertedIndex or an inverted index keyed
+        on integer doc ids
+        """
+        self.collection_stats = collection_stats
+        self.indexed_data = indexed_data
+        self.N = collection_stats.num_docs
+
+        # vocabulary -> {term : row of the term in the matrices}
+        self.terms = list(indexed_data)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+
+        all_doc_ids, all_freqs = [], []
+        indptr = [0]
+        for term in self.terms:
+            doc_ids, freqs = postings_arrays(indexed_data, term)
+            all_doc_ids.append(doc_ids)
+            all_freqs.append(freqs)
+            indptr.append(indptr[-1] + len(doc_ids))
+
+        # One row per term, the columns are the integer doc ids
+        self.tf = sparse.csr_matrix((np.concatenate(all_freqs).astype(np.float64),
+                                     np.concatenate(all_doc_ids).astype(np.int64),
+                                     np.array(indptr, dtype=np.int64)),
+                                    shape=(len(self.terms), self.N))
+        self.tf.sort_indices()
+
+        # df of every term and the term of every posting
+        self.df = np.diff(self.tf.indptr)
+        self.posting_terms = np.repeat(np.arange(len(self.terms)), self.df)
+
+        self.doc_lengths = np.asarray(collection_stats.doc_lengths, dtype=np.float64)
+
+    def first_scored_order(self, query, doc_ids):
+        """
+        Helper function which orders the docs matching a query like the score
+        dictionary of new_bm25_scores: in the order of the query terms, then
+        of the postings, so that the documents with equal scores are ranked the
+        same way
+        :param query: the parsed query string
+        :param doc_ids: numpy array of the doc ids matching the query
+        :return: the doc ids in the order they are first scored
+        """
+        postings = [self.tf.indices[self.tf.indptr[row]: self.tf.indptr[row + 1]]
+                    for row in (self.vocabulary[term] for term in query.split() if term in self.vocabulary)]
+        if not postings:
+            return doc_ids
+
+        # Position of the first posting of every doc in the query order
+        scored_docs, first_positions = np.unique(np.concatenate(postings), return_index=True)
+        first_position = np.zeros(self.N, dtype=np.int64)
+        first_position[scored_docs] = first_positions
+        return doc_ids[np.argsort(first_position[doc_ids], kind="stable")]
+
+    def with_data(self, data):
+        """
+        Helper function which returns a matrix with the same postings as the
+        term-document matrix and the given values
+        """
+        return sparse.csr_matrix((data, self.tf.indices, self.tf.indptr), shape=self.tf.shape)
+
+    def query_matrix(self, query_dict):
+        """
+        Function which creates the query-term matrix
+        :param query_dict: dictionary of the form {q_id : <Parsed Query>}
+        :return: a tuple of the list of query ids( the order of the rows) and
+        a CSR matrix of the number of times every term occurs in every query
+        Note: The terms that are not in the index are dropped
+        """
+        query_ids = list(query_dict)
+        rows, cols = [], []
+        for row, q in enumerate(query_ids):
+            for term in query_dict[q].split():
+                if term in self.vocabulary:
+                    rows.append(row)
+                    cols.append(self.vocabulary[term])
+
+        # Duplicate (row, col) pairs are summed, giving the term counts
+        counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                   shape=(len(query_ids), len(self.terms)))
+        counts.sum_duplicates()
+        return query_ids, counts
+
+    def tf_idf(self, query_dict, top_k=DEFAULT_TOP_K):
+        """
+        Function which computes the tf_idf scores of all the queries
+        Like baseline_runs.tf_idf, every document is ranked( the documents
+        containing none of the query terms have a score of 0)
+        :return: a dictionary {query_id : [(doc_1, doc_1_score), ....]}
+        """
+        query_ids, counts = self.query_matrix(query_dict)
+
+        idf = np.log(self.N / self.df)
+        weights = self.with_data(self.tf.data * idf[self.posting_terms])
+        scores = (counts @ weights).toarray()
+
+        all_doc_ids = np.arange(self.N)
+        return {q: rank_documents(all_doc_ids, scores[row], top_k)
+                for row, q in enumerate(query_ids)}
+
+    def bm25(self, query_dict, rel_docs_dict=None, top_k=DEFAULT_TOP_K, k1=1.2, b=0.75, k2=100):
+        """
+        Function which computes the BM25 scores of all the queries
+        Like baseline_runs.new_bm25_scores, only the documents containing at
+        least one query term are ranked
+        :param rel_docs_dict: dictionary of the form {q_id : [relevant integer
+        doc ids]}. If given, the relevance information is taken into account
+        :return: a dictionary {query_id : [(doc_1, doc_1_score), ....]}
+        """
+        query_ids, counts = self.query_matrix(query_dict)
+
+        # log of the saturation (k1 + 1) * f / (K + f) of every posting
+        K = k1 * ((1 - b) + b * self.doc_lengths / self.collection_stats.avg_doc_length)
+        f = self.tf.data
+        log_saturation = self.with_data(np.log((k1 + 1) * f / (K[self.tf.indices] + f)))
+        incidence = self.with_data(np.ones_like(f))
+
+        # R -> number of relevant docs of every query
+        # r_i -> number of relevant docs containing the term, for every
+        # (query, term) pair of the query matrix
+        rows, cols = counts.nonzero()
+        R = np.zeros(len(query_ids))
+        r_i = np.zeros(len(rows))
+        if rel_docs_dict is not None:
+            R = np.array([len(rel_docs_dict[q]) for q in query_ids], dtype=np.float64)
+
+            rel_rows, rel_cols = [], []
+            for row, q in enumerate(query_ids):
+                for doc in rel_docs_dict[q]:
+                    if doc is not None:
+                        rel_rows.append(row)
+                        rel_cols.append(doc)
+            relevant = sparse.csr_matrix((np.ones(len(rel_rows)), (rel_rows, rel_cols)),
+                                         shape=(len(query_ids), self.N))
+            r_i = np.asarray((relevant @ incidence.T)[rows, cols]).ravel()
+        R = R[rows]
+
+        # The weight of a (query, term) pair, counted once for every
+        # occurrence of the term in the query
+        q_fi = np.asarray(counts[rows, cols]).ravel()
+        n_i = self.df[cols]
+        query_part = ((k2 + 1) * q_fi) / (k2 + q_fi)
+        idf_part = ((r_i + 0.5) / (R - r_i + 0.5)) / ((n_i - r_i + 0.5) / (self.N - n_i - R + r_i + 0.5))
+        query_weights = sparse.csr_matrix((q_fi * (np.log(query_part) + np.log(idf_part)), (rows, cols)),
+                                          shape=counts.shape)
+
+        scores = (counts @ log_saturation + query_weights @ incidence).tocsr()
+
+        # Only the documents sharing a term with the query are ranked
+        # Note: The number of matching terms is never 0, unlike a score
+        matched = (counts @ incidence).tocsr()
+        matched.sort_indices()
+
+        results = {}
+        for row, q in enumerate(query_ids):
+            doc_ids = self.first_scored_order(query_dict[q], matched.indices[matched.indptr[row]: matched.indptr[row + 1]])
+            row_scores = scores.getrow(row).toarray().ravel()[doc_ids]
+            results[q] = rank_documents(doc_ids, row_scores, top_k)
+        return results
+
+    def jm(self, query_dict, top_k=DEFAULT_TOP_K, lam=0.35):
+        """
+        Function which computes the JM query likelihood scores of all the
+        queries. Like baseline_runs.jm_likelihood_scores, every document is
+        ranked
+        :return: a dictionary {query_id : [(doc_1, doc_1_score), ....]}
+        """
+        query_ids, counts = self.query_matrix(query_dict)
+        C = self.collection_stats.total_terms
+
+        # (lam * c_qi) / C of every term
+        cf = np.asarray(self.tf.sum(axis=1)).ravel()
+        collection_part = (lam * cf) / C
+
+        # The score of a document containing none of the query terms
+        background = counts @ np.log(collection_part)
+
+        document_part = (1 - lam) * self.tf.data / self.doc_lengths[self.tf.indices]
+        weights = self.with_data(np.log1p(document_part / collection_part[self.posting_terms]))
+        scores = (counts @ weights).toarray() + background[:, np.newaxis]
+
+        all_doc_ids = np.arange(self.N)
+        return {q: rank_documents(all_doc_ids, scores[row], top_k)
+                for row, q in enumerate(query_ids)}
+
+
+# The BatchScorer of the last index scored in this process( see batch_scorer)
+_batch_scorer = None
+
+
+def batch_scorer(collection_stats, indexed_data):
+    """
+    Function which returns a BatchScorer for an index, the term-document
+    matrix is only built again when another index or other statistics are
+    scored
+    :param collection_stats: The CollectionStats of the collection
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids
+    :return: a BatchScorer
+    """
+    global _batch_scorer
+
+    if (_batch_scorer is None or _batch_scorer.indexed_data is not indexed_data or
+            _batch_scorer.collection_stats is not collection_stats):
+        _batch_scorer = BatchScorer(collection_stats, indexed_data)
+    return _batch_scorer
+
+
+def batch_scores(method, collection_stats, indexed_data, query_text_file_name, relevant_docs_fname=None, rel_info_enabled=False, normal_query_file=False, doc_table=None, top_k=DEFAULT_TOP_K, query_ids=None):
+    """
+    Function that scores all the queries of a query file in one batch
+    The returned dictionary can be written with write_top_100_scores_to_txt
+    :param method: "tf_idf", "bm25" or "jm_qlm"
+    :param collection_stats: The CollectionStats of the collection
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids
+    :param query_text_file_name: The path to the file containing all the queries
+    :param relevant_docs_fname: The text file containing the relevance file
+    i.e cacm.rel.txt( only used by bm25)
+    :param rel_info_enabled: If this param is True, then the relevance
+    information is taken into account( only used by bm25)
+    :param normal_query_file: If True, the query file has one query per line
+    :param doc_table: the DocTable of the index
+    :return: Will return a dictionary with values as lists made up of tuples that are sorted
+    {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
+    """
+
+    scores_dict = {}
+
+    # Populate the dictionary with empty inner lists
+    for i in range(1, 65):
+        scores_dict[i] = []
+
+    if not normal_query_file:
+        query_dict = parse_query_text_file(query_text_file_name)
+    else:
+        query_dict = parse_normal_query_text_file(query_text_file_name)
+
+    query_dict = select_queries(query_dict, query_ids)
+
+    scorer = batch_scorer(collection_stats, indexed_data)
+
+    if method == "tf_idf":
+        scores_dict.update(scorer.tf_idf(query_dict, top_k))
+    elif method == "bm25":
+        rel_docs_dict = None
+        if rel_info_enabled:
+            rel_docs_dict = get_relevance_information(relevant_docs_fname, doc_table)
+        scores_dict.update(scorer.bm25(query_dict, rel_docs_dict, top_k))
+    elif method == "jm_qlm":
+        scores_dict.update(scorer.jm(query_dict, top_k))
+    else:
+        raise ValueError("Unknown batch scoring method " + method)
+
+    return scores_dict
@@ -0,0 +1,648 @@
+"""
+Python file which stores the inverted index in a binary format that can be
+memory mapped and read lazily, instead of loading the whole
+{term: {doc: freq}} json file into memory before answering a single query
+
+Layout of the binary file( all integers are unsigned 32 bit, native byte order)
+    header          -> magic, version, num_docs, num_terms, num_postings,
+                       doc_blob_len, term_blob_len, block_size, num_blocks
+    doc_offsets     -> num_docs + 1 offsets into the doc blob
+    term_offsets    -> num_terms + 1 offsets into the term blob
+    postings_offsets-> num_terms + 1 offsets into the postings arrays
+    doc_ids         -> num_postings integer doc ids( contiguous per term)
+    freqs           -> num_postings term frequencies( contiguous per term)
+    block_offsets   -> num_terms + 1 offsets into the block arrays
+    block_last_docs -> num_blocks, doc id of the last posting of every block
+    block_max_freqs -> num_blocks, largest term frequency in every block
+    block_min_lens  -> num_blocks, length of the shortest doc in every block
+    doc_blob        -> utf-8 encoded doc names
+    term_blob       -> utf-8 encoded terms, sorted
+
+The postings of every term are split into blocks of block_size postings( the
+last block of a term can be shorter). The block arrays give an upper bound on
+the score any posting of a block can get( see dynamic_pruning.py), so that
+whole blocks can be skipped without reading their postings
+
+Credits -> https://docs.python.org/3/library/mmap.html
+"""
+
+import argparse
+import array
+import json
+import mmap
+import os
+import errno
+import shutil
+import struct
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from doc_table import DocTable, doc_table_fname, load_doc_table, write_doc_table
+from collection_stats import (collection_stats_fname, load_collection_stats, build_collection_stats,
+                              write_collection_stats)
+from corpus_stream import iter_corpus
+
+
+# Magic bytes and version written at the start of every binary index
+BINARY_INDEX_MAGIC = b"IRBI"
+BINARY_INDEX_VERSION = 2
+
+# magic, version, num_docs, num_terms, num_postings, doc_blob_len,
+# term_blob_len, block_size, num_blocks
+HEADER_FORMAT = "=4sIIIIIIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Number of postings in a block
+DEFAULT_BLOCK_SIZE = 32
+
+# Number of terms whose decoded postings are kept in memory( least recently
+# used terms are evicted first)
+DEFAULT_POSTINGS_CACHE_SIZE = 4096
+
+
+def binary_index_fname(json_fname):
+    """
+    Helper function which returns the path of the binary index that
+    sits next to a json inverted index
+    :param json_fname: path to the json inverted index
+    ( Example: inverted_index_corpus.json)
+    :return: the path with the .bin extension( inverted_index_corpus.bin)
+    """
+    return Path(json_fname).with_suffix(".bin")
+
+
+def pad_to_word(blob):
+    """
+    Helper function which pads a bytes object with zeros so that its length
+    is a multiple of 4( keeps every section after it aligned)
+    :param blob: a bytes object
+    :return: the padded bytes object
+    """
+    return blob + b"\0" * (-len(blob) % 4)
+
+
+def write_binary_index(inv_index, out_fname, doc_names=None, doc_lengths=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Function that writes an inverted index to the binary format
+    :param inv_index: The inverted index of the form
+    {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
+    term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
+    :param out_fname: The path to the binary file
+    :param doc_names: The list of doc names, the position of a doc name in
+    this list is its integer doc id. By default the doc names are sorted
+    :param doc_lengths: The list of doc lengths, indexed on the integer doc
+    ids. Used for the shortest doc of every block, if not given the
+    shortest length is stored as 0( a looser upper bound)
+    :param block_size: Number of postings in a block
+    """
+
+    if doc_names is None:
+        all_docs = set()
+        for postings in inv_index.values():
+            all_docs.update(postings)
+        doc_names = sorted(all_docs)
+
+    # Map every doc name to its integer id
+    doc_id_lookup = {doc: i for i, doc in enumerate(doc_names)}
+
+    with BinaryIndexWriter(out_fname, doc_names, doc_lengths, block_size) as writer:
+        # The term dictionary is sorted on the utf-8 bytes of the terms so that
+        # we can binary search it without decoding every term
+        for term in sorted(inv_index, key=lambda t: t.encode("utf-8")):
+            # Postings of a term are stored in increasing order of doc id
+            postings = sorted((doc_id_lookup[doc], freq) for doc, freq in inv_index[term].items())
+            writer.add_term(term, [doc_id for doc_id, _ in postings], [freq for _, freq in postings])
+
+
+class BinaryIndexWriter:
+    """
+    Writes a binary index one term at a time, so the whole inverted index
+    never has to be in memory( Example: the k-way merge of spimi_index.py)
+    The postings sections are written to temporary files and copied into the
+    binary index by close(), only the per term offsets and the term
+    dictionary are kept in memory
+    """
+
+    def __init__(self, out_fname, doc_names, doc_lengths=None, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        :param out_fname: The path to the binary file
+        :param doc_names: The list of doc names, the position of a doc name in
+        this list is its integer doc id
+        :param doc_lengths: The list of doc lengths, indexed on the integer
+        doc ids( see write_binary_index)
+        :param block_size: Number of postings in a block
+        """
+        self.out_fname = out_fname
+        self.doc_names = doc_names
+        self.doc_lengths = doc_lengths
+        self.block_size = block_size
+
+        self.term_offsets = array.array("I", [0])
+        self.postings_offsets = array.array("I", [0])
+        self.block_offsets = array.array("I", [0])
+        self.term_blob = bytearray()
+        self.last_term = None
+
+        # doc_ids, freqs, block_last_docs, block_max_freqs, block_min_lens
+        self._sections = [tempfile.TemporaryFile() for _ in range(5)]
+        self.num_postings = 0
+        self.num_blocks = 0
+
+    def add_term(self, term, doc_ids, freqs):
+        """
+        Function which writes the postings of the next term
+        :param term: the term, the terms must be added in increasing order of
+        their utf-8 bytes
+        :param doc_ids: the integer doc ids of the postings, in increasing order
+        :param freqs: the term frequencies of these doc ids
+        """
+        term_bytes = term.encode("utf-8")
+        if self.last_term is not None and term_bytes <= self.last_term:
+            raise ValueError("The terms must be added in sorted order, " + term + " comes after " +
+                             self.last_term.decode("utf-8"))
+        self.last_term = term_bytes
+
+        self.term_blob += term_bytes
+        self.term_offsets.append(len(self.term_blob))
+
+        doc_ids_fd, freqs_fd, last_docs_fd, max_freqs_fd, min_lens_fd = self._sections
+        array.array("I", doc_ids).tofile(doc_ids_fd)
+        array.array("I", freqs).tofile(freqs_fd)
+        self.num_postings += len(doc_ids)
+        self.postings_offsets.append(self.num_postings)
+
+        block_last_docs = array.array("I")
+        block_max_freqs = array.array("I")
+        block_min_lens = array.array("I")
+        for start in range(0, len(doc_ids), self.block_size):
+            end = min(start + self.block_size, len(doc_ids))
+            block_last_docs.append(doc_ids[end - 1])
+            block_max_freqs.append(max(freqs[start:end]))
+            if self.doc_lengths is None:
+                block_min_lens.append(0)
+            else:
+                block_min_lens.append(min(self.doc_lengths[doc_id] for doc_id in doc_ids[start:end]))
+        block_last_docs.tofile(last_docs_fd)
+        block_max_freqs.tofile(max_freqs_fd)
+        block_min_lens.tofile(min_lens_fd)
+        self.num_blocks += len(block_last_docs)
+        self.block_offsets.append(self.num_blocks)
+
+    def close(self):
+        """
+        Function which writes the binary index file
+        """
+        doc_offsets = array.array("I", [0])
+        doc_blob = bytearray()
+        for doc in self.doc_names:
+            doc_blob += doc.encode("utf-8")
+            doc_offsets.append(len(doc_blob))
+
+        num_terms = len(self.term_offsets) - 1
+        header = struct.pack(HEADER_FORMAT, BINARY_INDEX_MAGIC,
+                             BINARY_INDEX_VERSION, len(self.doc_names),
+                             num_terms, self.num_postings, len(doc_blob),
+                             len(self.term_blob), self.block_size, self.num_blocks)
+
+        out_fname = self.out_fname
+        if os.path.dirname(out_fname) and not os.path.exists(os.path.dirname(out_fname)):
+            try:
+                os.makedirs(os.path.dirname(out_fname))
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+
+        doc_ids_fd, freqs_fd, last_docs_fd, max_freqs_fd, min_lens_fd = self._sections
+        with open(out_fname, "wb") as o_fd:
+            o_fd.write(header)
+            for section in (doc_offsets, self.term_offsets, self.postings_offsets):
+                section.tofile(o_fd)
+            for section_fd in (doc_ids_fd, freqs_fd):
+                section_fd.seek(0)
+                shutil.copyfileobj(section_fd, o_fd)
+            self.block_offsets.tofile(o_fd)
+            for section_fd in (last_docs_fd, max_freqs_fd, min_lens_fd):
+                section_fd.seek(0)
+                shutil.copyfileobj(section_fd, o_fd)
+            o_fd.write(pad_to_word(bytes(doc_blob)))
+            o_fd.write(pad_to_word(bytes(self.term_blob)))
+
+        self.discard()
+
+    def discard(self):
+        """
+        Function which removes the temporary files without writing the index
+        """
+        for section_fd in self._sections:
+            section_fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_index_sidecars(json_fname, corpus_fname, inv_index=None):
+    """
+    Function which writes the doc table and the collection statistics next
+    to a json inverted index built before they were written at indexing time
+    ( Example: stemmed_inverted_index.json). Only the missing files are
+    written, so it can be called before every scoring run
+    :param json_fname: path to the json inverted index
+    :param corpus_fname: path to the corpus the index was built from, the
+    doc ids and the doc lengths follow the documents of the corpus like in
+    create_index.py
+    :param inv_index: the json inverted index if it is already loaded
+    """
+
+    doc_table_path = doc_table_fname(json_fname)
+    stats_path = collection_stats_fname(json_fname)
+    if os.path.exists(doc_table_path) and os.path.exists(stats_path):
+        return
+
+    # {doc_id : number of words} in the order of the documents
+    doc_lengths = {doc: len(text.split()) for doc, text in iter_corpus(corpus_fname)}
+
+    doc_table = load_doc_table(doc_table_path, doc_lengths)
+    if not os.path.exists(doc_table_path):
+        write_doc_table(doc_table, doc_table_path)
+
+    if not os.path.exists(stats_path):
+        if inv_index is None:
+            with open(json_fname) as inv_fd:
+                inv_index = json.load(inv_fd)
+        write_collection_stats(build_collection_stats(doc_lengths, inv_index, doc_table), stats_path)
+
+
+def convert_json_index(json_fname, out_fname=None, corpus_fname=None):
+    """
+    Function that converts an existing json inverted index
+    ( written by create_index.py) into the binary format
+    :param json_fname: path to the json inverted index
+    :param out_fname: path to the binary file, by default the json filename
+    with a .bin extension
+    :param corpus_fname: path to the corpus the index was built from. If
+    given, the missing doc table and collection statistics of the index are
+    written too( see write_index_sidecars)
+    :return: the path to the binary file
+    """
+
+    if out_fname is None:
+        out_fname = binary_index_fname(json_fname)
+
+    with open(json_fname) as inv_fd:
+        inv_index = json.load(inv_fd)
+
+    if corpus_fname is not None:
+        write_index_sidecars(json_fname, corpus_fname, inv_index)
+
+    # Keep the integer doc ids of the doc table written at indexing time
+    doc_names = None
+    if os.path.exists(doc_table_fname(json_fname)):
+        doc_names = load_doc_table(doc_table_fname(json_fname)).doc_names
+
+    # The doc lengths of the statistics file give tighter block upper bounds
+    # Note: They are indexed on the integer doc ids of the doc table
+    doc_lengths = None
+    if doc_names is not None and os.path.exists(collection_stats_fname(json_fname)):
+        doc_lengths = load_collection_stats(collection_stats_fname(json_fname)).doc_lengths
+
+    write_binary_index(inv_index, out_fname, doc_names=doc_names, doc_lengths=doc_lengths)
+    return out_fname
+
+
+def is_binary_index(fname):
+    """
+    Helper function which checks whether a file is a binary index
+    :param fname: path to the file
+    :return: True iff the file starts with the binary index magic bytes
+    """
+    with open(fname, "rb") as fd:
+        return fd.read(len(BINARY_INDEX_MAGIC)) == BINARY_INDEX_MAGIC
+
+
+def is_stale_binary_index(bin_fname, json_fname):
+    """
+    Helper function which checks whether a binary index was converted from an
+    older version of its json index
+    :param bin_fname: path to the binary index
+    :param json_fname: path to the json inverted index
+    :return: True iff the json index was modified after the binary index
+    """
+    if Path(bin_fname) == Path(json_fname) or not os.path.exists(json_fname):
+        return False
+    return os.path.getmtime(json_fname) > os.path.getmtime(bin_fname)
+
+
+def load_inverted_index(json_fname, doc_table=None):
+    """
+    Function which loads an inverted index for the scorers
+    If a binary index is present next to the json index, the binary index is
+    memory mapped( near zero load time) else the json index is loaded
+    A binary index older than its json index is stale( the json index was
+    written again after the conversion), it is ignored and the json index is
+    loaded
+    :param json_fname: path to the json inverted index
+    :param doc_table: a DocTable. If given, the postings are keyed on the
+    integer doc ids of this table instead of the doc names
+    :return: a BinaryInvertedIndex or a dictionary of the form
+    {term : {doc : freq}}. Both support the same read operations
+    """
+
+    bin_fname = binary_index_fname(json_fname)
+    if not os.path.exists(bin_fname) and is_binary_index(json_fname):
+        bin_fname = json_fname
+
+    if os.path.exists(bin_fname) and not is_stale_binary_index(bin_fname, json_fname):
+        binary_index = BinaryInvertedIndex(bin_fname, int_doc_ids=doc_table is not None)
+        if doc_table is not None and binary_index.doc_names() != doc_table.doc_names:
+            binary_index.close()
+            raise ValueError("The binary index " + str(bin_fname) + " was not "
+                             "built with this doc table, re-run binary_index.py")
+        return binary_index
+
+    with open(json_fname) as inv_fd:
+        inv_index = json.load(inv_fd)
+
+    if doc_table is not None:
+        return doc_table.remap_index(inv_index)
+    return inv_index
+
+
+class BinaryInvertedIndex:
+    """
+    A read only, memory mapped inverted index
+    It behaves like the {term : {doc : freq}} dictionary that the scorers
+    expect( term in index, index[term], len(index[term]), for term in index)
+    but postings are only decoded for the terms that are actually looked up
+    """
+
+    def __init__(self, fname, int_doc_ids=False, postings_cache_size=DEFAULT_POSTINGS_CACHE_SIZE):
+        """
+        :param fname: path to the binary index
+        :param int_doc_ids: If True, index[term] is keyed on the integer doc
+        ids, else on the doc names
+        :param postings_cache_size: Number of terms whose decoded postings are
+        cached
+        """
+        self.fname = str(fname)
+        self.int_doc_ids = int_doc_ids
+        self.postings_cache_size = postings_cache_size
+        self._fd = open(self.fname, "rb")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from("=4sI", self._mm, 0)
+        if magic != BINARY_INDEX_MAGIC:
+            raise ValueError("The file " + self.fname + " is not a binary inverted index")
+        if version != BINARY_INDEX_VERSION:
+            raise ValueError("The binary index " + self.fname + " was written "
+                             "by another version, re-run binary_index.py")
+
+        (_, _, self.num_docs, self.num_terms, self.num_postings, doc_blob_len,
+         term_blob_len, self.block_size, self.num_blocks) = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+
+        # Create zero copy views on top of the memory mapped file
+        offset = HEADER_SIZE
+        self._doc_offsets, offset = self._uint_view(offset, self.num_docs + 1)
+        self._term_offsets, offset = self._uint_view(offset, self.num_terms + 1)
+        self._postings_offsets, offset = self._uint_view(offset, self.num_terms + 1)
+        self._doc_ids, offset = self._uint_view(offset, self.num_postings)
+        self._freqs, offset = self._uint_view(offset, self.num_postings)
+        self._block_offsets, offset = self._uint_view(offset, self.num_terms + 1)
+        self._block_last_docs, offset = self._uint_view(offset, self.num_blocks)
+        self._block_max_freqs, offset = self._uint_view(offset, self.num_blocks)
+        self._block_min_lens, offset = self._uint_view(offset, self.num_blocks)
+
+        self._doc_blob = memoryview(self._mm)[offset: offset + doc_blob_len]
+        offset += doc_blob_len + (-doc_blob_len % 4)
+        self._term_blob = memoryview(self._mm)[offset: offset + term_blob_len]
+
+        # Doc names and postings are decoded lazily and cached
+        # Only the terms that are looked up end up in these caches, the
+        # postings cache keeps the postings_cache_size most recently used terms
+        self._doc_names = None
+        self._term_id_cache = {}
+        self._postings_cache = OrderedDict()
+
+    def _uint_view(self, offset, count):
+        """
+        Helper function which creates a view of count unsigned integers
+        starting at offset
+        :return: the view and the offset right after it
+        """
+        end = offset + 4 * count
+        return memoryview(self._mm)[offset:end].cast("I"), end
+
+    def _term_bytes(self, term_id):
+        """
+        Helper function which returns the utf-8 bytes of the term_id'th term
+        """
+        return self._term_blob[self._term_offsets[term_id]: self._term_offsets[term_id + 1]].tobytes()
+
+    def term_id(self, term):
+        """
+        Function which binary searches the sorted term dictionary
+        :param term: the term to look for
+        :return: the position of the term in the dictionary, -1 if absent
+        """
+        if term in self._term_id_cache:
+            return self._term_id_cache[term]
+
+        key = term.encode("utf-8")
+        low, high = 0, self.num_terms - 1
+        result = -1
+        while low <= high:
+            mid = (low + high) // 2
+            mid_key = self._term_bytes(mid)
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid - 1
+            else:
+                result = mid
+                break
+
+        self._term_id_cache[term] = result
+        return result
+
+    def doc_name(self, doc_id):
+        """
+        Function which returns the name of the doc( Example: CACM-0074)
+        given its integer doc id
+        """
+        return self.doc_names()[doc_id]
+
+    def doc_names(self):
+        """
+        Function which returns the list of all doc names, the position of a
+        doc name in this list is its integer doc id
+        """
+        if self._doc_names is None:
+            blob = self._doc_blob.tobytes()
+            self._doc_names = [blob[self._doc_offsets[i]: self._doc_offsets[i + 1]].decode("utf-8")
+                               for i in range(self.num_docs)]
+        return self._doc_names
+
+    def doc_table(self):
+        """
+        Function which returns the DocTable of the integer doc ids used in
+        the postings
+        """
+        return DocTable(self.doc_names())
+
+    def postings_range(self, term):
+        """
+        Function which returns where the postings of a term are in the
+        postings arrays of the index( the i'th posting of the term is the
+        posting start + i of the index)
+        :param term: the term
+        :return: a tuple (start, end), (0, 0) if the term is not indexed
+        """
+        term_id = self.term_id(term)
+        if term_id == -1:
+            return 0, 0
+        return self._postings_offsets[term_id], self._postings_offsets[term_id + 1]
+
+    def postings(self, term):
+        """
+        Function which returns the postings of a term as two integer arrays
+        :param term: the term
+        :return: a tuple (doc_ids, freqs) of zero copy views in increasing
+        order of doc id. Both are empty if the term is not indexed
+        """
+        start, end = self.postings_range(term)
+        return self._doc_ids[start:end], self._freqs[start:end]
+
+    def blocks(self, term):
+        """
+        Function which returns the block summaries of the postings of a term
+        The i'th block holds the postings [i * block_size, (i + 1) * block_size)
+        :param term: the term
+        :return: a tuple (block_last_docs, block_max_freqs, block_min_lens)
+        of zero copy views. All are empty if the term is not indexed
+        """
+        term_id = self.term_id(term)
+        if term_id == -1:
+            return self._block_last_docs[0:0], self._block_max_freqs[0:0], self._block_min_lens[0:0]
+
+        start = self._block_offsets[term_id]
+        end = self._block_offsets[term_id + 1]
+        return self._block_last_docs[start:end], self._block_max_freqs[start:end], self._block_min_lens[start:end]
+
+    def document_frequency(self, term):
+        """
+        Function which returns the number of documents containing the term
+        """
+        term_id = self.term_id(term)
+        if term_id == -1:
+            return 0
+        return self._postings_offsets[term_id + 1] - self._postings_offsets[term_id]
+
+    def __contains__(self, term):
+        return self.term_id(term) != -1
+
+    def __getitem__(self, term):
+        if term in self._postings_cache:
+            self._postings_cache.move_to_end(term)
+            return self._postings_cache[term]
+
+        if term not in self:
+            raise KeyError(term)
+
+        doc_ids, freqs = self.postings(term)
+        if self.int_doc_ids:
+            postings = dict(zip(doc_ids, freqs))
+        else:
+            names = self.doc_names()
+            postings = {names[doc_id]: freq for doc_id, freq in zip(doc_ids, freqs)}
+        self._postings_cache[term] = postings
+        if len(self._postings_cache) > self.postings_cache_size:
+            self._postings_cache.popitem(last=False)
+        return postings
+
+    def get(self, term, default=None):
+        if term in self:
+            return self[term]
+        return default
+
+    def __len__(self):
+        return self.num_terms
+
+    def __iter__(self):
+        for term_id in range(self.num_terms):
+            yield self._term_bytes(term_id).decode("utf-8")
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for term in self:
+            yield term, self[term]
+
+    def close(self):
+        """
+        Function which releases the memory map and the file handle
+        """
+        self._postings_cache = OrderedDict()
+        for view in (self._doc_offsets, self._term_offsets,
+                     self._postings_offsets, self._doc_ids, self._freqs,
+                     self._block_offsets, self._block_last_docs,
+                     self._block_max_freqs, self._block_min_lens,
+                     self._doc_blob, self._term_blob):
+            view.release()
+        self._mm.close()
+        self._fd.close()
+
+    def __getstate__(self):
+        # Note: The memory map can not be pickled, a copy of the index( Example:
+        # sent to a worker process) opens the file again
+        return {"fname": self.fname, "int_doc_ids": self.int_doc_ids,
+                "postings_cache_size": self.postings_cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["fname"], state["int_doc_ids"], state["postings_cache_size"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-i", "--input_json_fname",
+                    help="Enter the path to the json inverted index "
+                         "that you want to convert", required=True)
+
+    ap.add_argument("-o", "--output_fname",
+                    help="Enter the path to the binary index, by default "
+                         "the json filename with a .bin extension",
+                    required=False)
+
+    ap.add_argument("-c", "--corpus_fname",
+                    help="Enter the path to the corpus the index was built "
+                         "from, to also write its doc table and collection "
+                         "statistics if they are missing",
+                    required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    binary_fname = convert_json_index(user_args["input_json_fname"], user_args["output_fname"],
+                                      user_args["corpus_fname"])
+    print("The binary index is written to ", binary_fname)
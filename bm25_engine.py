@@ -0,0 +1,232 @@
+"""
+Python file which contains a term at a time BM25 engine built on numpy
+
+Instead of accumulating the score of every document in a dictionary
+( new_bm25_scores_dict[q][doc] += temp_score), the postings of a query term
+are taken as integer arrays and the BM25 contribution of the term is added to
+a dense float64 accumulator( one slot per document) in a single vectorized
+step. The accumulator is allocated once and reused for every query
+
+The contributions are added in the order of the query terms and the documents
+with equal scores are ranked in the order they were first scored, like the
+dictionary of new_bm25_scores, so both produce the same ranking
+
+The BM25 formula( k1, b, k2 and the relevance information R, r_i) is the
+same as the one in baseline_runs.new_bm25_scores
+"""
+
+import math
+import numpy as np
+from parse_queries import parse_query_text_file
+from baseline_runs import get_relevance_information, parse_normal_query_text_file, select_queries, DEFAULT_TOP_K
+
+
+def postings_arrays(indexed_data, term):
+    """
+    Function which returns the postings of a term as numpy arrays
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param term: the term
+    :return: a tuple (doc_ids, freqs) of numpy arrays
+    """
+
+    if hasattr(indexed_data, "postings"):
+        # The binary index already stores the postings as contiguous integer
+        # arrays, numpy can use them without copying
+        doc_ids, freqs = indexed_data.postings(term)
+        return np.frombuffer(doc_ids, dtype=np.uint32), np.frombuffer(freqs, dtype=np.uint32)
+
+    postings = indexed_data.get(term)
+    if not postings:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+
+    doc_ids = np.fromiter(postings.keys(), dtype=np.uint32, count=len(postings))
+    freqs = np.fromiter(postings.values(), dtype=np.uint32, count=len(postings))
+    return doc_ids, freqs
+
+
+class BM25Engine:
+    """
+    Term at a time BM25 scorer with a reusable dense score accumulator
+    """
+
+    def __init__(self, collection_stats, k1=1.2, b=0.75, k2=100):
+        """
+        :param collection_stats: The CollectionStats of the collection
+        :param k1: BM25 parameter
+        :param b: BM25 parameter
+        :param k2: BM25 parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.k2 = k2
+
+        # N -> Total number of documents in the collection
+        self.N = collection_stats.num_docs
+
+        # K only depends on the length of the document, so we compute it once
+        # for every document
+        doc_lengths = np.asarray(collection_stats.doc_lengths, dtype=np.float64)
+        self.K = k1 * ((1 - b) + b * doc_lengths / collection_stats.avg_doc_length)
+
+        # The accumulator and the mask of the documents that were scored
+        # Both are reused across the queries
+        self.accumulator = np.zeros(self.N, dtype=np.float64)
+        self.touched = np.zeros(self.N, dtype=bool)
+
+        # The doc ids of the last query in the order they were first scored
+        # ( one array per query term)
+        self.first_scored = []
+
+    def term_scores(self, doc_ids, freqs, q_fi, R=0, r_i=0):
+        """
+        Function which computes the BM25 contribution of a query term for
+        every document in its postings
+        :param doc_ids: the doc ids of the postings
+        :param freqs: the term frequencies of the postings
+        :param q_fi: frequency of the term in the query
+        :param R: Total number of relevant documents for this query
+        :param r_i: number of relevant docs containing the term
+        :return: an array with the contribution for each posting
+        """
+        k1, k2 = self.k1, self.k2
+
+        # n_i -> The number of documents containing this query term
+        n_i = len(doc_ids)
+
+        f_i = freqs.astype(np.float64)
+        z = ((k1 + 1) * f_i / (self.K[doc_ids] + f_i)) * ((k2 + 1) * q_fi) / (k2 + q_fi)
+        numerator = ((r_i + 0.5) / (R - r_i + 0.5)) * z
+        denominator = (n_i - r_i + 0.5) / (self.N - n_i - R + r_i + 0.5)
+
+        # Note: np.log can be one bit off from the math.log of new_bm25_scores,
+        # enough to swap the documents with nearly equal scores. The ratio only
+        # depends on f_i and the doc length, so there are few distinct values to
+        # take the math.log of
+        ratios, inverse = np.unique(numerator / denominator, return_inverse=True)
+        return np.fromiter(map(math.log, ratios.tolist()), dtype=np.float64, count=len(ratios))[inverse]
+
+    def score_query(self, query, indexed_data, rel_docs=None):
+        """
+        Function which scores all the documents for one query
+        :param query: the parsed query string
+        :param indexed_data: a BinaryInvertedIndex or an inverted index keyed
+        on integer doc ids
+        :param rel_docs: list of the integer doc ids relevant to this query
+        If given, the relevance information is taken into account
+        :return: the accumulator and the mask of the scored documents
+        Note: Both are overwritten by the next call
+        """
+
+        # Reset the accumulator of the previous query
+        self.accumulator.fill(0)
+        self.touched.fill(False)
+        self.first_scored = []
+
+        query_terms = query.split()
+
+        # R ->  Total number of relevant documents for this query
+        R = 0
+        rel_doc_ids = None
+        if rel_docs is not None:
+            R = len(rel_docs)
+            rel_doc_ids = np.array([doc for doc in rel_docs if doc is not None], dtype=np.uint32)
+
+        # Note: Like new_bm25_scores, a term repeated in the query is scored
+        # once for every occurrence
+        for term in query_terms:
+            doc_ids, freqs = postings_arrays(indexed_data, term)
+            if len(doc_ids) == 0:
+                continue
+
+            # q_i -> frequency of this term in the entire query
+            q_fi = query_terms.count(term)
+
+            # r_i -> number of relevant docs containing term i
+            r_i = 0
+            if rel_doc_ids is not None:
+                r_i = int(np.count_nonzero(np.isin(doc_ids, rel_doc_ids)))
+
+            # The doc ids of a postings list are unique, so a fancy index add
+            # updates every document exactly once
+            self.accumulator[doc_ids] += self.term_scores(doc_ids, freqs, q_fi, R, r_i)
+            self.first_scored.append(doc_ids[~self.touched[doc_ids]])
+            self.touched[doc_ids] = True
+
+        return self.accumulator, self.touched
+
+    def ranked_documents(self, top_k=None):
+        """
+        Function which ranks the documents scored by the last query
+        :param top_k: If given, only the top_k documents are selected
+        ( argpartition) and sorted, else all the scored documents are sorted
+        :return: a list of tuples sorted on the score, documents with equal
+        scores are in the order they were first scored
+        [(doc_id_1, score_1), (doc_id_2, score_2)....]
+        """
+        if not self.first_scored:
+            return []
+        doc_ids = np.concatenate(self.first_scored)
+        return rank_documents(doc_ids, self.accumulator[doc_ids], top_k)
+
+
+def rank_documents(doc_ids, scores, top_k=None):
+    """
+    Function which ranks documents on their scores
+    :param doc_ids: numpy array of doc ids, documents with equal scores keep
+    the order of this array
+    :param scores: numpy array of the scores of these doc ids
+    :param top_k: If given, only the top_k documents are selected
+    ( argpartition) and sorted, else all the documents are sorted
+    :return: a list of tuples sorted on the score
+    [(doc_id_1, score_1), (doc_id_2, score_2)....]
+    """
+
+    if top_k is not None and top_k < len(doc_ids):
+        # Find the top_k'th score in linear time, only the documents above
+        # it are sorted. The documents with a score equal to it are taken
+        # in the order of doc_ids, like a full sort would
+        kth_score = -np.partition(-scores, top_k - 1)[top_k - 1]
+        above = np.flatnonzero(scores > kth_score)
+        ties = np.flatnonzero(scores == kth_score)[:top_k - len(above)]
+
+        # Keeping the selected positions in increasing order makes the
+        # stable sort below keep the order of doc_ids for equal scores
+        selected = np.sort(np.concatenate([above, ties]))
+        doc_ids = doc_ids[selected]
+        scores = scores[selected]
+
+    order = np.argsort(-scores, kind="stable")
+    return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
+
+
+def numpy_bm25_scores(collection_stats, indexed_data, query_text_file_name, relevant_docs_fname, rel_info_enabled=False, normal_query_file=False, doc_table=None, top_k=DEFAULT_TOP_K, query_ids=None):
+    """
+    Function that performs BM25 ranking with the BM25Engine
+    Takes the same arguments and returns the same dictionary as
+    baseline_runs.new_bm25_scores
+    """
+
+    bm25_scores_dict = {}
+
+    # Populate the dictionary with empty inner lists
+    for i in range(1, 65):
+        bm25_scores_dict[i] = []
+
+    rel_docs_dict = get_relevance_information(relevant_docs_fname, doc_table)
+
+    if not normal_query_file:
+        query_dict = parse_query_text_file(query_text_file_name)
+    else:
+        query_dict = parse_normal_query_text_file(query_text_file_name)
+
+    query_dict = select_queries(query_dict, query_ids)
+
+    engine = BM25Engine(collection_stats)
+
+    for q in query_dict:
+        rel_docs = rel_docs_dict[q] if rel_info_enabled else None
+        engine.score_query(query_dict[q], indexed_data, rel_docs)
+        bm25_scores_dict[q] = engine.ranked_documents(top_k)
+
+    return bm25_scores_dict
@@ -0,0 +1,215 @@
+"""
+Python file which precomputes the collection statistics needed by the
+scorers and stores them in a json file next to the index
+( Example: inverted_index_corpus_stats.json)
+
+The file is of the form
+{"num_docs" : N, "total_terms" : |C|, "avg_doc_length" : avgdl,
+"doc_lengths" : [length_of_doc_id_0, length_of_doc_id_1, ....],
+"df" : {term : number_of_docs_containing_term},
+"cf" : {term : number_of_occurrences_of_term_in_collection},
+"bm25_k1" : k1, "bm25_b" : b,
+"bm25_max_saturation" : {term : max over the postings of (k1 + 1) * f / (K + f)}}
+
+The doc lengths are stored in the order of the integer doc ids of the doc
+table, so the scorers never have to load( or re-split) the cleaned corpus
+
+The BM25 max saturation of a term is the largest value the document dependent
+part of its BM25 score takes over its postings. It gives an upper bound on
+the BM25 contribution of the term that the dynamic pruning query processors
+( dynamic_pruning.py) use to skip documents
+"""
+
+import json
+import os
+import errno
+from pathlib import Path
+
+
+def collection_stats_fname(index_fname):
+    """
+    Helper function which returns the path of the statistics file that sits
+    next to an index
+    :param index_fname: path to the index( Example: inverted_index_corpus.json)
+    :return: the path to the statistics file( inverted_index_corpus_stats.json)
+    """
+    index_fname = Path(index_fname)
+    return index_fname.with_name(index_fname.stem + "_stats.json")
+
+
+def get_posting_freq(value):
+    """
+    Helper function which returns the term frequency from a posting of the
+    inverted index( freq) or of the positional index( [freq, [positions]])
+    """
+    if isinstance(value, list):
+        return value[0]
+    return value
+
+
+class CollectionStats:
+    """
+    The collection statistics used by the scorers
+    """
+
+    def __init__(self, doc_lengths, df, cf, total_terms=None, avg_doc_length=None,
+                 bm25_max_saturation=None, bm25_k1=None, bm25_b=None):
+        """
+        :param doc_lengths: list of the doc lengths, indexed on the integer
+        doc ids
+        :param df: dictionary of the form {term : document frequency}
+        :param cf: dictionary of the form {term : collection frequency}
+        :param bm25_max_saturation: dictionary of the form
+        {term : max (k1 + 1) * f / (K + f) over the postings of the term}
+        computed with the BM25 parameters bm25_k1 and bm25_b
+        """
+        self.doc_lengths = doc_lengths
+        self.df = df
+        self.cf = cf
+        self.bm25_max_saturation = bm25_max_saturation
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self.num_docs = len(doc_lengths)
+
+        if total_terms is None:
+            total_terms = sum(doc_lengths)
+        self.total_terms = total_terms
+
+        if avg_doc_length is None:
+            avg_doc_length = total_terms / self.num_docs
+        self.avg_doc_length = avg_doc_length
+
+    def doc_ids(self):
+        """
+        Function which returns all the integer doc ids in the collection
+        ( In the same order as the docs in the cleaned corpus)
+        """
+        return range(self.num_docs)
+
+    def doc_length(self, doc_id):
+        """
+        Function which returns the number of words in a document
+        """
+        return self.doc_lengths[doc_id]
+
+    def document_frequency(self, term):
+        """
+        Function which returns the number of docs containing the term
+        """
+        return self.df.get(term, 0)
+
+    def collection_frequency(self, term):
+        """
+        Function which returns the number of times the term occurs in the
+        entire collection
+        """
+        return self.cf.get(term, 0)
+
+    def to_dict(self):
+        """
+        Function which converts the statistics to a dictionary that can be
+        written to a json file
+        """
+        return {"num_docs": self.num_docs,
+                "total_terms": self.total_terms,
+                "avg_doc_length": self.avg_doc_length,
+                "doc_lengths": self.doc_lengths,
+                "df": self.df,
+                "cf": self.cf,
+                "bm25_k1": self.bm25_k1,
+                "bm25_b": self.bm25_b,
+                "bm25_max_saturation": self.bm25_max_saturation}
+
+
+def build_collection_stats(corpus_doc_lengths, inv_index, doc_table, k1=1.2, b=0.75):
+    """
+    Function which computes the collection statistics
+    :param corpus_doc_lengths: a dictionary of the form
+    {CACM_file_1 : number_of_words_in_file_1, ...}
+    counted by the indexers while they stream the corpus
+    :param inv_index: the inverted index( or the positional inverted index)
+    the df and cf of every term are computed from its postings
+    :param doc_table: the DocTable of the index
+    :param k1: BM25 parameter used for the max saturation of the terms
+    :param b: BM25 parameter used for the max saturation of the terms
+    :return: a CollectionStats
+    """
+
+    # Note: The doc lengths are the number of words in the cleaned document
+    # i.e the stop words are counted even for the stopped index
+    doc_lengths = [0] * len(doc_table)
+    for doc, length in corpus_doc_lengths.items():
+        doc_lengths[doc_table.doc_id(doc)] = length
+
+    avg_doc_length = sum(doc_lengths) / len(doc_lengths)
+
+    df = {}
+    cf = {}
+    max_saturation = {}
+    for term, postings in inv_index.items():
+        df[term] = len(postings)
+        cf[term] = sum(get_posting_freq(value) for value in postings.values())
+        max_saturation[term] = max_bm25_saturation(((get_posting_freq(value), doc_lengths[doc_table.doc_id(doc)])
+                                                    for doc, value in postings.items()),
+                                                   avg_doc_length, k1, b)
+
+    return CollectionStats(doc_lengths, df, cf, avg_doc_length=avg_doc_length,
+                           bm25_max_saturation=max_saturation, bm25_k1=k1, bm25_b=b)
+
+
+def max_bm25_saturation(postings, avg_doc_length, k1=1.2, b=0.75):
+    """
+    Function which computes the BM25 max saturation of a term
+    :param postings: an iterable of (term frequency, doc length) tuples, one
+    for every posting of the term
+    :param avg_doc_length: the average doc length of the collection
+    :param k1: BM25 parameter
+    :param b: BM25 parameter
+    :return: max (k1 + 1) * f / (K + f) over the postings
+    """
+
+    # Note: Same expressions as in new_bm25_scores, so that the upper bound
+    # is exactly the largest value the scorer can compute
+    max_saturation = 0
+    for f_i, doc_length in postings:
+        K = k1 * ((1 - b) + b * doc_length / avg_doc_length)
+        max_saturation = max(max_saturation, (k1 + 1) * f_i / (K + f_i))
+    return max_saturation
+
+
+def write_collection_stats(collection_stats, fname):
+    """
+    Function which writes the collection statistics to a json file
+    :param collection_stats: a CollectionStats
+    :param fname: the path to the json file
+    """
+
+    if os.path.dirname(fname) and not os.path.exists(os.path.dirname(fname)):
+        try:
+            os.makedirs(os.path.dirname(fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    with open(fname, "w+") as o_fd:
+        json.dump(collection_stats.to_dict(), o_fd)
+
+
+def load_collection_stats(fname):
+    """
+    Function which loads the collection statistics written at indexing time
+    :param fname: the path to the json file
+    :return: a CollectionStats
+    """
+
+    with open(fname) as fd:
+        data = json.load(fd)
+
+    # Note: Statistics files written before the BM25 upper bounds were added
+    # do not have the bm25 keys
+    return CollectionStats(data["doc_lengths"], data["df"], data["cf"],
+                           total_terms=data["total_terms"],
+                           avg_doc_length=data["avg_doc_length"],
+                           bm25_max_saturation=data.get("bm25_max_saturation"),
+                           bm25_k1=data.get("bm25_k1"),
+                           bm25_b=data.get("bm25_b"))
@@ -0,0 +1,412 @@
+"""
+Python file which stores the inverted index with compressed postings
+( see postings_codecs.py for the codecs) and compares the codecs
+
+The doc ids of every term are stored as gaps, the gaps and the term
+frequencies are encoded with one of the codecs( vbyte, gamma, delta, pfor)
+
+Layout of the compressed file( all integers are unsigned 32 bit, native byte
+order)
+    header          -> magic, version, codec id, num_docs, num_terms,
+                       doc_blob_len, term_blob_len
+    doc_offsets     -> num_docs + 1 offsets into the doc blob
+    term_offsets    -> num_terms + 1 offsets into the term blob
+    dfs             -> num_terms document frequencies
+    data_offsets    -> num_terms + 1 offsets into the postings data
+    doc_blob        -> utf-8 encoded doc names
+    term_blob       -> utf-8 encoded terms, sorted
+    data            -> for every term, its encoded gaps followed by its
+                       encoded term frequencies
+
+Run this file to write the CACM index and the stemmed index with every codec
+and print the size and the decode speed of the postings
+>>> python compressed_index.py -j all_paths.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import errno
+import struct
+import time
+from pathlib import Path
+import numpy as np
+from binary_index import BinaryInvertedIndex, binary_index_fname, load_inverted_index, pad_to_word
+from doc_table import DocTable, doc_table_fname, load_doc_table
+from postings_codecs import CODECS, CODEC_NAMES, gaps_from_doc_ids, doc_ids_from_gaps
+from postings_cursor import postings_lists
+
+
+# Magic bytes and version written at the start of every compressed index
+COMPRESSED_INDEX_MAGIC = b"IRCI"
+COMPRESSED_INDEX_VERSION = 1
+
+# magic, version, codec id, num_docs, num_terms, doc_blob_len, term_blob_len
+HEADER_FORMAT = "=4sIIIIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+def compressed_index_fname(json_fname, codec):
+    """
+    Helper function which returns the path of the compressed index that
+    sits next to a json inverted index
+    :param json_fname: path to the json inverted index
+    ( Example: inverted_index_corpus.json)
+    :param codec: the name of the codec
+    :return: the path inverted_index_corpus_vbyte.cidx
+    """
+    json_fname = Path(json_fname)
+    return json_fname.with_name(json_fname.stem + "_" + codec + ".cidx")
+
+
+def write_compressed_index(indexed_data, doc_names, out_fname, codec="vbyte"):
+    """
+    Function that writes an inverted index with compressed postings
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param doc_names: The list of doc names, the position of a doc name in
+    this list is its integer doc id
+    :param out_fname: The path to the compressed file
+    :param codec: the name of the codec( see postings_codecs.CODECS)
+    """
+
+    if codec not in CODECS:
+        raise ValueError("Unknown codec " + str(codec) + ", use one of " + ", ".join(CODEC_NAMES))
+    encode, _ = CODECS[codec]
+
+    if os.path.dirname(out_fname) and not os.path.exists(os.path.dirname(out_fname)):
+        try:
+            os.makedirs(os.path.dirname(out_fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    # The term dictionary is sorted on the utf-8 bytes of the terms, like the
+    # binary index, so that it can be binary searched
+    terms = sorted((term.encode("utf-8") for term in indexed_data))
+
+    doc_blob = b"".join(doc.encode("utf-8") for doc in doc_names)
+    doc_offsets = np.cumsum([0] + [len(doc.encode("utf-8")) for doc in doc_names], dtype=np.uint32)
+    term_blob = b"".join(terms)
+    term_offsets = np.cumsum([0] + [len(term) for term in terms], dtype=np.uint32)
+
+    dfs = np.zeros(len(terms), dtype=np.uint32)
+    data_offsets = np.zeros(len(terms) + 1, dtype=np.uint32)
+    data = []
+    for i, term in enumerate(terms):
+        doc_ids, freqs = postings_lists(indexed_data, term.decode("utf-8"))
+        encoded = encode(gaps_from_doc_ids(doc_ids)) + encode(np.asarray(freqs, dtype=np.uint64))
+        data.append(encoded)
+        dfs[i] = len(doc_ids)
+        data_offsets[i + 1] = data_offsets[i] + len(encoded)
+
+    with open(out_fname, "wb") as o_fd:
+        o_fd.write(struct.pack(HEADER_FORMAT, COMPRESSED_INDEX_MAGIC, COMPRESSED_INDEX_VERSION,
+                               CODEC_NAMES.index(codec), len(doc_names), len(terms), len(doc_blob), len(term_blob)))
+        for section in (doc_offsets, term_offsets, dfs, data_offsets):
+            o_fd.write(section.tobytes())
+        o_fd.write(pad_to_word(doc_blob))
+        o_fd.write(pad_to_word(term_blob))
+        for encoded in data:
+            o_fd.write(encoded)
+
+
+class CompressedInvertedIndex:
+    """
+    A read only inverted index with compressed postings
+    It supports the same read operations as the BinaryInvertedIndex, the
+    postings of a term are decoded every time they are read
+    """
+
+    def __init__(self, fname, int_doc_ids=False):
+        """
+        :param fname: path to the compressed index
+        :param int_doc_ids: If True, index[term] is keyed on the integer doc
+        ids, else on the doc names
+        """
+        self.fname = str(fname)
+        self.int_doc_ids = int_doc_ids
+        self._fd = open(self.fname, "rb")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, codec_id, self.num_docs, self.num_terms,
+         doc_blob_len, term_blob_len) = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if magic != COMPRESSED_INDEX_MAGIC:
+            raise ValueError("The file " + self.fname + " is not a compressed inverted index")
+        if version != COMPRESSED_INDEX_VERSION:
+            raise ValueError("The compressed index " + self.fname + " was written "
+                             "by another version, re-run compressed_index.py")
+
+        self.codec = CODEC_NAMES[codec_id]
+        _, self._decode = CODECS[self.codec]
+
+        # Views on top of the memory mapped file
+        offset = HEADER_SIZE
+        self._doc_offsets, offset = self._uint_view(offset, self.num_docs + 1)
+        self._term_offsets, offset = self._uint_view(offset, self.num_terms + 1)
+        self._dfs, offset = self._uint_view(offset, self.num_terms)
+        self._data_offsets, offset = self._uint_view(offset, self.num_terms + 1)
+
+        self._doc_blob = self._mm[offset: offset + doc_blob_len]
+        offset += doc_blob_len + (-doc_blob_len % 4)
+        self._term_blob = self._mm[offset: offset + term_blob_len]
+        offset += term_blob_len + (-term_blob_len % 4)
+        self._data = memoryview(self._mm)[offset:]
+
+        self._doc_names = None
+        self._term_id_cache = {}
+        self._postings_cache = {}
+
+    def _uint_view(self, offset, count):
+        """
+        Helper function which creates a view of count unsigned integers
+        starting at offset( read as Python integers, the binary search of the
+        term dictionary would spend more time in numpy scalars than in the
+        codecs)
+        :return: the view and the offset right after it
+        """
+        end = offset + 4 * count
+        return memoryview(self._mm)[offset:end].cast("I"), end
+
+    def data_size(self):
+        """
+        Function which returns the number of bytes of the encoded postings
+        """
+        return self._data_offsets[-1]
+
+    def term_id(self, term):
+        """
+        Function which binary searches the sorted term dictionary
+        :param term: the term to look for
+        :return: the position of the term in the dictionary, -1 if absent
+        """
+        if term in self._term_id_cache:
+            return self._term_id_cache[term]
+
+        key = term.encode("utf-8")
+        low, high = 0, self.num_terms - 1
+        result = -1
+        while low <= high:
+            mid = (low + high) // 2
+            mid_key = self._term_blob[self._term_offsets[mid]: self._term_offsets[mid + 1]]
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid - 1
+            else:
+                result = mid
+                break
+
+        self._term_id_cache[term] = result
+        return result
+
+    def doc_names(self):
+        """
+        Function which returns the list of all doc names, the position of a
+        doc name in this list is its integer doc id
+        """
+        if self._doc_names is None:
+            self._doc_names = [self._doc_blob[self._doc_offsets[i]: self._doc_offsets[i + 1]].decode("utf-8")
+                               for i in range(self.num_docs)]
+        return self._doc_names
+
+    def doc_table(self):
+        """
+        Function which returns the DocTable of the integer doc ids used in
+        the postings
+        """
+        return DocTable(self.doc_names())
+
+    def postings(self, term):
+        """
+        Function which decodes the postings of a term
+        :param term: the term
+        :return: a tuple (doc_ids, freqs) of integer arrays( views on the
+        decoded numpy uint32 arrays, read as Python integers like the postings
+        of the BinaryInvertedIndex) in increasing order of doc id. Both are
+        empty if the term is not indexed
+        """
+        term_id = self.term_id(term)
+        if term_id == -1:
+            return memoryview(np.empty(0, dtype=np.uint32)), memoryview(np.empty(0, dtype=np.uint32))
+
+        df = self._dfs[term_id]
+        encoded = self._data[self._data_offsets[term_id]: self._data_offsets[term_id + 1]]
+        gaps, used = self._decode(encoded, df)
+        freqs, _ = self._decode(encoded[used:], df)
+        return memoryview(doc_ids_from_gaps(gaps)), memoryview(freqs)
+
+    def document_frequency(self, term):
+        """
+        Function which returns the number of documents containing the term
+        """
+        term_id = self.term_id(term)
+        if term_id == -1:
+            return 0
+        return self._dfs[term_id]
+
+    def __contains__(self, term):
+        return self.term_id(term) != -1
+
+    def __getitem__(self, term):
+        if term in self._postings_cache:
+            return self._postings_cache[term]
+
+        if term not in self:
+            raise KeyError(term)
+
+        doc_ids, freqs = self.postings(term)
+        if self.int_doc_ids:
+            postings = dict(zip(doc_ids.tolist(), freqs.tolist()))
+        else:
+            names = self.doc_names()
+            postings = {names[doc_id]: freq for doc_id, freq in zip(doc_ids.tolist(), freqs.tolist())}
+        self._postings_cache[term] = postings
+        return postings
+
+    def get(self, term, default=None):
+        if term in self:
+            return self[term]
+        return default
+
+    def __len__(self):
+        return self.num_terms
+
+    def __iter__(self):
+        for term_id in range(self.num_terms):
+            yield self._term_blob[self._term_offsets[term_id]: self._term_offsets[term_id + 1]].decode("utf-8")
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for term in self:
+            yield term, self[term]
+
+    def close(self):
+        """
+        Function which releases the memory map and the file handle
+        """
+        self._postings_cache = {}
+        for view in (self._doc_offsets, self._term_offsets, self._dfs, self._data_offsets, self._data):
+            view.release()
+        self._mm.close()
+        self._fd.close()
+
+    def __getstate__(self):
+        # Note: The memory map can not be pickled, a copy of the index( Example:
+        # sent to a worker process) opens the file again
+        return {"fname": self.fname, "int_doc_ids": self.int_doc_ids}
+
+    def __setstate__(self, state):
+        self.__init__(state["fname"], state["int_doc_ids"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def time_decoding(indexed_data, terms):
+    """
+    Helper function which reads the postings of every term
+    :param indexed_data: a BinaryInvertedIndex or a CompressedInvertedIndex
+    :param terms: the terms to read
+    :return: a tuple (seconds, number of postings read)
+    """
+    num_postings = 0
+    start = time.perf_counter()
+    for term in terms:
+        doc_ids, freqs = indexed_data.postings(term)
+        num_postings += len(doc_ids)
+    return time.perf_counter() - start, num_postings
+
+
+def benchmark_codecs(json_fname, codecs=CODEC_NAMES):
+    """
+    Function which writes an inverted index with every codec and prints the
+    size of the postings and their decode speed
+    :param json_fname: the path to the json inverted index( create_index.py),
+    its binary index is used as the uncompressed baseline
+    :param codecs: the names of the codecs to compare
+    :return: a list of rows (codec, postings bytes, bits per posting, file
+    bytes, decode seconds, million postings decoded per second)
+    """
+    doc_table = load_doc_table(doc_table_fname(json_fname))
+    indexed_data = load_inverted_index(json_fname, doc_table)
+    terms = list(indexed_data)
+
+    rows = []
+    if isinstance(indexed_data, BinaryInvertedIndex):
+        # Uncompressed baseline: two 32 bit integers per posting
+        seconds, num_postings = time_decoding(indexed_data, terms)
+        rows.append(("raw", 8 * num_postings, 64.0, os.path.getsize(binary_index_fname(json_fname)),
+                     seconds, num_postings / seconds / 1e6))
+
+    for codec in codecs:
+        out_fname = compressed_index_fname(json_fname, codec)
+        write_compressed_index(indexed_data, doc_table.doc_names, out_fname, codec)
+
+        with CompressedInvertedIndex(out_fname, int_doc_ids=True) as compressed_index:
+            seconds, num_postings = time_decoding(compressed_index, terms)
+
+            # The compressed postings must be the same as the uncompressed ones
+            for term in terms:
+                doc_ids, freqs = compressed_index.postings(term)
+                expected_doc_ids, expected_freqs = postings_lists(indexed_data, term)
+                if list(doc_ids) != list(expected_doc_ids) or list(freqs) != list(expected_freqs):
+                    raise ValueError("The " + codec + " postings of " + term + " are not the same")
+
+            data_size = compressed_index.data_size()
+            rows.append((codec, data_size, 8 * data_size / num_postings, os.path.getsize(out_fname),
+                         seconds, num_postings / seconds / 1e6))
+
+    return rows
+
+
+def print_benchmark_table(index_name, json_fname, rows):
+    """
+    Helper function which prints the rows of benchmark_codecs as a table
+    """
+    print(index_name, "( json index", os.path.getsize(json_fname), "bytes)")
+    print("{:<8}{:>16}{:>14}{:>14}{:>12}{:>16}".format("codec", "postings bytes", "bits/posting",
+                                                       "file bytes", "decode s", "M postings/s"))
+    for codec, data_size, bits, file_size, seconds, throughput in rows:
+        print("{:<8}{:>16}{:>14.2f}{:>14}{:>12.3f}{:>16.2f}".format(codec, data_size, bits, file_size,
+                                                                    seconds, throughput))
+    print()
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-c", "--codecs", nargs="+", default=CODEC_NAMES,
+                    help="Enter the codecs to compare( " + ", ".join(CODEC_NAMES) + ")",
+                    required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    for index_name, path_key in (("CACM index", "indexer_output_json_file"),
+                                 ("Stemmed index", "stemmed_inverted_index")):
+        inverted_index_json_fname = Path(os.path.realpath(".") + all_paths_dict[path_key])
+        print_benchmark_table(index_name, inverted_index_json_fname,
+                              benchmark_codecs(inverted_index_json_fname, user_args["codecs"]))
@@ -0,0 +1,94 @@
+"""
+Python file which reads and writes the cleaned corpus one document at a time
+
+The corpus is stored as a JSON lines file( Example: cleaned_corpus.jsonl),
+one json record per line and per document, in the order of the documents
+{"doc": "CACM-0001", "text": "preliminary report-international ..."}
+{"doc": "CACM-0002", "text": "extraction of roots by ..."}
+
+The documents are written as soon as they are parsed and are read back with a
+generator, so neither the parser nor the indexers hold the whole corpus in
+memory
+
+Note: Corpus files written before this format( a single json dictionary of the
+form {doc_id : cleaned_contents}, Example: cleaned_corpus.json) can still be
+read, they are recognized by their .json extension. If a .jsonl corpus was not
+written yet, the .json corpus of the same name is read instead
+"""
+
+import json
+import os
+import errno
+from pathlib import Path
+
+
+def write_corpus(documents, fname):
+    """
+    Function which writes the corpus to a JSON lines file
+    :param documents: an iterable of (doc_id, cleaned_contents) tuples, it is
+    consumed one document at a time( can be a generator)
+    :param fname: the path to the .jsonl file
+    :return: the number of documents written
+    """
+
+    if os.path.dirname(fname) and not os.path.exists(os.path.dirname(fname)):
+        try:
+            os.makedirs(os.path.dirname(fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    num_docs = 0
+    with open(fname, "w+") as o_fd:
+        for doc, text in documents:
+            o_fd.write(json.dumps({"doc": doc, "text": text}) + "\n")
+            num_docs += 1
+
+    return num_docs
+
+
+def corpus_fname(fname):
+    """
+    Helper function which returns the corpus file to read
+    :param fname: the path to the .jsonl file
+    :return: fname, or the older .json corpus of the same name if there is no
+    .jsonl file( Example: cleaned_corpus.json before create_collection_data_dict.py
+    is run again)
+    """
+    fname = Path(fname)
+    if not fname.exists() and fname.suffix == ".jsonl" and fname.with_suffix(".json").exists():
+        return fname.with_suffix(".json")
+    return fname
+
+
+def iter_corpus(fname):
+    """
+    Generator which reads the corpus one document at a time
+    :param fname: the path to the .jsonl file( or to an older .json corpus)
+    :return: yields (doc_id, cleaned_contents) tuples in the order of the file
+    """
+
+    fname = corpus_fname(fname)
+    if fname.suffix == ".json":
+        # Older corpus file, a single dictionary that has to be loaded at once
+        with open(fname) as fd:
+            yield from json.load(fd).items()
+        return
+
+    with open(fname) as fd:
+        for line in fd:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record["doc"], record["text"]
+
+
+def load_corpus(fname):
+    """
+    Function which loads the whole corpus into a dictionary, for the scripts
+    that need to look up the documents by doc id
+    :param fname: the path to the .jsonl file( or to an older .json corpus)
+    :return: a dictionary of the form
+    {CACM_file_1 : parsed_tokenized_text_file_1, ...}
+    """
+    return dict(iter_corpus(fname))
@@ -1,7 +1,17 @@
 """
-Python file that will be used to generate a json file of the form
-{cacm_file_name_1 : parsed_taokenized_data_file_1,
-cacm_file_name_2 : parse_tokenized_data_file_2....}
+Python file that will be used to generate the cleaned corpus, a JSON lines
+file with one record per document( see corpus_stream.py)
+{"doc": cacm_file_name_1, "text": parsed_taokenized_data_file_1}
+{"doc": cacm_file_name_2, "text": parse_tokenized_data_file_2}....
+
+Every document is written as soon as it is parsed, the whole corpus is never
+held in memory
+
+The CACM documents are plain text wrapped in <html><pre>...</pre></html>, so by
+default the text is taken out with a lightweight extractor that only strips
+these tags. Any document with other markup( other tags, character references)
+is parsed with BeautifulSoup( html5lib) as before. Both give the same text.
+The documents can also be parsed by a pool of worker processes( -w).
 
 Credits -> https://tinyurl.com/yd4vz7c6
 """
@@ -14,7 +24,19 @@ from bs4 import BeautifulSoup
 import string
 import re
 import argparse
-import errno
+from concurrent.futures import ProcessPoolExecutor
+from corpus_stream import write_corpus
+
+
+# The only tags of the CACM documents
+CACM_TAGS = re.compile(r"</?(html|pre)>", re.IGNORECASE)
+
+# Characters that html5lib does not copy as is into the text: a "<" that
+# starts a tag or a comment, a "&" that starts a character reference and NUL
+NON_PLAIN_TEXT = re.compile(r"<[^\s\d]|&[^\s]|\x00")
+
+# Number of documents sent to a worker process at once
+PARSING_CHUNK_SIZE = 64
 
 
 def read_json_document(json_file_name):
@@ -35,15 +57,17 @@ def read_json_document(json_file_name):
     return data
 
 
-def store_data(json_fname):
+def store_data(json_fname, parser="fast", workers=1):
     """
     Function that will parse and tokenize all HTML files in the CACM collection
     :param json_fname: The file name containing all the relative paths
     Basically it is the json file "all_paths.json"
-    :return: Write to a .sjon file a dictionary of the format
-    # Note: The url_text_dict will be of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
+    :param parser: "fast" to use the lightweight extractor for the CACM
+    documents( BeautifulSoup is still used for any other markup) or
+    "html5lib" to parse every document with BeautifulSoup
+    :param workers: number of worker processes parsing the documents
+    :return: Write to a .jsonl file one record per document of the format
+    # {"doc": CACM_file_1, "text": parsed_tokenized_text_file_1}
     """
 
     # Get the absolute path of the folder containing the 3024 HTML documents
@@ -67,23 +91,14 @@ def store_data(json_fname):
     # Get the filename where you want to store the parsed and tokenized output
     parsed_tokenized_output_json_filename = Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"])
 
-    # Note: The url_text_dict will be of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
-    url_text_dict = perform_parsing_tokenization(non_dependent_path)
-
-    if not os.path.exists(os.path.dirname(parsed_tokenized_output_json_filename)):
-        try:
-            os.makedirs(os.path.dirname(parsed_tokenized_output_json_filename))
-        except OSError as exc:
-            if exc.errno != errno.EEXIST:
-                raise
+    # Note: The parsed documents are generated one by one as
+    # (CACM_file_1, parsed_tokenized_text_file_1),
+    # (CACM_file_2, parsed_tokenized_text_file_2) ...
+    parsed_documents = perform_parsing_tokenization(non_dependent_path, parser, workers)
 
-    # Write this dictionary to a json file
-    with open(parsed_tokenized_output_json_filename, "w+") as o_fd:
-        json.dump(url_text_dict, o_fd, indent=4)
-
-    # return url_text_dict
+    # Write every document to the .jsonl file as soon as it is parsed
+    num_docs = write_corpus(parsed_documents, parsed_tokenized_output_json_filename)
+    print("Wrote", num_docs, "documents to", parsed_tokenized_output_json_filename)
 
 
 def ignore_table_of_numbers(all_html_data, html_fname):
@@ -132,63 +147,104 @@ def ignore_table_of_numbers(all_html_data, html_fname):
     return None
 
 
-def perform_parsing_tokenization(folder_path):
+def perform_parsing_tokenization(folder_path, parser="fast", workers=1):
     """
-    Function that will perform the core of the parsing and the tokenization
+    Generator that will perform the core of the parsing and the tokenization
     :param folder_path: Path to the folder containing all the .html files
-    :return: a dictionary of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2"}
+    :param parser: "fast" or "html5lib"( see store_data)
+    :param workers: number of worker processes parsing the documents
+    :return: yields tuples of the form
+    # (CACM_file_1, parsed_tokenized_text_file_1),
+    # (CACM_file_2, parsed_tokenized_text_file_2) ...
+    in the order of the files
     """
 
-    # This will be the dictionary that will be returned
-    final_dict = {}
-
     # print("The folder path is ", folder_path)
 
-    # Iterate through the folder
-    for html_file in os.listdir(folder_path):
-        if html_file.endswith(".html"):
-            # Just a safety check, we need to parse only HTML files
-            # Get the doc id for this particular HTMl file
-            # for example html_file = "abcd.html"
-            # doc_id = "abcd"
-            doc_id = html_file[:-5]
+    # Just a safety check, we need to parse only HTML files
+    html_files = [html_file for html_file in os.listdir(folder_path) if html_file.endswith(".html")]
+    args = ([folder_path] * len(html_files), html_files, [parser] * len(html_files))
 
-            # Read the HTML contents of this file
-            with open(folder_path / html_file) as html_fd:
-                raw_html_data = html_fd.read()
+    if workers > 1:
+        # Note: map returns the results in the order of the files, so the
+        # documents come out in the same order as with a single process
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for doc_id, parsed_text in executor.map(parse_html_file, *args, chunksize=PARSING_CHUNK_SIZE):
+                if parsed_text is not None:
+                    yield doc_id, parsed_text
+        return
 
-            # Now, we have received the entire data present in the HTML file
-            # But, we have to ignore the last digits part
-            raw_html_data = ignore_table_of_numbers(raw_html_data, html_file)
+    for doc_id, parsed_text in map(parse_html_file, *args):
+        if parsed_text is not None:
+            yield doc_id, parsed_text
 
-            if raw_html_data is None:
-                # i.e the function ignore_table_of_numbers returned None
-                # which happens if PM or AM is not present in the text of the
-                # HTML file then we will not consider such a file at all
-                # Just continue
-                continue
 
-            # Now contents contains all the data in the HTMl file
-            # Create BeautifulSoup object
-            temp_bs4_obj = BeautifulSoup(raw_html_data, features="html5lib")
+def parse_html_file(folder_path, html_file, parser="fast"):
+    """
+    Function which parses and tokenizes one HTML file
+    :param folder_path: Path to the folder containing all the .html files
+    :param html_file: name of the HTML file
+    :param parser: "fast" or "html5lib"( see store_data)
+    :return: a tuple of the doc id and the parsed tokenized text( None if the
+    document is not considered)
+    """
 
-            # First get the title of this page
-            title = temp_bs4_obj.title
-            if title:
-                # If title is present
-                title_text = title.text
-            else:
-                title_text = " "
+    # Get the doc id for this particular HTMl file
+    # for example html_file = "abcd.html"
+    # doc_id = "abcd"
+    doc_id = html_file[:-5]
+
+    # Read the HTML contents of this file
+    with open(folder_path / html_file) as html_fd:
+        raw_html_data = html_fd.read()
+
+    # Now, we have received the entire data present in the HTML file
+    # But, we have to ignore the last digits part
+    raw_html_data = ignore_table_of_numbers(raw_html_data, html_file)
+
+    if raw_html_data is None:
+        # i.e the function ignore_table_of_numbers returned None
+        # which happens if PM or AM is not present in the text of the
+        # HTML file then we will not consider such a file at all
+        return doc_id, None
+
+    non_parsed_text = None
+    if parser == "fast":
+        non_parsed_text = extract_cacm_text(raw_html_data)
+
+    if non_parsed_text is None:
+        # Now contents contains all the data in the HTMl file
+        # Create BeautifulSoup object
+        temp_bs4_obj = BeautifulSoup(raw_html_data, features="html5lib")
+
+        # First get the title of this page
+        title = temp_bs4_obj.title
+        if title:
+            # If title is present
+            title_text = title.text
+        else:
+            title_text = " "
 
-            non_parsed_text = title_text + " " + temp_bs4_obj.text
+        non_parsed_text = title_text + " " + temp_bs4_obj.text
 
-            # Finally perform punctuation handling and write this
-            # and store the text in a dictionary
-            final_dict[doc_id] = perform_punctuation_handling(non_parsed_text).lower()
+    # Finally perform punctuation handling and write this
+    # and store the text in a dictionary
+    return doc_id, perform_punctuation_handling(non_parsed_text).lower()
 
-    return final_dict
+
+def extract_cacm_text(raw_html_data):
+    """
+    Lightweight extractor for the CACM documents( text inside <html><pre>)
+    :param raw_html_data: The HTML data passed in as string
+    :return: the text of the document, None if the document has any other
+    markup( it then needs a real HTML parser)
+    Note: The text is only used split on white spaces, so the white spaces
+    html5lib drops or keeps around the tags make no difference
+    """
+    text = CACM_TAGS.sub("", raw_html_data)
+    if NON_PLAIN_TEXT.search(text):
+        return None
+    return text
 
 
 def perform_punctuation_handling(text):
@@ -270,12 +326,24 @@ def parse_user_arguments():
                     help="Enter the path to the json file "
                          "which stores all the relative paths", required=True)
 
+    ap.add_argument("-p", "--parser",
+                    help="Enter the HTML parser, fast( default, falls back "
+                         "to BeautifulSoup for documents with other markup) "
+                         "or html5lib", choices=["fast", "html5lib"],
+                    default="fast", required=False)
+
+    ap.add_argument("-w", "--workers",
+                    help="Enter the number of worker processes parsing "
+                         "the documents( default 1)",
+                    type=int, default=1, required=False)
+
     return vars(ap.parse_args())
 
 
-# Accept the user arguments
-user_args = parse_user_arguments()
-all_paths_json_fname = user_args["all_paths_json_fname"]
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+    all_paths_json_fname = user_args["all_paths_json_fname"]
 
-# Now create the collection data and write it to a json file
-store_data(all_paths_json_fname)
\ No newline at end of file
+    # Now create the collection data and write it to a json file
+    store_data(all_paths_json_fname, user_args["parser"], user_args["workers"])
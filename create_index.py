@@ -11,41 +11,92 @@ import argparse
 from pathlib import Path
 import os
 import errno
+from binary_index import write_binary_index, binary_index_fname
+from doc_table import DocTable, write_doc_table, doc_table_fname
+from collection_stats import build_collection_stats, write_collection_stats, collection_stats_fname
+from corpus_stream import iter_corpus
+from spimi_index import create_spimi_index
+from parallel_index import parallel_build
 
 
-def create_inverted_index(collection_data_json_file, out_fname, stop_words=None):
+def create_inverted_index(collection_data_json_file, out_fname, stop_words=None, workers=1, k1=1.2, b=0.75):
     """
     Function that creates an inverted index
-    :param collection_data_json_file: Is the json file containing
-    data about the collection in the form
-    {# {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
+    :param collection_data_json_file: Is the .jsonl file containing
+    data about the collection, one record per document( see corpus_stream.py)
+    # {"doc": CACM_file_1, "text": parsed_tokenized_text_file_1}
+    The documents are read one at a time
     :param: out_fname - The path to the json file weher you want to store
     the inverted index
     :param: common_words - The list of all common words( by default it is None)
     A list of common words will be passed as and when required
+    :param workers: number of worker processes building partial indexes for
+    ranges of documents( see parallel_index.py), the index is the same
+    :param k1: BM25 parameter used for the max saturation of the terms
+    :param b: BM25 parameter used for the max saturation of the terms
     :return: write to a .json file a dictionary of the format
     {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
     term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
     """
 
-    with open(collection_data_json_file) as input_fd:
-        all_data = json.load(input_fd)
+    # We will iterate through the documents of the corpus, they are of the form
+    # (doc_id, parsed_output from doc_Id)
+    documents = iter_corpus(collection_data_json_file)
+
+    # doc_lengths -> the number of words of every document, in the order of
+    # the documents {doc_id : number of words}
+    if workers > 1:
+        inv_index, doc_lengths = parallel_build(documents, map_frequency_chunk, workers, stop_words=stop_words)
+    else:
+        inv_index, doc_lengths = map_frequency_chunk(documents, stop_words)
+
+    if not os.path.exists(os.path.dirname(out_fname)):
+        try:
+            os.makedirs(os.path.dirname(out_fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    # Write the inverted index to a specific.json file
+    with open(out_fname, "w+") as o_fd:
+        json.dump(inv_index, o_fd, indent=4)
+
+    # Write the doc table which maps the doc names to integer doc ids
+    # The integer doc ids follow the order of the docs in the collection
+    doc_table = DocTable(doc_lengths)
+    write_doc_table(doc_table, doc_table_fname(out_fname))
+
+    # Write the collection statistics( doc lengths, avgdl, |C|, df, cf) so
+    # that the scorers do not need to load the cleaned corpus
+    collection_stats = build_collection_stats(doc_lengths, inv_index, doc_table, k1, b)
+    write_collection_stats(collection_stats, collection_stats_fname(out_fname))
+
+    # Also write the memory mapped binary version of the index next to the
+    # json file. The scorers will pick it up instead of loading the json file
+    write_binary_index(inv_index, binary_index_fname(out_fname), doc_names=doc_table.doc_names,
+                       doc_lengths=collection_stats.doc_lengths)
 
-    # Create a dictionary to hold the inverted index
-    inv_index = {}
 
-    # Now all_data is a dictionary that is of the form
-    # {doc_id : parsed_output from doc_Id}
+def map_frequency_chunk(documents, stop_words=None):
+    """
+    Function that creates the inverted index of some documents( the whole
+    corpus, or a chunk of it in a worker process, see parallel_index.py)
+    :param documents: an iterable of (doc_id, parsed_output from doc_Id) tuples
+    :param stop_words: The list of stop words( by default it is None)
+    :return: a tuple of the inverted index of the documents
+    {term_1 : {doc_1 : term_1_freq_in_doc_1, ...}, ...} and of the doc lengths
+    {doc_id : number of words} in the order of the documents
+    """
 
-    # We will iterate through this dictionary
-    for doc in all_data:
-        # Read the contents of the document
-        doc_contents = all_data[doc]
+    # Create a dictionary to hold the inverted index
+    inv_index = {}
+    doc_lengths = {}
 
+    for doc, doc_contents in documents:
         # Note: doc_contents is a string
         # To count the number of words we will split this string into a list
         doc_content_list = doc_contents.split()
+        doc_lengths[doc] = len(doc_content_list)
 
         # Cut the ".txt" part from the filename
         filename = doc
@@ -57,16 +108,7 @@ def create_inverted_index(collection_data_json_file, out_fname, stop_words=None)
         # will be updated by the helper function
         # inverted_index_helper
 
-    if not os.path.exists(os.path.dirname(out_fname)):
-        try:
-            os.makedirs(os.path.dirname(out_fname))
-        except OSError as exc:
-            if exc.errno != errno.EEXIST:
-                raise
-
-    # Write the inverted index to a specific.json file
-    with open(out_fname, "w+") as o_fd:
-        json.dump(inv_index, o_fd, indent=4)
+    return inv_index, doc_lengths
 
 
 def inverted_index_helper(doc_content_list, filename, inv_index, stop_words):
@@ -132,6 +174,16 @@ def parse_user_arguments():
                     help="Enter true if you want to use stopwords",
                     required=False)
 
+    ap.add_argument("-M", "--memory_budget",
+                    help="Enter a memory budget in MB to build the index "
+                         "with sorted runs on disk( SPIMI, see spimi_index.py)",
+                    type=float, required=False)
+
+    ap.add_argument("-w", "--workers",
+                    help="Enter the number of worker processes building "
+                         "the index( default 1)",
+                    type=int, default=1, required=False)
+
     return vars(ap.parse_args())
 
 
@@ -140,6 +192,8 @@ if __name__ == "__main__":
     user_args = parse_user_arguments()
     all_paths_json_fname = user_args["all_paths_json_fname"]
     use_common_words = user_args["use_common_words"]
+    memory_budget = user_args["memory_budget"]
+    workers = user_args["workers"]
 
     # Load the all_paths.json file into a dictionary
     with open(all_paths_json_fname) as all_paths_fd:
@@ -171,6 +225,14 @@ if __name__ == "__main__":
             for line in common_words_fd:
                 common_words.append(line.rstrip())
 
-        create_inverted_index(collection_json_fname, stopped_queries_output_fname, stop_words=common_words)
+        if memory_budget is not None:
+            create_spimi_index(collection_json_fname, stopped_queries_output_fname, stop_words=common_words,
+                               memory_budget_mb=memory_budget)
+        else:
+            create_inverted_index(collection_json_fname, stopped_queries_output_fname, stop_words=common_words,
+                                  workers=workers)
     else:
-        create_inverted_index(collection_json_fname, inverted_index_output_fname)
\ No newline at end of file
+        if memory_budget is not None:
+            create_spimi_index(collection_json_fname, inverted_index_output_fname, memory_budget_mb=memory_budget)
+        else:
+            create_inverted_index(collection_json_fname, inverted_index_output_fname, workers=workers)
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Python file which maintains the document table, i.e the mapping between the
+external doc ids( Example: CACM-0074) and dense integer doc ids( 0, 1, 2 ..)
+
+The table is built once at indexing time( create_index.py and
+generate_position_based_index.py) and stored next to the index as a json
+list of the form
+["CACM-0001", "CACM-0002", ....]
+The position of a doc name in this list is its integer doc id
+
+The scorers work on the integer doc ids and the doc names are only looked up
+again when the run files are written
+"""
+
+import json
+import os
+import errno
+from pathlib import Path
+
+
+def doc_table_fname(index_fname):
+    """
+    Helper function which returns the path of the doc table that sits next to
+    an index
+    :param index_fname: path to the index( Example: inverted_index_corpus.json)
+    :return: the path to the doc table( inverted_index_corpus_doc_table.json)
+    """
+    index_fname = Path(index_fname)
+    return index_fname.with_name(index_fname.stem + "_doc_table.json")
+
+
+def normalize_doc_name(doc_name):
+    """
+    Helper function which normalizes a doc name so that zero padded and
+    non zero padded doc names can be matched against each other
+    :param doc_name: is the doc_id ( Example: CACM-74, CACM-0074)
+    :return: a tuple ( Example: ("CACM", 74))
+    """
+    prefix, _, number = doc_name.rpartition("-")
+    if number.isdigit():
+        return prefix, int(number)
+    return doc_name, None
+
+
+class DocTable:
+    """
+    A two way mapping between the doc names and the integer doc ids
+    """
+
+    def __init__(self, doc_names):
+        """
+        :param doc_names: a list of doc names, the position of a doc name in
+        this list is its integer doc id
+        """
+        self.doc_names = list(doc_names)
+        self._doc_ids = {doc: i for i, doc in enumerate(self.doc_names)}
+
+        # Lookup that ignores the zero padding of the doc names
+        # The cacm.rel.txt file refers to the docs as CACM-74 instead of
+        # CACM-0074
+        self._normalized_doc_ids = {normalize_doc_name(doc): i for i, doc in enumerate(self.doc_names)}
+
+    def __len__(self):
+        return len(self.doc_names)
+
+    def __contains__(self, doc_name):
+        return doc_name in self._doc_ids
+
+    def doc_id(self, doc_name):
+        """
+        Function which returns the integer doc id of a doc
+        :param doc_name: the doc name, zero padded( CACM-0074) or not( CACM-74)
+        :return: the integer doc id, None if the doc is not in the table
+        """
+        if doc_name in self._doc_ids:
+            return self._doc_ids[doc_name]
+        return self._normalized_doc_ids.get(normalize_doc_name(doc_name))
+
+    def doc_name(self, doc_id):
+        """
+        Function which returns the doc name given the integer doc id
+        """
+        return self.doc_names[doc_id]
+
+    def remap_corpus(self, corpus):
+        """
+        Function which re keys the corpus on the integer doc ids
+        :param corpus: a dictionary of the form
+        {CACM_file_1 : parsed_tokenized_text_file_1, ...}
+        :return: a dictionary of the form
+        {doc_id_1 : parsed_tokenized_text_file_1, ...}
+        """
+        return {self._doc_ids[doc]: text for doc, text in corpus.items()}
+
+    def remap_index(self, inv_index):
+        """
+        Function which re keys the postings of an inverted index( or a
+        positional inverted index) on the integer doc ids
+        :param inv_index: a dictionary of the form
+        {term_1 : {doc_1 : term_1_freq_in_doc_1, ...}, ...}
+        :return: a dictionary of the form
+        {term_1 : {doc_id_1 : term_1_freq_in_doc_1, ...}, ...}
+        """
+        doc_ids = self._doc_ids
+        return {term: {doc_ids[doc]: value for doc, value in postings.items()}
+                for term, postings in inv_index.items()}
+
+
+def write_doc_table(doc_table, fname):
+    """
+    Function which writes the doc table to a json file
+    :param doc_table: a DocTable
+    :param fname: the path to the json file
+    """
+
+    if os.path.dirname(fname) and not os.path.exists(os.path.dirname(fname)):
+        try:
+            os.makedirs(os.path.dirname(fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    with open(fname, "w+") as o_fd:
+        json.dump(doc_table.doc_names, o_fd)
+
+
+def load_doc_table(fname, corpus=None):
+    """
+    Function which loads the doc table written at indexing time
+    :param fname: the path to the json file
+    :param corpus: the corpus the index was built from. If the doc table was
+    not written yet( older index artifacts) the table is built from the order
+    of the docs in the corpus, which is what the indexers use
+    :return: a DocTable
+    """
+
+    if not os.path.exists(fname) and corpus is not None:
+        return DocTable(corpus)
+
+    with open(fname) as fd:
+        return DocTable(json.load(fd))
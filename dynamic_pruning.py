@@ -0,0 +1,535 @@
+"""
+Python file which contains the dynamic pruning query processors for BM25 top k
+retrieval( WAND, MaxScore and Block-Max WAND)
+
+All the processors walk the postings of the query terms document at a time and
+use an upper bound on the BM25 contribution of every query term to skip the
+documents that can not make it into the current top k. They return the same
+top k documents and scores as the exhaustive new_bm25_scores( documents with
+equal scores are ordered the same way, see first_term_position)
+
+The upper bound of a term is computed from the BM25 max saturation stored in
+the collection statistics at indexing time( see collection_stats.py)
+Block-Max WAND also uses the block summaries of the postings( largest term
+frequency and shortest doc of every block, see binary_index.py) to skip whole
+blocks of postings
+
+Credits ->
+WAND : Broder et al., Efficient query evaluation using a two-level retrieval process, 2003
+MaxScore : Turtle and Flood, Query evaluation: strategies and optimizations, 1995
+Block-Max WAND : Ding and Suel, Faster top-k document retrieval using block-max indexes, 2011
+"""
+
+import heapq
+import math
+from postings_cursor import BlockMaxCursor, END
+from parse_queries import parse_query_text_file
+from baseline_runs import get_relevance_information, parse_normal_query_text_file, select_queries, calculate_r_i, DEFAULT_TOP_K
+
+
+# Slack used when comparing upper bounds against the threshold, so that the
+# rounding of the floating point sums never prunes a document that could
+# make it into the top k
+EPSILON = 1e-9
+
+
+class BM25QueryTerm:
+    """
+    A query term along with its postings cursor and its BM25 constants
+    """
+
+    def __init__(self, term, query_position, count, q_fi, cursor, n_i, N, R, r_i, k1, k2, max_saturation):
+        """
+        :param term: the query term
+        :param query_position: position of the first occurrence of the term
+        in the query
+        :param count: number of times the term occurs in the query. Like in
+        new_bm25_scores, the term is scored once for every occurrence
+        :param q_fi: frequency of this term in the query
+        :param cursor: the BlockMaxCursor over the postings of the term
+        :param n_i: The number of documents containing this query term
+        :param N: Total number of documents in the collection
+        :param R: Total number of relevant documents for this query
+        :param r_i: number of relevant docs containing term i
+        :param max_saturation: max (k1 + 1) * f / (K + f) over the postings
+        """
+        self.term = term
+        self.query_position = query_position
+        self.count = count
+        self.q_fi = q_fi
+        self.cursor = cursor
+        self.n_i = n_i
+        self.N = N
+        self.R = R
+        self.r_i = r_i
+        self.k1 = k1
+        self.k2 = k2
+
+        # The contribution of one occurrence of the term is largest for the
+        # posting with the max saturation
+        self.max_saturation = max_saturation
+        self.max_contribution = self.contribution_from_saturation(max_saturation)
+
+        # Upper bound of the contribution of the term to the score of any
+        # document. A term can lower the score of a document( negative idf)
+        # but never below the score of a document that does not contain it
+        self.upper_bound = self.count * max(self.max_contribution, 0)
+
+    def contribution_from_saturation(self, saturation):
+        """
+        Function which computes the BM25 contribution of one occurrence of the
+        term given the saturation (k1 + 1) * f / (K + f) of a posting
+        Note: Same expressions as in new_bm25_scores
+        """
+        k2, q_fi = self.k2, self.q_fi
+        r_i, R, n_i, N = self.r_i, self.R, self.n_i, self.N
+
+        z = saturation * ((k2 + 1) * q_fi) / (k2 + q_fi)
+        numerator = ((r_i + 0.5) / (R - r_i + 0.5)) * z
+        denominator = ((n_i - r_i + 0.5) / (N - n_i - R + r_i + 0.5))
+        return math.log(numerator / denominator)
+
+    def contribution(self, f_i, K):
+        """
+        Function which computes the BM25 contribution of one occurrence of the
+        term for a document
+        :param f_i: frequency of this term in the document
+        :param K: the K of the document
+        """
+        return self.contribution_from_saturation((self.k1 + 1) * f_i / (K + f_i))
+
+
+class BM25PruningProcessor:
+    """
+    Document at a time BM25 query processor with WAND and MaxScore pruning
+    """
+
+    def __init__(self, collection_stats, indexed_data, k1=1.2, b=0.75, k2=100):
+        """
+        :param collection_stats: The CollectionStats of the collection
+        :param indexed_data: a BinaryInvertedIndex or an inverted index keyed
+        on integer doc ids
+        :param k1: BM25 parameter
+        :param b: BM25 parameter
+        :param k2: BM25 parameter
+        """
+        self.collection_stats = collection_stats
+        self.indexed_data = indexed_data
+        self.k1 = k1
+        self.b = b
+        self.k2 = k2
+        self.N = collection_stats.num_docs
+
+        # K only depends on the length of the document
+        self.K = [self.length_K(length) for length in collection_stats.doc_lengths]
+
+        # The max saturations of the statistics file can only be used if
+        # they were computed with the same k1 and b
+        self.max_saturation = None
+        if collection_stats.bm25_max_saturation is not None and \
+                (collection_stats.bm25_k1, collection_stats.bm25_b) == (k1, b):
+            self.max_saturation = collection_stats.bm25_max_saturation
+
+    def length_K(self, length):
+        """
+        Function which returns the K of a document of a given length
+        Note: Same expression as in new_bm25_scores
+        """
+        k1, b = self.k1, self.b
+        return k1 * ((1 - b) + b * length / self.collection_stats.avg_doc_length)
+
+    def block_upper_bound(self, t):
+        """
+        Function which returns the upper bound of the contribution of a term
+        to the score of any document in the block its cursor points to
+        :param t: a BM25QueryTerm
+        """
+        cursor = t.cursor
+        if cursor.block >= cursor.num_blocks():
+            # No block left, the term can not contribute anymore
+            return 0
+
+        f_i = cursor.block_max_freq()
+
+        # The saturation grows with the term frequency and shrinks with the
+        # length of the document
+        K = self.length_K(cursor.block_min_len())
+        saturation = min((self.k1 + 1) * f_i / (K + f_i), t.max_saturation)
+        return t.count * max(t.contribution_from_saturation(saturation), 0)
+
+    def term_max_saturation(self, term, cursor):
+        """
+        Function which returns the max saturation of a term, either from the
+        collection statistics or computed from its postings
+        """
+        if self.max_saturation is not None:
+            return self.max_saturation[term]
+
+        k1 = self.k1
+        return max((k1 + 1) * f_i / (self.K[doc] + f_i)
+                   for doc, f_i in zip(cursor.doc_ids, cursor.freqs))
+
+    def query_terms(self, query, rel_docs=None):
+        """
+        Function which creates the BM25QueryTerms of a query
+        :param query: the parsed query string
+        :param rel_docs: list of the integer doc ids relevant to this query
+        If given, the relevance information is taken into account
+        :return: a list of BM25QueryTerm, one per distinct query term that is
+        present in the index
+        """
+        query_list = query.split()
+
+        R = 0
+        if rel_docs is not None:
+            R = len(rel_docs)
+
+        terms = []
+        for term in dict.fromkeys(query_list):
+            cursor = BlockMaxCursor.for_term(self.indexed_data, term, self.collection_stats.doc_lengths)
+            if len(cursor) == 0:
+                continue
+
+            r_i = 0
+            if rel_docs is not None:
+                r_i = calculate_r_i(rel_docs, self.indexed_data, term)
+
+            count = query_list.count(term)
+            terms.append(BM25QueryTerm(term, query_list.index(term), count, count, cursor, len(cursor),
+                                       self.N, R, r_i, self.k1, self.k2,
+                                       self.term_max_saturation(term, cursor)))
+        return terms
+
+    def document_score(self, doc, matched_terms, query_list):
+        """
+        Function which computes the BM25 score of a document
+        :param doc: the integer doc id
+        :param matched_terms: the BM25QueryTerms whose cursors are on doc
+        :param query_list: the terms of the query in order
+        :return: a tuple of the BM25 score, summed in the same order as
+        new_bm25_scores, and the first_term_position of the document
+        """
+        K = self.K[doc]
+        contributions = {t.term: t.contribution(t.cursor.freq(), K) for t in matched_terms}
+
+        score = 0
+        for term in query_list:
+            if term in contributions:
+                score += contributions[term]
+
+        # new_bm25_scores keeps documents with equal scores in the order they
+        # were first scored, i.e on the first query term containing the
+        # document, then on the doc id( the order of the postings)
+        first_term_position = min(t.query_position for t in matched_terms)
+        return score, first_term_position
+
+    def wand(self, query, k, rel_docs=None):
+        """
+        Function which returns the top k documents for a query using WAND
+        :param query: the parsed query string
+        :param k: number of documents to return
+        :param rel_docs: list of the integer doc ids relevant to this query
+        :return: a tuple of the list [(doc_id_1, score_1), ...] sorted on the
+        score, and the pruning_report of the query
+        """
+        query_list = query.split()
+        terms = self.query_terms(query, rel_docs)
+
+        # Min heap of the current top k, of the form (score, -first_term_position, -doc)
+        top_k_heap = []
+        threshold = -math.inf
+        scored = 0
+
+        while True:
+            terms.sort(key=lambda t: t.cursor.doc)
+
+            # Find the pivot, the first term at which the sum of the upper
+            # bounds could beat the threshold
+            pivot = None
+            upper_bound_sum = 0
+            for i, t in enumerate(terms):
+                if t.cursor.doc == END:
+                    break
+                upper_bound_sum += t.upper_bound
+                if upper_bound_sum + EPSILON > threshold:
+                    pivot = i
+                    break
+
+            if pivot is None:
+                # No remaining document can make it into the top k
+                break
+
+            pivot_doc = terms[pivot].cursor.doc
+
+            if terms[0].cursor.doc == pivot_doc:
+                # All the cursors before the pivot are on the pivot doc
+                # Fully score the document
+                matched_terms = [t for t in terms if t.cursor.doc == pivot_doc]
+                score, first_term_position = self.document_score(pivot_doc, matched_terms, query_list)
+                scored += len(matched_terms)
+
+                threshold = push_top_k(top_k_heap, k, pivot_doc, first_term_position, score, threshold)
+
+                for t in matched_terms:
+                    t.cursor.next()
+            else:
+                # The documents before the pivot doc can not make it into the
+                # top k, skip them
+                for t in terms[:pivot]:
+                    t.cursor.advance(pivot_doc)
+
+        return sorted_top_k(top_k_heap), pruning_report(terms, scored)
+
+    def max_score(self, query, k, rel_docs=None):
+        """
+        Function which returns the top k documents for a query using MaxScore
+        Same arguments and return value as wand()
+        """
+        query_list = query.split()
+        terms = self.query_terms(query, rel_docs)
+
+        # The terms are sorted on their upper bound. The terms before
+        # first_essential are non essential: a document that only contains
+        # non essential terms can not make it into the top k
+        terms.sort(key=lambda t: t.upper_bound)
+        cumulative_upper_bound = []
+        upper_bound_sum = 0
+        for t in terms:
+            upper_bound_sum += t.upper_bound
+            cumulative_upper_bound.append(upper_bound_sum)
+
+        top_k_heap = []
+        threshold = -math.inf
+        first_essential = 0
+        scored = 0
+
+        while first_essential < len(terms):
+            essential_terms = terms[first_essential:]
+            doc = min(t.cursor.doc for t in essential_terms)
+            if doc == END:
+                break
+
+            matched_terms = []
+            partial_score = 0
+            K = self.K[doc]
+            for t in essential_terms:
+                if t.cursor.doc == doc:
+                    matched_terms.append(t)
+                    partial_score += t.count * t.contribution(t.cursor.freq(), K)
+
+            # Look up the non essential terms in decreasing order of upper
+            # bound, as long as the document can still make it into the top k
+            can_enter = True
+            for i in range(first_essential - 1, -1, -1):
+                if partial_score + cumulative_upper_bound[i] + EPSILON <= threshold:
+                    can_enter = False
+                    break
+
+                t = terms[i]
+                if t.cursor.advance(doc) == doc:
+                    matched_terms.append(t)
+                    partial_score += t.count * t.contribution(t.cursor.freq(), K)
+
+            scored += len(matched_terms)
+
+            if can_enter:
+                score, first_term_position = self.document_score(doc, matched_terms, query_list)
+                threshold = push_top_k(top_k_heap, k, doc, first_term_position, score, threshold)
+
+                # A higher threshold can turn more terms non essential
+                while first_essential < len(terms) and \
+                        cumulative_upper_bound[first_essential] + EPSILON <= threshold:
+                    first_essential += 1
+
+            for t in essential_terms:
+                if t.cursor.doc == doc:
+                    t.cursor.next()
+
+        return sorted_top_k(top_k_heap), pruning_report(terms, scored)
+
+
+    def block_max_wand(self, query, k, rel_docs=None):
+        """
+        Function which returns the top k documents for a query using
+        Block-Max WAND
+        Same arguments and return value as wand()
+        """
+        query_list = query.split()
+        terms = self.query_terms(query, rel_docs)
+
+        top_k_heap = []
+        threshold = -math.inf
+        scored = 0
+
+        while True:
+            terms.sort(key=lambda t: t.cursor.doc)
+
+            # Find the pivot with the upper bounds of the terms, like WAND
+            pivot = None
+            upper_bound_sum = 0
+            for i, t in enumerate(terms):
+                if t.cursor.doc == END:
+                    break
+                upper_bound_sum += t.upper_bound
+                if upper_bound_sum + EPSILON > threshold:
+                    pivot = i
+                    break
+
+            if pivot is None:
+                break
+
+            pivot_doc = terms[pivot].cursor.doc
+
+            # The terms after the pivot that are on the pivot doc also belong
+            # to the pivot
+            while pivot + 1 < len(terms) and terms[pivot + 1].cursor.doc == pivot_doc:
+                pivot += 1
+
+            # Refine the upper bound with the blocks that could hold the pivot
+            # doc. Only the block summaries are read here
+            block_upper_bound_sum = 0
+            for t in terms[:pivot + 1]:
+                t.cursor.shallow_advance(pivot_doc)
+                block_upper_bound_sum += self.block_upper_bound(t)
+
+            if block_upper_bound_sum + EPSILON > threshold:
+                if terms[0].cursor.doc == pivot_doc:
+                    matched_terms = terms[:pivot + 1]
+                    score, first_term_position = self.document_score(pivot_doc, matched_terms, query_list)
+                    scored += len(matched_terms)
+
+                    threshold = push_top_k(top_k_heap, k, pivot_doc, first_term_position, score, threshold)
+
+                    for t in matched_terms:
+                        t.cursor.next()
+                else:
+                    for t in terms[:pivot]:
+                        t.cursor.advance(pivot_doc)
+            else:
+                # No document up to the end of the smallest of these blocks
+                # can make it into the top k( the other terms are on a later
+                # doc), skip them
+                next_doc = min(t.cursor.block_last_doc() + 1 for t in terms[:pivot + 1])
+                if pivot + 1 < len(terms):
+                    next_doc = min(next_doc, terms[pivot + 1].cursor.doc)
+
+                for t in terms[:pivot + 1]:
+                    t.cursor.advance(next_doc)
+
+        return sorted_top_k(top_k_heap), pruning_report(terms, scored)
+
+
+def push_top_k(top_k_heap, k, doc, first_term_position, score, threshold):
+    """
+    Helper function which offers a document to the top k heap
+    :param top_k_heap: min heap of the form
+    [(score, -first_term_position, -doc), ...]
+    :param k: size of the top k
+    :param doc: the integer doc id
+    :param first_term_position: position in the query of the first query
+    term contained in the document
+    :param score: the score of the document
+    :param threshold: the current threshold
+    :return: the new threshold( the score of the k'th document, -inf while
+    the heap holds less than k documents)
+    """
+    # Note: On equal scores the document that new_bm25_scores would rank
+    # first compares greater
+    entry = (score, -first_term_position, -doc)
+    if len(top_k_heap) < k:
+        heapq.heappush(top_k_heap, entry)
+    elif entry > top_k_heap[0]:
+        heapq.heapreplace(top_k_heap, entry)
+    else:
+        return threshold
+
+    if len(top_k_heap) < k:
+        return -math.inf
+    return top_k_heap[0][0]
+
+
+def sorted_top_k(top_k_heap):
+    """
+    Helper function which converts the top k heap to a list of tuples of the
+    form [(doc_id_1, score_1), ...] sorted on the score
+    """
+    return [(-neg_doc, score) for score, _, neg_doc in sorted(top_k_heap, reverse=True)]
+
+
+def pruning_report(terms, scored):
+    """
+    Helper function which creates the report of a pruned query
+    :param terms: the BM25QueryTerms of the query, once processed
+    :param scored: number of postings that were scored
+    :return: a dictionary with the number of postings of the query terms,
+    the number of postings scored and skipped, the number of posting blocks
+    and the number of blocks decoded( at least one posting read) and skipped
+    """
+    total_postings = sum(len(t.cursor) for t in terms)
+    total_blocks = sum(t.cursor.num_blocks() for t in terms)
+    decoded_blocks = sum(t.cursor.decoded_blocks for t in terms)
+    return {"postings": total_postings,
+            "scored": scored,
+            "skipped": total_postings - scored,
+            "blocks": total_blocks,
+            "blocks_decoded": decoded_blocks,
+            "blocks_skipped": total_blocks - decoded_blocks}
+
+
+def pruned_bm25_scores(collection_stats, indexed_data, query_text_file_name, relevant_docs_fname, rel_info_enabled=False, normal_query_file=False, doc_table=None, top_k=DEFAULT_TOP_K, strategy="wand", query_ids=None, verbose=False):
+    """
+    Function that performs BM25 top k ranking with dynamic pruning
+    Takes the same arguments and returns the same dictionary as
+    baseline_runs.new_bm25_scores
+    :param top_k: None keeps every scored document( nothing can be pruned
+    then)
+    :param strategy: "wand", "maxscore" or "bmw"( Block-Max WAND)
+    :param verbose: If True, the postings and blocks skipped are printed for
+    every query and in total
+    """
+
+    bm25_scores_dict = {}
+
+    # Populate the dictionary with empty inner lists
+    for i in range(1, 65):
+        bm25_scores_dict[i] = []
+
+    rel_docs_dict = get_relevance_information(relevant_docs_fname, doc_table)
+
+    if not normal_query_file:
+        query_dict = parse_query_text_file(query_text_file_name)
+    else:
+        query_dict = parse_normal_query_text_file(query_text_file_name)
+
+    query_dict = select_queries(query_dict, query_ids)
+
+    processor = BM25PruningProcessor(collection_stats, indexed_data)
+    if strategy == "wand":
+        process_query = processor.wand
+    elif strategy == "maxscore":
+        process_query = processor.max_score
+    elif strategy == "bmw":
+        process_query = processor.block_max_wand
+    else:
+        raise ValueError("Unknown pruning strategy " + strategy)
+
+    if top_k is None:
+        top_k = collection_stats.num_docs
+
+    total = {"postings": 0, "skipped": 0, "blocks": 0, "blocks_decoded": 0, "blocks_skipped": 0}
+    for q in query_dict:
+        rel_docs = rel_docs_dict[q] if rel_info_enabled else None
+        bm25_scores_dict[q], report = process_query(query_dict[q], top_k, rel_docs)
+
+        if verbose:
+            print("Query ", q, " : skipped ", report["skipped"], " of ", report["postings"],
+                  " postings, decoded ", report["blocks_decoded"], " and skipped ",
+                  report["blocks_skipped"], " of ", report["blocks"], " blocks")
+        for key in total:
+            total[key] += report[key]
+
+    if verbose:
+        print(strategy, " skipped ", total["skipped"], " of ", total["postings"],
+              " postings in total, decoded ", total["blocks_decoded"], " and skipped ",
+              total["blocks_skipped"], " of ", total["blocks"], " blocks")
+    return bm25_scores_dict
@@ -9,6 +9,11 @@ import json
 import os
 from pathlib import Path
 import errno
+from doc_table import DocTable, write_doc_table, doc_table_fname
+from collection_stats import build_collection_stats, write_collection_stats, collection_stats_fname
+from corpus_stream import iter_corpus
+from parallel_index import parallel_build
+from positional_index import write_positional_index
 
 
 def read_json_document(json_file_name):
@@ -41,30 +46,79 @@ def parse_user_args():
                                                "all the paths to the "
                                                "test_collection", required=True)
 
+    ap.add_argument("-w", "--workers", help="Enter the number of worker "
+                                            "processes building the "
+                                            "index( default 1)",
+                    type=int, default=1, required=False)
+
     return vars(ap.parse_args())
 
 
-def create_position_index(corpus, pos_ind_fname):
+def create_position_index(corpus, pos_ind_fname, workers=1):
     """
     Function to create positional inverted index
+    :param corpus: an iterable of (doc_id, parsed_output from doc_Id) tuples
+    ( Example: the generator iter_corpus), consumed one document at a time
+    :param pos_ind_fname: the path to the json file of the positional index
+    :param workers: number of worker processes building partial indexes for
+    ranges of documents( see parallel_index.py), the index is the same
     :return: a dictionary of the form
     {term : { doc : [freq, [pos_1, pos_2, pos_3]]}
     """
 
-    # Create a dictionary to hold the inverted index
-    inv_index = {}
+    # doc_lengths -> the number of words of every document, in the order of
+    # the documents {doc_id : number of words}
+    if workers > 1:
+        inv_index, doc_lengths = parallel_build(corpus, map_positional_chunk, workers)
+    else:
+        inv_index, doc_lengths = map_positional_chunk(corpus)
 
-    # Now all_data is a dictionary that is of the form
-    # {doc_id : parsed_output from doc_Id}
+    if not os.path.exists(os.path.dirname(pos_ind_fname)):
+        try:
+            os.makedirs(os.path.dirname(pos_ind_fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
 
-    # We will iterate through this dictionary
-    for doc in corpus:
-        # Read the contents of the document
-        doc_contents = corpus[doc]
+    # Write the inverted index to a specific.json file
+    with open(pos_ind_fname, "w+") as o_fd:
+        json.dump(inv_index, o_fd, indent=4)
+
+    # Write the doc table which maps the doc names to integer doc ids
+    doc_table = DocTable(doc_lengths)
+    write_doc_table(doc_table, doc_table_fname(pos_ind_fname))
 
+    # Write the collection statistics( doc lengths, avgdl, |C|, df, cf)
+    write_collection_stats(build_collection_stats(doc_lengths, inv_index, doc_table),
+                           collection_stats_fname(pos_ind_fname))
+
+    # Write the compact positional index( postings and delta encoded
+    # positions in two memory mapped files, see positional_index.py) which
+    # is used by the exact match and the ordered proximity match
+    write_positional_index(inv_index, pos_ind_fname, doc_table.doc_names,
+                           [doc_lengths[doc] for doc in doc_table.doc_names])
+
+
+def map_positional_chunk(documents):
+    """
+    Function to create the positional inverted index of some documents( the
+    whole corpus, or a chunk of it in a worker process, see parallel_index.py)
+    :param documents: an iterable of (doc_id, parsed_output from doc_Id) tuples
+    :return: a tuple of the positional inverted index of the documents
+    {term : { doc : [freq, [pos_1, pos_2, pos_3]]} and of the doc lengths
+    {doc_id : number of words} in the order of the documents
+    """
+
+    # Create a dictionary to hold the inverted index
+    inv_index = {}
+    doc_lengths = {}
+
+    # We will iterate through the documents
+    for doc, doc_contents in documents:
         # Note: doc_contents is a string
         # To count the number of words we will split this string into a list
         doc_content_list = doc_contents.split()
+        doc_lengths[doc] = len(doc_content_list)
 
         # Cut the ".txt" part from the filename
         filename = doc
@@ -76,16 +130,7 @@ def create_position_index(corpus, pos_ind_fname):
         # will be updated by the helper function
         # inverted_index_helper
 
-    if not os.path.exists(os.path.dirname(pos_ind_fname)):
-        try:
-            os.makedirs(os.path.dirname(pos_ind_fname))
-        except OSError as exc:
-            if exc.errno != errno.EEXIST:
-                raise
-
-    # Write the inverted index to a specific.json file
-    with open(pos_ind_fname, "w+") as o_fd:
-        json.dump(inv_index, o_fd, indent=4)
+    return inv_index, doc_lengths
 
 
 def inverted_index_helper(doc_content_list, filename, inv_index):
@@ -121,28 +166,26 @@ def inverted_index_helper(doc_content_list, filename, inv_index):
                 inv_index[item].update({filename: [1, [i]]})
 
 
-# Get the user arguments
-user_args = parse_user_args()
-json_fname_relative_paths = user_args["json_fname"]
-
-# Note the file "all_paths.json" has all the relative paths
-# We will read this file and store the json file in a dictionary
-all_paths_dict = read_json_document(json_fname_relative_paths)
+if __name__ == "__main__":
+    # Get the user arguments
+    user_args = parse_user_args()
+    json_fname_relative_paths = user_args["json_fname"]
 
+    # Note the file "all_paths.json" has all the relative paths
+    # We will read this file and store the json file in a dictionary
+    all_paths_dict = read_json_document(json_fname_relative_paths)
 
-# Now we will load this json file into a dictionary
-# Note: url_text_dict is of the form
-# {CACM_file_1 : parsed_tokenized_text_file_1,
-# CACM_file_2 : parsed_tokenized_text_file_2}
 
-collection_data_fname = Path(os.path.realpath(".") +
-                             all_paths_dict[
-                                 "parsed_tokenized_output_json_file"])
+    # Now we will read the cleaned corpus one document at a time
+    # Note: the documents are generated as
+    # (CACM_file_1, parsed_tokenized_text_file_1),
+    # (CACM_file_2, parsed_tokenized_text_file_2) ...
 
-with open(collection_data_fname) as c_fd:
-    url_text_dict = json.load(c_fd)
+    collection_data_fname = Path(os.path.realpath(".") +
+                                 all_paths_dict[
+                                     "parsed_tokenized_output_json_file"])
 
 
-positional_inverted_fname = Path(os.path.realpath(".") + all_paths_dict["positional_index"])
+    positional_inverted_fname = Path(os.path.realpath(".") + all_paths_dict["positional_index"])
 
-create_position_index(url_text_dict, positional_inverted_fname)
+    create_position_index(iter_corpus(collection_data_fname), positional_inverted_fname, user_args["workers"])
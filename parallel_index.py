@@ -0,0 +1,165 @@
+"""
+Python file which builds the inverted indexes( frequency or positional) with a
+pool of worker processes, map-reduce style
+
+map    -> the corpus is cut into chunks of consecutive documents, every worker
+          builds the partial index of a chunk with the same helper as the
+          single process build( create_index.map_frequency_chunk,
+          generate_position_based_index.map_positional_chunk)
+reduce -> the partial indexes are merged in the order of the chunks
+
+The chunks cover consecutive ranges of documents and are merged in order, so
+the postings of every term are appended in the order of the documents and the
+terms are added in the order they first occur. The merged index is the same
+dictionary( same order) as the single process build, no re-sorting is needed
+
+Run this file to compare the build time of the single process loop with the
+worker pool
+>>> python parallel_index.py -j all_paths.json -w 4
+"""
+
+import argparse
+import collections
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from corpus_stream import iter_corpus
+
+
+# Number of documents sent to a worker at once
+DEFAULT_CHUNK_DOCS = 256
+
+
+def document_chunks(documents, chunk_docs=DEFAULT_CHUNK_DOCS):
+    """
+    Generator which cuts the documents into chunks of consecutive documents
+    :param documents: an iterable of (doc_id, cleaned_contents) tuples
+    :param chunk_docs: number of documents of a chunk
+    :return: yields lists of (doc_id, cleaned_contents) tuples
+    """
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) == chunk_docs:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def merge_partial_index(inv_index, doc_lengths, partial_index, partial_doc_lengths):
+    """
+    Function which merges the partial index of the next chunk into the index
+    :param inv_index: the index of the previous chunks {term : {doc : value}}
+    :param doc_lengths: the doc lengths of the previous chunks {doc : length}
+    :param partial_index: the partial index of the next chunk
+    :param partial_doc_lengths: the doc lengths of the next chunk
+    Note: The docs of the next chunk come after all the docs of the index, so
+    their postings are simply appended
+    """
+    for term, postings in partial_index.items():
+        if term in inv_index:
+            inv_index[term].update(postings)
+        else:
+            inv_index[term] = postings
+    doc_lengths.update(partial_doc_lengths)
+
+
+def parallel_build(documents, map_function, workers, chunk_docs=DEFAULT_CHUNK_DOCS, **map_kwargs):
+    """
+    Function which builds an index with a pool of worker processes
+    :param documents: an iterable of (doc_id, cleaned_contents) tuples
+    ( Example: the generator iter_corpus)
+    :param map_function: module level function that builds the partial index
+    of a chunk, map_function(chunk, **map_kwargs) -> (partial_index, doc_lengths)
+    :param workers: number of worker processes
+    :param chunk_docs: number of documents of a chunk
+    :param map_kwargs: the keyword arguments of map_function
+    :return: a tuple (inv_index, doc_lengths) where doc_lengths is of the form
+    {doc : number of words} in the order of the documents
+    """
+    inv_index = {}
+    doc_lengths = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only a few chunks are in flight at once, the corpus is still read
+        # one chunk at a time. The results are merged in the order of the chunks
+        pending = collections.deque()
+        for chunk in document_chunks(documents, chunk_docs):
+            pending.append(executor.submit(map_function, chunk, **map_kwargs))
+            if len(pending) >= 2 * workers:
+                merge_partial_index(inv_index, doc_lengths, *pending.popleft().result())
+        while pending:
+            merge_partial_index(inv_index, doc_lengths, *pending.popleft().result())
+
+    return inv_index, doc_lengths
+
+
+def benchmark_builds(collection_data_fname, max_workers, chunk_docs=DEFAULT_CHUNK_DOCS):
+    """
+    Function which times the single process build and the worker pool build
+    of the frequency and of the positional index( only the build, not the
+    writing of the files) and prints the speedups
+    :param collection_data_fname: the .jsonl file of the cleaned corpus
+    :param max_workers: the builds are timed with 2, .. max_workers workers
+    :param chunk_docs: number of documents of a chunk
+    """
+    # Note: Imported here, create_index.py and generate_position_based_index.py
+    # import this file
+    from create_index import map_frequency_chunk
+    from generate_position_based_index import map_positional_chunk
+
+    documents = list(iter_corpus(collection_data_fname))
+    print("The machine has", os.cpu_count(), "cores")
+
+    for kind, map_function in (("frequency", map_frequency_chunk), ("positional", map_positional_chunk)):
+        # The single process build: the helper loop over the whole corpus
+        start = time.perf_counter()
+        sequential_index, _ = map_function(documents)
+        sequential_time = time.perf_counter() - start
+        print(kind, "index, 1 process :", round(sequential_time, 3), "s")
+
+        for workers in range(2, max_workers + 1):
+            start = time.perf_counter()
+            parallel_index, _ = parallel_build(documents, map_function, workers, chunk_docs)
+            parallel_time = time.perf_counter() - start
+
+            same = parallel_index == sequential_index and list(parallel_index) == list(sequential_index)
+            print(kind, "index,", workers, "workers :", round(parallel_time, 3), "s, speedup",
+                  round(sequential_time / parallel_time, 2), "x, same index :", same)
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-w", "--workers",
+                    help="Enter the largest number of worker processes to time",
+                    type=int, default=4, required=False)
+
+    ap.add_argument("-k", "--chunk_docs",
+                    help="Enter the number of documents sent to a worker at once",
+                    type=int, default=DEFAULT_CHUNK_DOCS, required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    collection_json_fname = Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"])
+    benchmark_builds(collection_json_fname, user_args["workers"], user_args["chunk_docs"])
@@ -0,0 +1,88 @@
+"""
+Python file which splits the queries of a run across worker processes
+
+Every scorer( new_bm25_scores, tf_idf, jm_likelihood_scores, ...) takes a
+query_ids argument and only scores those queries. The query ids are dealt out
+to the workers, every worker runs the scorer on its share and the results are
+merged back into one dictionary, in the same order as a single process run
+( so write_top_100_scores_to_txt writes the same run file)
+
+Note: The scorer and its arguments are sent to the worker processes, so the
+scorer must be a module level function. A BinaryInvertedIndex is sent as its
+file name, every worker memory maps the file again
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from parse_queries import parse_query_text_file
+from baseline_runs import parse_normal_query_text_file
+
+
+def get_query_ids(query_text_file_name, normal_query_file=False):
+    """
+    Function which returns the ids of all the queries of a query file
+    :param query_text_file_name: The path to the file containing all the queries
+    :param normal_query_file: If True, the query file has one query per line
+    :return: the list of query ids in the order of the file
+    """
+    if not normal_query_file:
+        return list(parse_query_text_file(query_text_file_name))
+    return list(parse_normal_query_text_file(query_text_file_name))
+
+
+def score_query_share(scorer, args, kwargs, query_ids):
+    """
+    Function run by a worker process, scores a share of the queries
+    :param scorer: the scoring function
+    :param args: the positional arguments of the scorer
+    :param kwargs: the keyword arguments of the scorer
+    :param query_ids: the ids of the queries to score
+    :return: a dictionary {query_id : [(doc_1, doc_1_score), ....]} with only
+    these queries
+    """
+    scores = scorer(*args, query_ids=query_ids, **kwargs)
+    return {q: scores[q] for q in query_ids}
+
+
+def parallel_scores(workers, query_ids, scorer, *args, **kwargs):
+    """
+    Function which runs a scorer over all the queries with a pool of worker
+    processes
+    :param workers: number of worker processes. With 1 worker the scorer is
+    simply called in this process
+    :param query_ids: the ids of all the queries( see get_query_ids)
+    :param scorer: the scoring function, Example: new_bm25_scores
+    :param args: the positional arguments of the scorer
+    :param kwargs: the keyword arguments of the scorer
+    :return: Will return the same dictionary as the scorer
+    {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
+    """
+
+    if workers <= 1 or len(query_ids) <= 1:
+        return scorer(*args, **kwargs)
+
+    workers = min(workers, len(query_ids))
+
+    # Deal the queries out one by one, so that every worker gets a mix of
+    # short and long queries
+    shares = [query_ids[i::workers] for i in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        share_scores = list(executor.map(score_query_share,
+                                         [scorer] * workers,
+                                         [args] * workers,
+                                         [kwargs] * workers,
+                                         shares))
+
+    merged_scores = {}
+    for scores in share_scores:
+        merged_scores.update(scores)
+
+    # Same keys in the same order as the scorers: queries 1 to 64( empty if
+    # the query file does not have them) then the other queries of the file
+    scores_dict = {}
+    for i in range(1, 65):
+        scores_dict[i] = []
+    for q in query_ids:
+        scores_dict[q] = merged_scores[q]
+
+    return scores_dict
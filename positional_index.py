@@ -0,0 +1,295 @@
+"""
+Python file which stores the positional inverted index in two compact files
+instead of the {term : {doc : [freq, [pos_1, pos_2, pos_3]]}} json file
+
+positional_index.bin           -> the doc ids and the term frequencies of
+                                  every term( binary index, see binary_index.py)
+positional_index_positions.bin -> the positions of every posting, in the same
+                                  order as the postings of the binary index
+
+Layout of the positions file( all integers are unsigned 32 bit, native byte
+order)
+    header          -> magic, version, num_postings
+    offsets         -> num_postings + 1 offsets into the positions data
+    data            -> for every posting, its positions as gaps( the first
+                       position, then the difference with the previous
+                       position) encoded with variable byte
+
+Both files are memory mapped. The positions of a posting are only decoded when
+a query operator needs them for a candidate document, so the positional
+queries( query_engine.py) neither load the json index nor the cleaned corpus
+"""
+
+import bisect
+import mmap
+import struct
+import numpy as np
+from binary_index import BinaryIndexWriter, BinaryInvertedIndex, binary_index_fname
+from postings_codecs import bit_lengths, vbyte_encode, vbyte_decode
+from postings_intersection import intersect_postings
+
+
+# Magic bytes and version written at the start of every positions file
+POSITIONS_MAGIC = b"IRPS"
+POSITIONS_VERSION = 1
+
+# magic, version, num_postings
+HEADER_FORMAT = "=4sII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# The offsets are unsigned 32 bit, the encoded positions must fit in 4 GB
+MAX_POSITIONS_BYTES = 2 ** 32 - 1
+
+
+def positions_fname(json_fname):
+    """
+    Helper function which returns the path of the positions file that sits
+    next to a json positional index
+    :param json_fname: path to the json positional index
+    ( Example: positional_index.json)
+    :return: the path positional_index_positions.bin
+    """
+    return binary_index_fname(json_fname).with_name(binary_index_fname(json_fname).stem + "_positions.bin")
+
+
+def write_positional_index(inv_index, json_fname, doc_names, doc_lengths=None):
+    """
+    Function which writes the compact positional index next to the json
+    positional index
+    The terms, the postings and the positions are written in sorted order, so
+    the files only depend on the content of the index( not on the order of the
+    dictionaries or on the PYTHONHASHSEED)
+    :param inv_index: the positional inverted index of the form
+    {term : { doc : [freq, [pos_1, pos_2, pos_3]]}}
+    :param json_fname: path to the json positional index, the binary index
+    and the positions file are named after it
+    :param doc_names: The list of doc names, the position of a doc name in
+    this list is its integer doc id
+    :param doc_lengths: The list of doc lengths, indexed on the integer doc ids
+    Raises a ValueError if the encoded positions do not fit the 32 bit offsets
+    of the positions file
+    """
+    doc_id_lookup = {doc: i for i, doc in enumerate(doc_names)}
+
+    # The position gaps of all the postings, and the number of positions of
+    # every posting
+    gaps = []
+    counts = []
+    with BinaryIndexWriter(binary_index_fname(json_fname), doc_names, doc_lengths) as writer:
+        # Same order as write_binary_index: terms sorted on their utf-8 bytes,
+        # postings sorted on the doc id
+        for term in sorted(inv_index, key=lambda t: t.encode("utf-8")):
+            postings = sorted((doc_id_lookup[doc], value) for doc, value in inv_index[term].items())
+            writer.add_term(term, [doc_id for doc_id, _ in postings], [value[0] for _, value in postings])
+
+            for _, (_, positions) in postings:
+                previous = 0
+                for position in sorted(positions):
+                    gaps.append(position - previous)
+                    previous = position
+                counts.append(len(positions))
+
+    # Encode all the gaps at once, the offset of a posting is the number of
+    # bytes taken by the gaps of the postings before it
+    gaps = np.asarray(gaps, dtype=np.uint64)
+    value_bytes = np.maximum(1, (bit_lengths(gaps) + 6) // 7)
+    offsets = np.zeros(len(counts) + 1, dtype=np.uint64)
+    np.cumsum(np.add.reduceat(value_bytes, np.cumsum([0] + counts[:-1])) if counts else [], out=offsets[1:])
+
+    # Note: The offsets would wrap around silently when written as 32 bit
+    # integers, no positions file is written rather than a corrupt one( and
+    # the one of an older index does not stay next to the new binary index)
+    if offsets[-1] > MAX_POSITIONS_BYTES:
+        positions_fname(json_fname).unlink(missing_ok=True)
+        raise ValueError("The positions of " + str(json_fname) + " take " + str(int(offsets[-1])) +
+                         " bytes, the positions file can only address " + str(MAX_POSITIONS_BYTES))
+
+    with open(positions_fname(json_fname), "wb") as o_fd:
+        o_fd.write(struct.pack(HEADER_FORMAT, POSITIONS_MAGIC, POSITIONS_VERSION, len(counts)))
+        o_fd.write(offsets.astype(np.uint32).tobytes())
+        o_fd.write(vbyte_encode(gaps))
+
+
+class TermPositions:
+    """
+    The postings of one term of a PositionalIndex
+    It behaves like the {doc_id : [freq, [pos_1, pos_2, pos_3]]} dictionary of
+    the json positional index, the positions of a doc are decoded when it is
+    looked up
+    """
+
+    def __init__(self, positional_index, term):
+        """
+        :param positional_index: the PositionalIndex
+        :param term: the term
+        """
+        self.positional_index = positional_index
+        self.start, _ = positional_index.postings_index.postings_range(term)
+        self.doc_ids, self.freqs = positional_index.postings_index.postings(term)
+
+    def _find(self, doc_id):
+        """
+        Helper function which returns the position of a doc in the postings
+        of the term, -1 if the term is not in the doc
+        """
+        i = bisect.bisect_left(self.doc_ids, doc_id)
+        if i < len(self.doc_ids) and self.doc_ids[i] == doc_id:
+            return i
+        return -1
+
+    def __contains__(self, doc_id):
+        return self._find(doc_id) != -1
+
+    def __getitem__(self, doc_id):
+        i = self._find(doc_id)
+        if i == -1:
+            raise KeyError(doc_id)
+        return [self.freqs[i], self.positional_index.positions(self.start + i, self.freqs[i])]
+
+    def get(self, doc_id, default=None):
+        if doc_id in self:
+            return self[doc_id]
+        return default
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __iter__(self):
+        return iter(self.doc_ids)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for doc_id in self:
+            yield doc_id, self[doc_id]
+
+
+class PositionalIndex:
+    """
+    A read only, memory mapped positional index keyed on the integer doc ids
+    index[term] is a TermPositions
+    """
+
+    def __init__(self, json_fname):
+        """
+        :param json_fname: path to the json positional index, the binary index
+        and the positions file next to it are opened
+        """
+        self.postings_index = BinaryInvertedIndex(binary_index_fname(json_fname), int_doc_ids=True)
+
+        self.fname = str(positions_fname(json_fname))
+        self._fd = open(self.fname, "rb")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.num_postings = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if magic != POSITIONS_MAGIC:
+            raise ValueError("The file " + self.fname + " is not a positions file")
+        if version != POSITIONS_VERSION:
+            raise ValueError("The positions file " + self.fname + " was written "
+                             "by another version, re-run generate_position_based_index.py")
+
+        offset = HEADER_SIZE
+        end = offset + 4 * (self.num_postings + 1)
+        self._offsets = memoryview(self._mm)[offset:end].cast("I")
+        self._data = memoryview(self._mm)[end:]
+
+        # The TermPositions of the terms already looked up
+        self._term_positions_cache = {}
+
+    def positions(self, posting, freq):
+        """
+        Function which decodes the positions of a posting
+        :param posting: the number of the posting in the index( see
+        BinaryInvertedIndex.postings_range)
+        :param freq: the term frequency of the posting( number of positions)
+        :return: the list of positions, in increasing order
+        """
+        gaps, _ = vbyte_decode(self._data[self._offsets[posting]: self._offsets[posting + 1]], freq)
+        return np.cumsum(gaps, dtype=np.int64).tolist()
+
+    def doc_table(self):
+        """
+        Function which returns the DocTable of the integer doc ids
+        """
+        return self.postings_index.doc_table()
+
+    def postings(self, term):
+        """
+        Function which returns the doc ids and the term frequencies of a term
+        ( see BinaryInvertedIndex.postings), without the positions
+        """
+        return self.postings_index.postings(term)
+
+    def document_frequency(self, term):
+        """
+        Function which returns the number of documents containing the term
+        """
+        return self.postings_index.document_frequency(term)
+
+    def __contains__(self, term):
+        return term in self.postings_index
+
+    def __getitem__(self, term):
+        if term in self._term_positions_cache:
+            return self._term_positions_cache[term]
+        if term not in self:
+            raise KeyError(term)
+
+        term_positions = TermPositions(self, term)
+        self._term_positions_cache[term] = term_positions
+        return term_positions
+
+    def get(self, term, default=None):
+        if term in self:
+            return self[term]
+        return default
+
+    def __len__(self):
+        return len(self.postings_index)
+
+    def __iter__(self):
+        return iter(self.postings_index)
+
+    def keys(self):
+        return iter(self)
+
+    def close(self):
+        """
+        Function which releases the memory maps and the file handles
+        """
+        self._term_positions_cache.clear()
+        self.postings_index.close()
+        self._offsets.release()
+        self._data.release()
+        self._mm.close()
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def candidate_docs(positional_index, terms):
+    """
+    Function which returns the docs containing all the terms, the only docs
+    on which the positions need to be looked at
+    :param positional_index: the PositionalIndex
+    :param terms: the query terms
+    :return: a sorted list of integer doc ids, all the docs if there are no
+    terms
+    """
+    # Note: Sorted, so that the order the terms are intersected in does not
+    # depend on the PYTHONHASHSEED
+    terms = sorted(set(terms))
+    if not terms:
+        return list(range(len(positional_index.doc_table())))
+    if any(term not in positional_index for term in terms):
+        return []
+
+    # Intersect the rarest term first with the skip pointers of the other
+    # postings( see postings_intersection.py), so the cost grows with the
+    # length of the shortest postings and not with the size of the corpus
+    return intersect_postings(positional_index.postings_index, terms)
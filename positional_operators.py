@@ -0,0 +1,281 @@
+"""
+Python file which evaluates the positional query operators on the compact
+positional index( see positional_index.py)
+
+Every operator works in two steps
+1) The postings of the query terms are intersected, rarest term first, to get
+   the candidate docs( candidate_docs). Only these docs can match
+2) The positions of the query terms are decoded for the candidate docs only
+   and merged to find the matches inside the doc
+
+phrase_matches          -> the docs in which the query terms appear next to
+                           each other, in the order of the query
+ordered_window_matches  -> #odN, the query terms appear in the order of the
+                           query, at most N positions after each other
+unordered_window_matches-> #uwN, the query terms appear in any order inside a
+                           window of N positions
+
+The window operators use minimal interval semantics: the matches of a doc are
+the minimal intervals of the doc containing the query terms( an interval
+is minimal if no other interval containing the terms lies inside it). The
+minimal intervals are found in one pass over the position lists, and the
+score of a doc is the number of minimal intervals that fit the window( for
+#odN, the terms can be picked inside the interval in order, every term at
+most N positions after the term before it)
+"""
+
+import bisect
+from collections import Counter
+from positional_index import candidate_docs
+
+
+def merge_phrase_positions(starts, positions, offset):
+    """
+    Function which keeps the phrase starts that are followed by a term at a
+    given distance
+    Both lists are sorted, they are merged in one pass
+    :param starts: sorted list of the positions where the phrase may start
+    :param positions: sorted list of the positions of the next phrase term
+    :param offset: distance of the next phrase term from the phrase start
+    ( its position in the phrase)
+    :return: the sorted list of the starts s for which s + offset is in
+    positions
+    """
+    result = []
+    i = j = 0
+    while i < len(starts) and j < len(positions):
+        expected = starts[i] + offset
+        if positions[j] < expected:
+            j += 1
+        elif positions[j] > expected:
+            i += 1
+        else:
+            result.append(starts[i])
+            i += 1
+            j += 1
+    return result
+
+
+def phrase_positions(positional_index, terms, doc):
+    """
+    Function which returns where a phrase starts in a doc
+    :param positional_index: the PositionalIndex
+    :param terms: the phrase terms, in the order of the query( a term may be
+    repeated)
+    :param doc: the integer doc id, the doc must contain all the terms
+    :return: the sorted list of the positions of the first term of every
+    occurrence of the phrase in the doc
+    """
+    starts = positional_index[terms[0]][doc][1]
+    for offset, term in enumerate(terms[1:], start=1):
+        if not starts:
+            break
+        starts = merge_phrase_positions(starts, positional_index[term][doc][1], offset)
+    return starts
+
+
+def phrase_matches(positional_index, terms):
+    """
+    Function which finds the docs containing a phrase
+    :param positional_index: the PositionalIndex
+    :param terms: the phrase terms, in the order of the query
+    :return: a list of (doc_id, number of occurrences of the phrase in the doc)
+    tuples in increasing order of doc id, only for the docs containing the
+    phrase
+    """
+    if not terms:
+        return []
+
+    matches = []
+    for doc in candidate_docs(positional_index, terms):
+        starts = phrase_positions(positional_index, terms, doc)
+        if starts:
+            matches.append((doc, len(starts)))
+    return matches
+
+
+def ordered_intervals(position_lists):
+    """
+    Function which finds the minimal intervals containing the terms in order
+    :param position_lists: the sorted position lists of the terms in the
+    order of the query( the same list may appear more than once)
+    :return: a list of chains, one per minimal interval in increasing order
+    of start. A chain is the list of the positions of the terms, the first
+    one is the start of the interval and the last one its end
+    """
+    intervals = []
+    start = -1
+    while True:
+        # Earliest chain starting after the previous interval: every term is
+        # the first occurrence after the term before it
+        chain = []
+        previous = start
+        for positions in position_lists:
+            i = bisect.bisect_right(positions, previous)
+            if i == len(positions):
+                return intervals
+            previous = positions[i]
+            chain.append(previous)
+
+        # Tighten the chain from its end: every term is the last occurrence
+        # before the term after it, so the interval is minimal
+        for t in range(len(position_lists) - 2, -1, -1):
+            positions = position_lists[t]
+            chain[t] = positions[bisect.bisect_left(positions, chain[t + 1]) - 1]
+
+        intervals.append(chain)
+        start = chain[0]
+
+
+def unordered_intervals(position_lists):
+    """
+    Function which finds the minimal intervals containing the terms in any
+    order
+    :param position_lists: the sorted position lists of the terms, a list
+    that appears k times must have k positions inside the interval
+    :return: a list of (start, end) tuples, one per minimal interval, in
+    increasing order of start
+    """
+    # Number of positions needed from every distinct list
+    needed = Counter(id(positions) for positions in position_lists)
+    lists = {id(positions): positions for positions in position_lists}
+
+    # All the positions of the terms, in increasing order
+    events = sorted((position, key) for key, positions in lists.items() for position in positions)
+
+    # Sliding window over the events: for every end the start is moved
+    # forward as long as the window still contains the terms. The interval is
+    # minimal when its start is after the start of the last interval found
+    intervals = []
+    in_window = Counter()
+    missing = len(position_lists)
+    left = 0
+    for right_position, key in events:
+        in_window[key] += 1
+        if in_window[key] <= needed[key]:
+            missing -= 1
+        if missing:
+            continue
+
+        while in_window[events[left][1]] > needed[events[left][1]]:
+            in_window[events[left][1]] -= 1
+            left += 1
+
+        if not intervals or events[left][0] > intervals[-1][0]:
+            intervals.append((events[left][0], right_position))
+    return intervals
+
+
+def ordered_window_count(positional_index, terms, window, doc):
+    """
+    Function which counts the matches of #odN in a doc
+    :param positional_index: the PositionalIndex
+    :param terms: the query terms, in the order of the query
+    :param window: N, a term may be at most N positions after the term before
+    it( N = 1 is a phrase)
+    :param doc: the integer doc id, the doc must contain all the terms
+    :return: the number of minimal ordered intervals in which every term is
+    at most window positions after the term before it
+    """
+    position_lists = [positional_index[term][doc][1] for term in terms]
+    return sum(1 for chain in ordered_intervals(position_lists)
+               if fits_ordered_window(position_lists, chain[0], chain[-1], window))
+
+
+def fits_ordered_window(position_lists, start, end, window):
+    """
+    Function which checks whether the terms can be picked in order inside an
+    interval, every term at most window positions after the term before it
+    Note: The chain of ordered_intervals is only one way of picking the terms
+    inside the interval, another one may fit the window when it does not
+    ( Example: 0, 3, 4 does not fit #od2 but 0, 2, 4 does when the second
+    term is at 2 and 3)
+    :param position_lists: the sorted position lists of the terms in the
+    order of the query
+    :param start: the first position of the interval( a position of the first
+    term)
+    :param end: the last position of the interval
+    :param window: largest distance between two consecutive terms
+    :return: True if the terms can be picked
+    """
+    # Forward pass over the terms: the positions of a term that can be
+    # reached from the start, i.e. the positions p for which the last
+    # reachable position of the term before it, before p, is at least
+    # p - window
+    reachable = [start]
+    for positions in position_lists[1:]:
+        first = bisect.bisect_right(positions, reachable[0])
+        last = bisect.bisect_right(positions, min(end, reachable[-1] + window))
+
+        next_reachable = []
+        j = 0
+        for position in positions[first:last]:
+            while j + 1 < len(reachable) and reachable[j + 1] < position:
+                j += 1
+            if position - reachable[j] <= window:
+                next_reachable.append(position)
+
+        if not next_reachable:
+            return False
+        reachable = next_reachable
+    return True
+
+
+def unordered_window_count(positional_index, terms, window, doc):
+    """
+    Function which counts the matches of #uwN in a doc
+    :param positional_index: the PositionalIndex
+    :param terms: the query terms, in any order
+    :param window: N, the number of positions of the window
+    :param doc: the integer doc id, the doc must contain all the terms
+    :return: the number of minimal intervals containing all the terms which
+    are at most window positions long
+    """
+    # Note: The same term object is reused for repeated terms, so that the
+    # interval has to hold as many occurrences as the query
+    term_positions = {term: positional_index[term][doc][1] for term in terms}
+    position_lists = [term_positions[term] for term in terms]
+    return sum(1 for start, end in unordered_intervals(position_lists) if end - start + 1 <= window)
+
+
+def window_matches(positional_index, terms, window, count_function):
+    """
+    Helper function which runs a window operator on the docs containing all
+    the terms
+    :return: a list of (doc_id, number of matching windows) tuples in
+    increasing order of doc id, only for the docs with at least one match
+    """
+    if not terms:
+        return []
+
+    matches = []
+    for doc in candidate_docs(positional_index, terms):
+        count = count_function(positional_index, terms, window, doc)
+        if count:
+            matches.append((doc, count))
+    return matches
+
+
+def ordered_window_matches(positional_index, terms, window):
+    """
+    Function which finds the docs matching #odN
+    :param positional_index: the PositionalIndex
+    :param terms: the query terms, in the order of the query
+    :param window: N, a term may be at most N positions after the term before
+    it
+    :return: a list of (doc_id, number of matching windows) tuples in
+    increasing order of doc id
+    """
+    return window_matches(positional_index, terms, window, ordered_window_count)
+
+
+def unordered_window_matches(positional_index, terms, window):
+    """
+    Function which finds the docs matching #uwN
+    :param positional_index: the PositionalIndex
+    :param terms: the query terms, in any order
+    :param window: N, the number of positions of the window
+    :return: a list of (doc_id, number of matching windows) tuples in
+    increasing order of doc id
+    """
+    return window_matches(positional_index, terms, window, unordered_window_count)
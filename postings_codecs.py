@@ -0,0 +1,517 @@
+"""
+Python file which contains the integer codecs used to compress the postings
+( see compressed_index.py)
+
+Every codec turns a list of non negative integers into bytes and back
+    encode(values)          -> bytes
+    decode(buffer, count)   -> (numpy uint32 array of count values,
+                                number of bytes read)
+The doc ids of a postings list are first turned into gaps( the first doc id,
+then the difference with the previous doc id) so that the values are small
+
+vbyte -> variable byte, 7 bits of the value per byte, lowest bits first, the
+         high bit marks the last byte of a value
+gamma -> Elias gamma, N zeros followed by the N + 1 bits of the value
+         ( bit level, values are shifted by one since 0 has no code)
+delta -> Elias delta, the number of bits of the value in Elias gamma followed
+         by the bits of the value without its leading 1
+pfor  -> PForDelta, blocks of 128 values packed with the same number of bits
+         b( chosen so that 90% of the values fit), the values that do not fit
+         are patched with their high bits stored as exceptions
+
+The decoders are vectorized with numpy. The bit level codes( gamma, delta)
+are found by computing, for every bit, where the code starting at this bit
+would end and following these jumps from the first bit, 1, 2, 4 .. codes at a
+time( pointer jumping). Short lists are decoded one value at a time instead
+( the bit level codes and the PForDelta blocks on a Python integer), the numpy
+calls cost more than the loop
+
+Credits -> https://nlp.stanford.edu/IR-book/html/htmledition/postings-file-compression-1.html
+Credits -> Zukowski et al., Super-Scalar RAM-CPU Cache Compression( PForDelta)
+"""
+
+import numpy as np
+
+
+# Number of values in a PForDelta block
+PFOR_BLOCK_SIZE = 128
+
+# Share of the values of a PForDelta block that fit in b bits
+PFOR_COVERAGE = 0.9
+
+# Lists of gamma or delta codes shorter than this are decoded one code at a
+# time( measured on CACM like gaps, the loop is faster up to ~256 codes)
+MIN_VECTORIZED_CODES = 256
+
+# Longest gamma or delta code of a 32 bit value, in bits
+MAX_CODE_BITS = 65
+
+# Longest variable byte code of a 32 bit value, in bytes
+MAX_VBYTE_BYTES = 5
+
+# Lists of variable byte or PForDelta values shorter than these are decoded
+# one value at a time( measured like MIN_VECTORIZED_CODES, ~25 us of numpy
+# calls against ~0.3 us per value for the loop)
+MIN_VECTORIZED_VBYTE_VALUES = 96
+MIN_VECTORIZED_PFOR_VALUES = 64
+
+
+def gaps_from_doc_ids(doc_ids):
+    """
+    Function which turns increasing doc ids into gaps
+    :param doc_ids: sequence of doc ids in increasing order
+    :return: numpy uint64 array [doc_id_0, doc_id_1 - doc_id_0, ...]
+    """
+    doc_ids = np.asarray(doc_ids, dtype=np.uint64)
+    return np.diff(doc_ids, prepend=np.uint64(0))
+
+
+def doc_ids_from_gaps(gaps):
+    """
+    Function which turns gaps back into doc ids
+    :param gaps: numpy array of gaps
+    :return: numpy uint32 array of doc ids
+    """
+    return np.cumsum(gaps, dtype=np.uint64).astype(np.uint32)
+
+
+def bit_lengths(values):
+    """
+    Helper function which returns the number of bits of every value
+    ( 0 for the value 0)
+    :param values: numpy uint64 array of values < 2^53
+    :return: numpy int64 array
+    """
+    # Note: The exponent of a float64 is the number of bits of the integer,
+    # exact as long as the value fits the 53 bits of the mantissa
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+def write_bits(values, widths, offsets, total_bits):
+    """
+    Function which writes values at given bit offsets of a bit string
+    :param values: numpy uint64 array
+    :param widths: number of bits written for every value( its lowest bits,
+    most significant bit first)
+    :param offsets: bit offset of every value
+    :param total_bits: length of the bit string
+    :return: the bit string packed into bytes
+    """
+    bits = np.zeros(total_bits, dtype=np.uint8)
+    widths = np.asarray(widths, dtype=np.int64)
+    total_width = int(widths.sum())
+    if total_width:
+        starts = np.cumsum(widths) - widths
+        value_of_bit = np.repeat(np.arange(len(values)), widths)
+        bit_in_value = np.arange(total_width) - starts[value_of_bit]
+        shifts = (widths[value_of_bit] - 1 - bit_in_value).astype(np.uint64)
+        bits[np.asarray(offsets, dtype=np.int64)[value_of_bit] + bit_in_value] = \
+            (values[value_of_bit] >> shifts) & np.uint64(1)
+    return np.packbits(bits).tobytes()
+
+
+def read_bits(packed, offsets, widths):
+    """
+    Function which reads values at given bit offsets of a bit string
+    :param packed: numpy uint8 array of the bit string, followed by at least
+    8 zero bytes
+    :param offsets: numpy int64 array, bit offset of every value
+    :param widths: numpy int64 array, number of bits of every value( <= 56)
+    :return: numpy uint64 array of the values
+    """
+    # The 8 bytes starting at the byte of every value, read as a big endian
+    # 64 bit integer
+    window_bytes = packed[(offsets >> 3)[:, None] + np.arange(8)]
+    window = window_bytes.view(">u8").ravel().astype(np.uint64)
+    window <<= (offsets & 7).astype(np.uint64)
+
+    # Note: A shift by 64 bits is undefined, the values of width 0 are 0
+    values = window >> (64 - np.maximum(widths, 1)).astype(np.uint64)
+    values[widths == 0] = 0
+    return values
+
+
+def vbyte_encode(values):
+    """
+    Function which encodes values with variable byte
+    :param values: sequence of non negative integers
+    :return: bytes
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    num_bytes = np.maximum(1, (bit_lengths(values) + 6) // 7)
+    value_of_byte = np.repeat(np.arange(len(values)), num_bytes)
+    byte_in_value = np.arange(int(num_bytes.sum())) - (np.cumsum(num_bytes) - num_bytes)[value_of_byte]
+
+    encoded = ((values[value_of_byte] >> (7 * byte_in_value).astype(np.uint64)) & np.uint64(0x7f)).astype(np.uint8)
+    encoded[np.cumsum(num_bytes) - 1] |= 0x80
+    return encoded.tobytes()
+
+
+def vbyte_decode_values(buffer, count):
+    """
+    Helper function which decodes a short list of variable byte values one
+    byte at a time( see vbyte_decode)
+    """
+    values = []
+    value = 0
+    shift = 0
+    used = 0
+    for byte in bytes(buffer[:MAX_VBYTE_BYTES * count]):
+        used += 1
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            values.append(value)
+            if len(values) == count:
+                break
+            value = 0
+            shift = 0
+        else:
+            shift += 7
+    return np.array(values, dtype=np.uint32), used
+
+
+def vbyte_decode(buffer, count):
+    """
+    Function which decodes count values encoded with variable byte
+    :param buffer: bytes like object starting with the encoded values
+    :param count: number of values to decode
+    :return: a tuple (numpy uint32 array of the values, bytes read)
+    """
+    if count == 0:
+        return np.empty(0, dtype=np.uint32), 0
+    if count < MIN_VECTORIZED_VBYTE_VALUES:
+        return vbyte_decode_values(buffer, count)
+
+    encoded = np.frombuffer(buffer, dtype=np.uint8)
+    last_bytes = np.flatnonzero(encoded & 0x80)[:count]
+    used = int(last_bytes[-1]) + 1
+    encoded = encoded[:used]
+
+    first_bytes = np.empty(count, dtype=np.int64)
+    first_bytes[0] = 0
+    first_bytes[1:] = last_bytes[:-1] + 1
+    value_of_byte = np.repeat(np.arange(count), last_bytes - first_bytes + 1)
+    byte_in_value = np.arange(used) - first_bytes[value_of_byte]
+
+    parts = (encoded & 0x7f).astype(np.uint64) << (7 * byte_in_value).astype(np.uint64)
+    return np.add.reduceat(parts, first_bytes).astype(np.uint32), used
+
+
+def gamma_encode(values):
+    """
+    Function which encodes values with Elias gamma
+    :param values: sequence of non negative integers
+    :return: bytes
+    """
+    shifted = np.asarray(values, dtype=np.uint64) + np.uint64(1)
+    widths = bit_lengths(shifted)
+
+    # N zeros then the N + 1 bits of the value
+    code_lengths = 2 * widths - 1
+    offsets = np.cumsum(code_lengths) - code_lengths + (widths - 1)
+    return write_bits(shifted, widths, offsets, int(code_lengths.sum()))
+
+
+def next_one_positions(bits):
+    """
+    Helper function which returns, for every bit, the position of the first
+    bit set to 1 at or after it( len(bits) if there is none)
+    """
+    positions = np.where(bits == 1, np.arange(len(bits)), len(bits))
+    return np.minimum.accumulate(positions[::-1])[::-1]
+
+
+def code_starts(successors, count):
+    """
+    Helper function which finds the start of the first count codes of a bit
+    string
+    :param successors: numpy int64 array, for every bit the position of the
+    code that follows a code starting at this bit. Its last entry is the end
+    of the bit string and points to itself
+    :param count: number of codes
+    :return: a tuple (numpy int64 array of the start of every code, position
+    after the last code)
+    """
+    # The start of code i is the successor of the first bit taken i times, the
+    # successor taken 2^k times is the successor 2^(k - 1) times of itself
+    starts = np.zeros(count, dtype=np.int64)
+    code_numbers = np.arange(count)
+    jump = successors
+    step = 1
+    while step < count:
+        moved = (code_numbers & step) != 0
+        starts[moved] = jump[starts[moved]]
+        step <<= 1
+        if step < count:
+            jump = jump[jump]
+    return starts, int(successors[starts[-1]])
+
+
+def leading_bits(buffer, count):
+    """
+    Helper function which reads the bytes that can hold count gamma or delta
+    codes as one Python integer
+    :return: a tuple (the integer, number of bits of the integer)
+    """
+    data = bytes(buffer[:(MAX_CODE_BITS * count + 7) // 8])
+    return int.from_bytes(data, "big"), 8 * len(data)
+
+
+def gamma_decode_codes(buffer, count):
+    """
+    Helper function which decodes a short list of Elias gamma codes one code
+    at a time( see gamma_decode)
+    """
+    bits, num_bits = leading_bits(buffer, count)
+
+    # remaining -> number of bits after the current code, the bits that were
+    # read are cleared so that bit_length finds the next leading 1
+    remaining = num_bits
+    values = []
+    for _ in range(count):
+        length = bits.bit_length()
+        width = remaining - length + 1
+        remaining = length - width
+        values.append((bits >> remaining) - 1)
+        bits &= (1 << remaining) - 1
+    return np.array(values, dtype=np.uint32), (num_bits - remaining + 7) // 8
+
+
+def gamma_decode(buffer, count):
+    """
+    Function which decodes count values encoded with Elias gamma
+    :param buffer: bytes like object starting with the encoded values
+    :param count: number of values to decode
+    :return: a tuple (numpy uint32 array of the values, bytes read)
+    """
+    if count == 0:
+        return np.empty(0, dtype=np.uint32), 0
+    if count < MIN_VECTORIZED_CODES:
+        return gamma_decode_codes(buffer, count)
+
+    packed = np.frombuffer(buffer, dtype=np.uint8)
+    num_bits = 8 * len(packed)
+    next_one = next_one_positions(np.unpackbits(packed))
+
+    # A code starting at bit p has next_one[p] - p zeros, then as many bits
+    # plus one
+    successors = np.empty(num_bits + 1, dtype=np.int64)
+    successors[:-1] = np.minimum(2 * next_one - np.arange(num_bits) + 1, num_bits)
+    successors[-1] = num_bits
+    starts, position = code_starts(successors, count)
+
+    offsets = next_one[starts]
+    widths = offsets - starts + 1
+
+    packed = np.concatenate((packed, np.zeros(8, dtype=np.uint8)))
+    values = read_bits(packed, offsets, widths) - np.uint64(1)
+    return values.astype(np.uint32), (position + 7) // 8
+
+
+def delta_encode(values):
+    """
+    Function which encodes values with Elias delta
+    :param values: sequence of non negative integers
+    :return: bytes
+    """
+    shifted = np.asarray(values, dtype=np.uint64) + np.uint64(1)
+    widths = bit_lengths(shifted)
+
+    # The width in Elias gamma( N zeros, then N + 1 bits), then the bits of
+    # the value after its leading 1
+    width_widths = bit_lengths(widths.astype(np.uint64))
+    gamma_lengths = 2 * width_widths - 1
+    code_lengths = gamma_lengths + widths - 1
+    starts = np.cumsum(code_lengths) - code_lengths
+
+    all_values = np.concatenate((widths.astype(np.uint64), shifted))
+    all_widths = np.concatenate((width_widths, widths - 1))
+    all_offsets = np.concatenate((starts + width_widths - 1, starts + gamma_lengths))
+    return write_bits(all_values, all_widths, all_offsets, int(code_lengths.sum()))
+
+
+def delta_decode_codes(buffer, count):
+    """
+    Helper function which decodes a short list of Elias delta codes one code
+    at a time( see delta_decode)
+    """
+    bits, num_bits = leading_bits(buffer, count)
+
+    remaining = num_bits
+    values = []
+    for _ in range(count):
+        # The width of the value in Elias gamma
+        length = bits.bit_length()
+        width_width = remaining - length + 1
+        remaining = length - width_width
+        width = bits >> remaining
+        bits &= (1 << remaining) - 1
+
+        # The bits of the value after its leading 1
+        remaining -= width - 1
+        values.append(((1 << (width - 1)) | (bits >> remaining)) - 1)
+        bits &= (1 << remaining) - 1
+    return np.array(values, dtype=np.uint32), (num_bits - remaining + 7) // 8
+
+
+def delta_decode(buffer, count):
+    """
+    Function which decodes count values encoded with Elias delta
+    :param buffer: bytes like object starting with the encoded values
+    :param count: number of values to decode
+    :return: a tuple (numpy uint32 array of the values, bytes read)
+    """
+    if count == 0:
+        return np.empty(0, dtype=np.uint32), 0
+    if count < MIN_VECTORIZED_CODES:
+        return delta_decode_codes(buffer, count)
+
+    packed = np.frombuffer(buffer, dtype=np.uint8)
+    num_bits = 8 * len(packed)
+    next_one = next_one_positions(np.unpackbits(packed))
+    positions = np.arange(num_bits)
+    padded = np.concatenate((packed, np.zeros(8, dtype=np.uint8)))
+
+    # A code starting at bit p has next_one[p] - p zeros, then the width of
+    # the value in next_one[p] - p + 1 bits, then the width - 1 bits of the
+    # value after its leading 1
+    # Note: Only the bits where a code starts are read in full, the others
+    # are clipped to what read_bits can read
+    width_widths = np.minimum(next_one - positions + 1, 56)
+    widths = read_bits(padded, next_one, width_widths).astype(np.int64)
+
+    successors = np.empty(num_bits + 1, dtype=np.int64)
+    successors[:-1] = np.minimum(2 * next_one - positions + widths, num_bits)
+    successors[-1] = num_bits
+    starts, position = code_starts(successors, count)
+
+    offsets = 2 * next_one[starts] - starts + 1
+    widths = widths[starts] - 1
+
+    values = (np.uint64(1) << widths.astype(np.uint64)) | read_bits(padded, offsets, widths)
+    return (values - np.uint64(1)).astype(np.uint32), (position + 7) // 8
+
+
+def pfor_width(block):
+    """
+    Helper function which chooses the number of bits b of a PForDelta block
+    :param block: numpy uint64 array of the values of the block
+    :return: the smallest b such that PFOR_COVERAGE of the values are < 2^b
+    """
+    widths = np.sort(bit_lengths(block))
+    return int(widths[int(np.ceil(PFOR_COVERAGE * len(block))) - 1])
+
+
+def pfor_encode(values):
+    """
+    Function which encodes values with PForDelta
+    Every block is written as
+        b( 1 byte), number of exceptions( 1 byte),
+        the lowest b bits of every value( packed, padded to a byte),
+        the positions of the exceptions( 1 byte each),
+        the high bits of the exceptions( variable byte)
+    :param values: sequence of non negative integers
+    :return: bytes
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    encoded = []
+    for start in range(0, len(values), PFOR_BLOCK_SIZE):
+        block = values[start: start + PFOR_BLOCK_SIZE]
+        b = pfor_width(block)
+        exceptions = np.flatnonzero(block >> np.uint64(b))
+
+        widths = np.full(len(block), b, dtype=np.int64)
+        offsets = np.arange(len(block), dtype=np.int64) * b
+        low_bits = block & np.uint64((1 << b) - 1)
+
+        encoded.append(bytes((b, len(exceptions))))
+        encoded.append(write_bits(low_bits, widths, offsets, b * len(block)))
+        encoded.append(exceptions.astype(np.uint8).tobytes())
+        encoded.append(vbyte_encode(block[exceptions] >> np.uint64(b)))
+    return b"".join(encoded)
+
+
+def pfor_decode_values(buffer, count):
+    """
+    Helper function which decodes a short list of PForDelta values one value
+    at a time( see pfor_decode)
+    """
+    values = []
+    position = 0
+    for start in range(0, count, PFOR_BLOCK_SIZE):
+        num_values = min(PFOR_BLOCK_SIZE, count - start)
+        b, num_exceptions = bytes(buffer[position: position + 2])
+        position += 2
+
+        # The b bits of every value, most significant bit first
+        num_bytes = (b * num_values + 7) // 8
+        bits = int.from_bytes(bytes(buffer[position: position + num_bytes]), "big")
+        position += num_bytes
+        mask = (1 << b) - 1
+        remaining = 8 * num_bytes
+        block = []
+        for _ in range(num_values):
+            remaining -= b
+            block.append((bits >> remaining) & mask)
+
+        # Patch the exceptions with their high bits
+        if num_exceptions:
+            exceptions = bytes(buffer[position: position + num_exceptions])
+            position += num_exceptions
+            high_bits, used = vbyte_decode_values(buffer[position:], num_exceptions)
+            position += used
+            for exception, high in zip(exceptions, high_bits.tolist()):
+                block[exception] |= high << b
+
+        values.extend(block)
+    return np.array(values, dtype=np.uint32), position
+
+
+def pfor_decode(buffer, count):
+    """
+    Function which decodes count values encoded with PForDelta
+    :param buffer: bytes like object starting with the encoded values
+    :param count: number of values to decode
+    :return: a tuple (numpy uint32 array of the values, bytes read)
+    """
+    if count < MIN_VECTORIZED_PFOR_VALUES:
+        return pfor_decode_values(buffer, count)
+
+    encoded = np.frombuffer(buffer, dtype=np.uint8)
+    blocks = []
+    position = 0
+    for start in range(0, count, PFOR_BLOCK_SIZE):
+        num_values = min(PFOR_BLOCK_SIZE, count - start)
+        b = int(encoded[position])
+        num_exceptions = int(encoded[position + 1])
+        position += 2
+
+        # Unpack the b bits of every value at once
+        num_bytes = (b * num_values + 7) // 8
+        bits = np.unpackbits(encoded[position: position + num_bytes])[:b * num_values].reshape(num_values, b)
+        block = bits.astype(np.uint64) @ (np.uint64(1) << np.arange(b - 1, -1, -1, dtype=np.uint64)) \
+            if b else np.zeros(num_values, dtype=np.uint64)
+        position += num_bytes
+
+        # Patch the exceptions with their high bits
+        if num_exceptions:
+            exceptions = encoded[position: position + num_exceptions].astype(np.int64)
+            position += num_exceptions
+            high_bits, used = vbyte_decode(encoded[position:], num_exceptions)
+            position += used
+            block[exceptions] |= high_bits.astype(np.uint64) << np.uint64(b)
+
+        blocks.append(block)
+
+    if not blocks:
+        return np.empty(0, dtype=np.uint32), 0
+    return np.concatenate(blocks).astype(np.uint32), position
+
+
+# The codecs, the position of a codec in this list is its id in the
+# compressed index files
+CODEC_NAMES = ["vbyte", "gamma", "delta", "pfor"]
+CODECS = {"vbyte": (vbyte_encode, vbyte_decode),
+          "gamma": (gamma_encode, gamma_decode),
+          "delta": (delta_encode, delta_decode),
+          "pfor": (pfor_encode, pfor_decode)}
@@ -0,0 +1,288 @@
+"""
+Python file which contains the postings cursor used by the document at a time
+query processors
+
+A cursor walks the postings of one term in increasing order of doc id
+cursor.doc     -> the doc id the cursor is on( END once it is exhausted)
+cursor.freq()  -> the term frequency in that doc
+cursor.next()  -> moves to the next posting
+cursor.advance(target) -> moves to the first posting with doc id >= target
+
+A BlockMaxCursor also knows the block summaries of its postings( see
+binary_index.py) and can move its block pointer without reading any posting
+cursor.shallow_advance(target) -> moves to the block that could hold target
+
+union_docs walks the union of the postings of several cursors document at a
+time( the disjunctive, OR, query processing of query_engine.py), it works with
+any of the cursors above and with the iterators of query_engine.py
+
+The iterators of query_engine.py walk these cursors document at a time
+"""
+
+import bisect
+import heapq
+from binary_index import DEFAULT_BLOCK_SIZE
+
+
+# Doc id of an exhausted cursor, larger than every real doc id
+END = float("inf")
+
+
+def postings_lists(indexed_data, term):
+    """
+    Function which returns the postings of a term sorted on the doc id
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param term: the term
+    :return: a tuple (doc_ids, freqs) of two sequences of the same length
+    """
+
+    if hasattr(indexed_data, "postings"):
+        # The binary index stores the postings sorted on the doc id
+        return indexed_data.postings(term)
+
+    postings = indexed_data.get(term)
+    if not postings:
+        return [], []
+
+    sorted_postings = sorted(postings.items())
+    return [doc for doc, _ in sorted_postings], [freq for _, freq in sorted_postings]
+
+
+class PostingsCursor:
+    """
+    A cursor over the postings of one term
+    """
+
+    def __init__(self, term, doc_ids, freqs):
+        """
+        :param term: the term of the postings
+        :param doc_ids: sequence of doc ids sorted in increasing order
+        :param freqs: sequence of the term frequencies of these doc ids
+        """
+        self.term = term
+        self.doc_ids = doc_ids
+        self.freqs = freqs
+        self.position = 0
+        self.doc = doc_ids[0] if len(doc_ids) else END
+
+    @classmethod
+    def for_term(cls, indexed_data, term):
+        """
+        Function which creates a cursor over the postings of a term
+        """
+        doc_ids, freqs = postings_lists(indexed_data, term)
+        return cls(term, doc_ids, freqs)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def freq(self):
+        """
+        Function which returns the term frequency in the current doc
+        """
+        return self.freqs[self.position]
+
+    def _move_to(self, position):
+        """
+        Helper function which moves the cursor to a position in the postings
+        """
+        self.position = position
+        if position < len(self.doc_ids):
+            self.doc = self.doc_ids[position]
+        else:
+            self.doc = END
+
+    def next(self):
+        """
+        Function which moves the cursor to the next posting
+        :return: the new doc id
+        """
+        self._move_to(self.position + 1)
+        return self.doc
+
+    def advance(self, target):
+        """
+        Function which moves the cursor to the first posting whose doc id is
+        greater than or equal to target
+        :return: the new doc id
+        """
+        if self.doc >= target:
+            return self.doc
+
+        # The postings in between are never looked at
+        self._move_to(bisect.bisect_left(self.doc_ids, target, self.position + 1))
+        return self.doc
+
+
+def postings_blocks(indexed_data, term, doc_ids, freqs, doc_lengths):
+    """
+    Function which returns the block summaries of the postings of a term
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param term: the term
+    :param doc_ids: the sorted doc ids of the postings of the term
+    :param freqs: the term frequencies of the postings of the term
+    :param doc_lengths: list of the doc lengths, indexed on the integer doc ids
+    :return: a tuple (block_size, block_last_docs, block_max_freqs,
+    block_min_lens)
+    """
+
+    if hasattr(indexed_data, "blocks"):
+        # The binary index stores the block summaries at indexing time
+        return (indexed_data.block_size,) + tuple(indexed_data.blocks(term))
+
+    block_size = DEFAULT_BLOCK_SIZE
+    block_last_docs, block_max_freqs, block_min_lens = [], [], []
+    for start in range(0, len(doc_ids), block_size):
+        end = min(start + block_size, len(doc_ids))
+        block_last_docs.append(doc_ids[end - 1])
+        block_max_freqs.append(max(freqs[start:end]))
+        block_min_lens.append(min(doc_lengths[doc] for doc in doc_ids[start:end]))
+    return block_size, block_last_docs, block_max_freqs, block_min_lens
+
+
+class BlockMaxCursor(PostingsCursor):
+    """
+    A cursor over the postings of one term which skips whole blocks
+    It counts the blocks whose postings were read( decoded_blocks)
+    """
+
+    def __init__(self, term, doc_ids, freqs, block_size, block_last_docs, block_max_freqs, block_min_lens):
+        """
+        :param term: the term of the postings
+        :param doc_ids: sequence of doc ids sorted in increasing order
+        :param freqs: sequence of the term frequencies of these doc ids
+        :param block_size: number of postings in a block
+        :param block_last_docs: doc id of the last posting of every block
+        :param block_max_freqs: largest term frequency in every block
+        :param block_min_lens: length of the shortest doc in every block
+        """
+        super().__init__(term, doc_ids, freqs)
+        self.block_size = block_size
+        self.block_last_docs = block_last_docs
+        self.block_max_freqs = block_max_freqs
+        self.block_min_lens = block_min_lens
+
+        # The block pointer, it can be ahead of the block of the current
+        # posting after a shallow_advance
+        self.block = 0
+        self.decoded_blocks = 0
+        self._decoded_block = -1
+        if len(doc_ids):
+            self._note_decoded(0)
+
+    @classmethod
+    def for_term(cls, indexed_data, term, doc_lengths=None):
+        """
+        Function which creates a block max cursor over the postings of a term
+        :param doc_lengths: list of the doc lengths, indexed on the integer doc
+        ids. Only needed if indexed_data does not store the block summaries
+        """
+        doc_ids, freqs = postings_lists(indexed_data, term)
+        return cls(term, doc_ids, freqs, *postings_blocks(indexed_data, term, doc_ids, freqs, doc_lengths))
+
+    def num_blocks(self):
+        """
+        Function which returns the number of blocks of the postings
+        """
+        return len(self.block_last_docs)
+
+    def _note_decoded(self, block):
+        """
+        Helper function which counts a block the first time one of its
+        postings is read
+        """
+        if block != self._decoded_block:
+            self.decoded_blocks += 1
+            self._decoded_block = block
+
+    def _move_to(self, position):
+        super()._move_to(position)
+        if self.doc == END:
+            self.block = self.num_blocks()
+        else:
+            self.block = position // self.block_size
+            self._note_decoded(self.block)
+
+    def shallow_advance(self, target):
+        """
+        Function which moves the block pointer to the first block whose last
+        doc id is greater than or equal to target. No posting is read
+        :return: the index of the block, num_blocks() if there is none
+        """
+        if self.block < self.num_blocks() and self.block_last_docs[self.block] < target:
+            self.block = bisect.bisect_left(self.block_last_docs, target, self.block + 1)
+        return self.block
+
+    def block_last_doc(self):
+        """
+        Function which returns the last doc id of the block pointed to
+        """
+        if self.block >= self.num_blocks():
+            return END
+        return self.block_last_docs[self.block]
+
+    def block_max_freq(self):
+        """
+        Function which returns the largest term frequency of the block
+        pointed to
+        """
+        return self.block_max_freqs[self.block]
+
+    def block_min_len(self):
+        """
+        Function which returns the length of the shortest doc of the block
+        pointed to
+        """
+        return self.block_min_lens[self.block]
+
+    def advance(self, target):
+        """
+        Function which moves the cursor to the first posting whose doc id is
+        greater than or equal to target
+        Only the postings of the block that could hold target are read
+        :return: the new doc id
+        """
+        if self.doc >= target:
+            return self.doc
+
+        block = self.shallow_advance(target)
+        if block >= self.num_blocks():
+            self._move_to(len(self.doc_ids))
+            return self.doc
+
+        start = max(self.position + 1, block * self.block_size)
+        end = min((block + 1) * self.block_size, len(self.doc_ids))
+        self._move_to(bisect.bisect_left(self.doc_ids, target, start, end))
+        return self.doc
+
+
+def union_docs(cursors):
+    """
+    Function which walks the union of the postings of some cursors, document
+    at a time in increasing order of doc id
+    The cursors are kept in a min heap keyed on their current doc id, so only
+    the docs containing at least one of the terms are visited
+    :param cursors: list of cursors( Example: one PostingsCursor per query
+    term)
+    :return: a generator of (doc_id, matched cursors) tuples. The matched
+    cursors are on doc_id, in the order of the cursors list, so their freq()
+    can be read before the generator is resumed
+    """
+    # (current doc id, position in the cursors list, cursor)
+    heap = [(cursor.doc, i, cursor) for i, cursor in enumerate(cursors) if cursor.doc != END]
+    heapq.heapify(heap)
+
+    while heap:
+        doc = heap[0][0]
+        matched = []
+        while heap and heap[0][0] == doc:
+            matched.append(heapq.heappop(heap))
+
+        yield doc, [cursor for _, _, cursor in matched]
+
+        # Move the matched cursors to their next posting
+        for _, i, cursor in matched:
+            if cursor.next() != END:
+                heapq.heappush(heap, (cursor.doc, i, cursor))
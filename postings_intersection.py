@@ -0,0 +1,298 @@
+"""
+Python file which intersects postings lists for the conjunctive( AND style)
+operators: the exact match, the proximity match and the Boolean AND
+
+The doc ids of a term are sorted, and every block of block_size postings has
+a skip pointer: the doc id of its last posting( the block_last_docs of
+binary_index.py). To intersect a rare term with a common term, every doc id
+of the rare term is looked up in the common term with a galloping
+( exponential) search over the skip pointers, starting from where the
+previous lookup ended, followed by a binary search inside one block. The cost
+is O(rare x log(common)) instead of the O(rare + common) of a merge
+
+Run this file to compare the intersection throughput against a naive merge
+on CACM term pairs with very different document frequencies
+>>> python postings_intersection.py -j all_paths.json
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+from pathlib import Path
+from binary_index import DEFAULT_BLOCK_SIZE, load_inverted_index
+from doc_table import doc_table_fname, load_doc_table
+from postings_cursor import postings_lists
+
+
+def gallop(sequence, target, lo=0, hi=None):
+    """
+    Function which finds the first item >= target with a galloping search
+    The probes start at lo and double their distance until they pass target,
+    then a binary search is done between the last two probes. The cost grows
+    with the log of the distance moved, not with the length of the sequence
+    :param sequence: a sorted sequence
+    :param target: the value looked for
+    :param lo: the position the search starts from
+    :param hi: the end of the searched part of the sequence( its length by
+    default)
+    :return: the position of the first item >= target in [lo, hi), hi if
+    there is none
+    """
+    if hi is None:
+        hi = len(sequence)
+
+    step = 1
+    probe = lo
+    while probe < hi and sequence[probe] < target:
+        lo = probe + 1
+        probe += step
+        step *= 2
+    return bisect.bisect_left(sequence, target, lo, min(probe, hi))
+
+
+def skip_pointers(indexed_data, term, doc_ids):
+    """
+    Function which returns the skip pointers of the postings of a term
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param term: the term
+    :param doc_ids: the sorted doc ids of the postings of the term
+    :return: a tuple (block_size, block_last_docs)
+    """
+    if hasattr(indexed_data, "blocks"):
+        # The binary index stores the skip pointers at indexing time
+        return indexed_data.block_size, indexed_data.blocks(term)[0]
+
+    block_size = DEFAULT_BLOCK_SIZE
+    block_last_docs = [doc_ids[min(start + block_size, len(doc_ids)) - 1]
+                       for start in range(0, len(doc_ids), block_size)]
+    return block_size, block_last_docs
+
+
+def merge_intersect(doc_ids_a, doc_ids_b):
+    """
+    Function which intersects two sorted doc id lists with a linear merge
+    ( the naive baseline, every posting of both lists is looked at)
+    :return: the sorted list of the common doc ids
+    """
+    result = []
+    i = j = 0
+    while i < len(doc_ids_a) and j < len(doc_ids_b):
+        if doc_ids_a[i] < doc_ids_b[j]:
+            i += 1
+        elif doc_ids_a[i] > doc_ids_b[j]:
+            j += 1
+        else:
+            result.append(doc_ids_a[i])
+            i += 1
+            j += 1
+    return result
+
+
+def gallop_intersect(rare_doc_ids, doc_ids):
+    """
+    Function which intersects two sorted doc id lists by galloping through
+    the longer list for every doc id of the shorter one
+    :param rare_doc_ids: the shorter list
+    :param doc_ids: the longer list
+    :return: the sorted list of the common doc ids
+    """
+    result = []
+    position = 0
+    for doc in rare_doc_ids:
+        position = gallop(doc_ids, doc, position)
+        if position == len(doc_ids):
+            break
+        if doc_ids[position] == doc:
+            result.append(doc)
+    return result
+
+
+def skip_intersect(rare_doc_ids, doc_ids, block_size, block_last_docs):
+    """
+    Function which intersects two sorted doc id lists by galloping through
+    the skip pointers of the longer list for every doc id of the shorter one
+    Only one block of the longer list is searched per doc id
+    :param rare_doc_ids: the shorter list
+    :param doc_ids: the longer list
+    :param block_size: number of postings in a block of the longer list
+    :param block_last_docs: the skip pointers of the longer list( doc id of
+    the last posting of every block)
+    :return: the sorted list of the common doc ids
+    """
+    result = []
+    block = 0
+    position = 0
+    num_blocks = len(block_last_docs)
+    if num_blocks == 0:
+        return result
+
+    for doc in rare_doc_ids:
+        # First block whose last doc id is >= doc, the only one that can hold
+        # it. Consecutive doc ids of the rare term often fall in the same block
+        if block_last_docs[block] < doc:
+            block = gallop(block_last_docs, doc, block + 1, num_blocks)
+            if block == num_blocks:
+                break
+
+        start = max(position, block * block_size)
+        position = bisect.bisect_left(doc_ids, doc, start, min(block * block_size + block_size, len(doc_ids)))
+        if doc_ids[position] == doc:
+            result.append(doc)
+    return result
+
+
+def intersect_postings(indexed_data, terms):
+    """
+    Function which returns the docs containing all the terms
+    The terms are intersected rarest first: the doc ids of the rarest term
+    are the first candidates, and they are looked up in the postings of the
+    other terms with skip_intersect
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids {term : {doc_id : freq}}
+    :param terms: the terms
+    :return: the sorted list of the doc ids, empty if there are no terms
+    """
+    # Note: The terms with the same document frequency are intersected in
+    # the order of the terms
+    postings = sorted(((term, postings_lists(indexed_data, term)[0]) for term in sorted(set(terms))),
+                      key=lambda term_postings: len(term_postings[1]))
+    if not postings:
+        return []
+
+    candidates = list(postings[0][1])
+    for term, doc_ids in postings[1:]:
+        if not candidates:
+            break
+        block_size, block_last_docs = skip_pointers(indexed_data, term, doc_ids)
+        candidates = skip_intersect(candidates, doc_ids, block_size, block_last_docs)
+    return candidates
+
+
+def skewed_term_pairs(indexed_data, rare_df_ranges, num_rare=10, num_common=10):
+    """
+    Function which picks term pairs with very different document frequencies
+    :param indexed_data: a BinaryInvertedIndex or an inverted index keyed on
+    integer doc ids
+    :param rare_df_ranges: list of (min df, max df) ranges of the rare terms
+    :param num_rare: number of rare terms taken in every range
+    :param num_common: number of most frequent terms, every rare term is
+    paired with every one of them
+    :return: a dictionary {(min df, max df) : [(rare term, common term), ...]}
+    """
+    dfs = {term: len(postings_lists(indexed_data, term)[0]) for term in indexed_data}
+    common_terms = sorted(dfs, key=lambda term: (-dfs[term], term))[:num_common]
+
+    pairs = {}
+    for min_df, max_df in rare_df_ranges:
+        rare_terms = sorted(term for term, df in dfs.items() if min_df <= df <= max_df)[:num_rare]
+        pairs[(min_df, max_df)] = [(rare, common) for rare in rare_terms for common in common_terms]
+    return pairs
+
+
+def time_intersections(indexed_data, pairs, method, repeat):
+    """
+    Helper function which intersects every pair repeat times
+    :param method: "merge", "gallop" or "skips"
+    :return: a tuple (seconds per intersection, number of postings of the
+    pairs, the results of the intersections)
+    """
+    lists = []
+    for rare, common in pairs:
+        rare_doc_ids = postings_lists(indexed_data, rare)[0]
+        doc_ids = postings_lists(indexed_data, common)[0]
+        lists.append((rare_doc_ids, doc_ids) + skip_pointers(indexed_data, common, doc_ids))
+
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = []
+        for rare_doc_ids, doc_ids, block_size, block_last_docs in lists:
+            if method == "merge":
+                results.append(merge_intersect(rare_doc_ids, doc_ids))
+            elif method == "gallop":
+                results.append(gallop_intersect(rare_doc_ids, doc_ids))
+            else:
+                results.append(skip_intersect(rare_doc_ids, doc_ids, block_size, block_last_docs))
+    seconds = (time.perf_counter() - start) / (repeat * len(lists))
+    num_postings = sum(len(rare_doc_ids) + len(doc_ids) for rare_doc_ids, doc_ids, _, _ in lists)
+    return seconds, num_postings / len(lists), results
+
+
+def benchmark_intersections(json_fname, rare_df_ranges=((1, 3), (4, 15), (16, 60), (61, 250)), repeat=20):
+    """
+    Function which compares the intersection methods on term pairs with very
+    different document frequencies
+    :param json_fname: the path to the json inverted index( create_index.py)
+    :param rare_df_ranges: list of (min df, max df) ranges of the rare terms,
+    they are paired with the most frequent terms
+    :param repeat: number of times every intersection is timed
+    :return: a list of rows (rare df range, number of pairs, method,
+    microseconds per intersection, million postings per second, speedup over
+    the merge)
+    """
+    doc_table = load_doc_table(doc_table_fname(json_fname))
+    indexed_data = load_inverted_index(json_fname, doc_table)
+
+    rows = []
+    for df_range, pairs in skewed_term_pairs(indexed_data, rare_df_ranges).items():
+        if not pairs:
+            continue
+
+        merge_seconds, expected = None, None
+        for method in ("merge", "gallop", "skips"):
+            seconds, num_postings, results = time_intersections(indexed_data, pairs, method, repeat)
+            if method == "merge":
+                merge_seconds, expected = seconds, results
+
+            # Every method must find the same docs as the merge
+            if results != expected:
+                raise ValueError("The " + method + " intersection is not the same as the merge")
+            rows.append((df_range, len(pairs), method, seconds * 1e6, num_postings / seconds / 1e6,
+                         merge_seconds / seconds))
+    return rows
+
+
+def print_benchmark_table(rows):
+    """
+    Helper function which prints the rows of benchmark_intersections as a
+    table
+    """
+    print("{:<12}{:>7}{:>9}{:>16}{:>16}{:>10}".format("rare df", "pairs", "method", "us/intersection",
+                                                       "M postings/s", "speedup"))
+    for (min_df, max_df), num_pairs, method, micro_seconds, throughput, speedup in rows:
+        print("{:<12}{:>7}{:>9}{:>16.1f}{:>16.2f}{:>10.1f}".format(str(min_df) + "-" + str(max_df), num_pairs,
+                                                                   method, micro_seconds, throughput, speedup))
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-r", "--repeat", type=int, default=20,
+                    help="Enter the number of times every intersection is timed( default 20)",
+                    required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    inverted_index_json_fname = Path(os.path.realpath(".") + all_paths_dict["indexer_output_json_file"])
+    print("Rare terms paired with the 10 most frequent terms of the CACM index")
+    print_benchmark_table(benchmark_intersections(inverted_index_json_fname, repeat=user_args["repeat"]))
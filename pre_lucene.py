@@ -5,6 +5,7 @@ collection
 import os
 import argparse
 from parse_queries import parse_query_text_file
+from corpus_stream import iter_corpus
 import json
 from pathlib import Path
 
@@ -35,7 +36,7 @@ def parse_user_arguments():
     ap = argparse.ArgumentParser()
 
     ap.add_argument("-c", "--corpus_collection", help="Enter the path to "
-                                                      "the json file containing "
+                                                      "the .jsonl file containing "
                                                       "the cleaned corpus", required=True)
 
     ap.add_argument("-q", "--query_text_file", help="Enter the path to the "
@@ -67,11 +68,12 @@ def write_dict_to_text_file(fname, given_dict):
     fp.close()
 
 
-def write_collection_corpus_to_text_file(fname, corpus_dict):
+def write_collection_corpus_to_text_file(fname, corpus_documents):
     """
     Helper function to write corpus collection to text files
     :param fname: The fname where we want to write the collection to
-    :param corpus_dict: The corpus collection dictionary
+    :param corpus_documents: The corpus collection, an iterable of
+    (doc_id, contents) tuples( Example: the generator iter_corpus)
     """
     dir_path = Path(os.path.realpath(".") + "\\" + fname)
 
@@ -82,15 +84,15 @@ def write_collection_corpus_to_text_file(fname, corpus_dict):
 
         print("Directory created")
 
-    for item in corpus_dict:
+    for item, contents in corpus_documents:
         file_path = os.path.join(dir_path, item)
 
         f = open(file_path + ".txt", "w+")
 
-        # for word in corpus_dict[item].split():
+        # for word in contents.split():
         #     f.write(word + "\n")
 
-        f.write(corpus_dict[item])
+        f.write(contents)
 
         f.close()
 
@@ -107,12 +109,8 @@ corpus_out = user_args["corpus_out"]
 query_dict = parse_query_text_file(query_text_file)
 write_dict_to_text_file(query_out, query_dict)
 
-# Get the colelction dictionary
-with open(cleaned_corpus_file) as fd:
-    corpus = json.load(fd)
-
-# Create text files out of the collection
-write_collection_corpus_to_text_file(corpus_out, corpus)
+# Create text files out of the collection, one document at a time
+write_collection_corpus_to_text_file(corpus_out, iter_corpus(cleaned_corpus_file))
 
 
 
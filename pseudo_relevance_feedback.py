@@ -8,12 +8,15 @@ Credits -> https://nlp.stanford.edu/IR-book/html/htmledition/the-rocchio71-algor
 # Import statements
 from baseline_runs import new_bm25_scores, write_top_100_scores_to_txt, \
     parse_query_text_file, get_relevance_information, \
-    sort_dict_according_to_scores, get_avg_doc_length, calculate_r_i
+    sort_dict_according_to_scores, calculate_r_i, DEFAULT_TOP_K
 import argparse
 import json
 from pathlib import Path
 import os
 from task_1_main import read_json_document, convert_to_non_os_specific_path
+from binary_index import load_inverted_index, write_index_sidecars
+from doc_table import load_doc_table, doc_table_fname
+from collection_stats import load_collection_stats, collection_stats_fname
 from collections import Counter
 import math
 import errno
@@ -144,7 +147,7 @@ def pseudo_relevance_feedback(bm25_doc_scores, q_dict, inv_index, new_query_file
     # Now we have to calculate BM25 scores and rank documents according
     # to these queries
 
-    return redundant_pseudo_bm25(url_text_dict, inv_index, relevance_text_file, my_query_dict, rel_info_enabled=True)
+    return redundant_pseudo_bm25(collection_stats, inv_index, relevance_text_file, my_query_dict, rel_info_enabled=True, doc_table=doc_table)
 
 
 def get_magnitude_vector(given_vector):
@@ -185,9 +188,10 @@ def generate_rel_non_rel_vector(inv_index, doc_scores, start, end):
         # convert it into a list of words and create a frequency map of the
         # words
 
-        # NOTE: corpus_collection_path is the global variable here
+        # NOTE: corpus_collection_path and doc_table are the global variables
+        # here. The doc_id is an integer doc id of the doc table
 
-        fp = open(str(corpus_collection_path) + "\\" + doc_id + ".html")
+        fp = open(str(corpus_collection_path) + "\\" + doc_table.doc_name(doc_id) + ".html")
         content = fp.read().split()
         fp.close()
 
@@ -228,13 +232,12 @@ def generate_query_vector(q, q_dict, inv_index):
 # Same implementation below, but query dictionary passed in as argument
 
 # ToDo: need to check why file reading is not proper
-def redundant_pseudo_bm25(collection_data, indexed_data, relevant_docs_fname, query_dict, rel_info_enabled=False):
+def redundant_pseudo_bm25(collection_stats, indexed_data, relevant_docs_fname, query_dict, rel_info_enabled=False, doc_table=None, top_k=DEFAULT_TOP_K):
     """
     Function that performs BM25 ranking
-    :param collection_data: A dictionary containing the parsed output of teh entire
-    collection. This dictionary is of the form
-    # {CACM_file_1 : parsed_tokenized_text_file_1,
-    # CACM_file_2 : parsed_tokenized_text_file_2}
+    :param collection_stats: The CollectionStats of the collection( doc
+    lengths, average doc length, total number of words..) precomputed at
+    indexing time
     :param indexed_data: The inverted index
     {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
     term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
@@ -244,6 +247,8 @@ def redundant_pseudo_bm25(collection_data, indexed_data, relevant_docs_fname, qu
     i.e cacm.rel.txt
     :param rel_info_enabled: Default value is False
     If this param is True, then the relevance information is taken into account
+    :param doc_table: a DocTable. Must be given when the collection and the
+    index are keyed on integer doc ids
     :return: Will return a dictionary with values as lists made up of tuples that are sorted
     {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
     """
@@ -266,20 +271,20 @@ def redundant_pseudo_bm25(collection_data, indexed_data, relevant_docs_fname, qu
     # file. We need to get the relevance information
     # rel_docs_dict i sof the form:
     # {query_numb: [ < list of all docs relevant to query 1]}
-    rel_docs_dict = get_relevance_information(relevant_docs_fname)
+    rel_docs_dict = get_relevance_information(relevant_docs_fname, doc_table)
 
     # query_dict is of the form
     # {q_id: < Parsed Query >, q_id_2: < Parsed Query 2 >}
 
     # N -> Total number of collections in the data
-    N = len(collection_data)
+    N = collection_stats.num_docs
 
     # The constants
     k1 = 1.2
     b = 0.75
     k2 = 100
 
-    avg_doc_length = get_avg_doc_length(collection_data)
+    avg_doc_length = collection_stats.avg_doc_length
 
     for q in query_dict:
         # R ->  Total number of relevant documents for this query
@@ -317,8 +322,7 @@ def redundant_pseudo_bm25(collection_data, indexed_data, relevant_docs_fname, qu
                     # NOTE: In this way we are avoiding any
                     # document having f_i as 0
                     f_i = indexed_data[term][doc]
-                    K = k1 * ((1 - b) + b * len(
-                        collection_data[doc].split()) / avg_doc_length)
+                    K = k1 * ((1 - b) + b * collection_stats.doc_length(doc) / avg_doc_length)
                     z = ((k1 + 1) * f_i / (K + f_i)) * ((k2 + 1) * q_fi) / (
                                 k2 + q_fi)
                     numerator = ((r_i + 0.5) / (R - r_i + 0.5)) * z
@@ -331,7 +335,7 @@ def redundant_pseudo_bm25(collection_data, indexed_data, relevant_docs_fname, qu
                     else:
                         new_bm25_scores_dict[q][doc] = temp_score
 
-    sort_dict_according_to_scores(new_bm25_scores_dict)
+    sort_dict_according_to_scores(new_bm25_scores_dict, top_k)
     return new_bm25_scores_dict
 
 # TODO: THE BELOW CODE IS REDUNDANT. The same code is present in task_1_main.py
@@ -353,17 +357,8 @@ all_paths_dict = read_json_document(json_fname_relative_paths)
 # a json file( using the script create_collection_data_dict.py)
 
 
-# Now we will load this json file into a dictionary
-# Note: url_text_dict is of the form
-# {CACM_file_1 : parsed_tokenized_text_file_1,
-# CACM_file_2 : parsed_tokenized_text_file_2}
-
-collection_data_fname = Path(os.path.realpath(".") +
-                             all_paths_dict[
-                                 "parsed_tokenized_output_json_file"])
-
-with open(collection_data_fname) as c_fd:
-    url_text_dict = json.load(c_fd)
+# NOTE: The scorers do not need the cleaned corpus, the statistics they
+# need( doc lengths, avgdl, |C|, df, cf) are stored next to the index
 
 # Now that we have received a dictionary containing all the doc_IDs as keys
 # and their contents parsed as values, we will create the inverted index
@@ -379,8 +374,19 @@ inverted_index_json_fname = Path(os.path.realpath(".") +
                              all_paths_dict[
                                  "indexer_output_json_file"])
 
-with open(inverted_index_json_fname) as inv_fd:
-    inverted_index = json.load(inv_fd)
+# Indexes built before the doc table and the collection statistics were
+# written at indexing time get them from the corpus the index was built from
+write_index_sidecars(inverted_index_json_fname, Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"]))
+
+# Load the doc table written at indexing time, all the scoring is done on
+# the integer doc ids of this table
+doc_table = load_doc_table(doc_table_fname(inverted_index_json_fname))
+
+# Load the collection statistics written at indexing time
+collection_stats = load_collection_stats(collection_stats_fname(inverted_index_json_fname))
+
+# Memory maps the binary index if present, else loads the json index
+inverted_index = load_inverted_index(inverted_index_json_fname, doc_table)
 
 
 # Get the non-OS dependent path to the query text file
@@ -406,11 +412,13 @@ corpus_collection_path = Path(os.path.realpath(".") +
 
 # Parse the query text file
 query_dict = parse_query_text_file(query_text_file)
-relevance_dict = get_relevance_information(relevance_text_file)
+relevance_dict = get_relevance_information(relevance_text_file, doc_table)
 
-bm_25_scores_wit_rel = new_bm25_scores(url_text_dict, inverted_index,
+bm_25_scores_wit_rel = new_bm25_scores(collection_stats, inverted_index,
                                        query_text_file, relevance_text_file,
-                                       rel_info_enabled=True)
+                                       rel_info_enabled=True,
+                                       doc_table=doc_table,
+                                       top_k=None)
 
 pseudo_rel_scores = pseudo_relevance_feedback(bm_25_scores_wit_rel,
                                               query_dict,
@@ -422,6 +430,6 @@ output_text_fname = Path(os.path.realpath(".") +
                                  "pseudo_relevance_feedback_scores"])
 
 write_top_100_scores_to_txt(pseudo_rel_scores, output_text_fname,
-                            "pseudo_rel_feedback")
+                            "pseudo_rel_feedback", doc_table)
 
 
@@ -0,0 +1,521 @@
+"""
+Python file which runs structured queries( see query_parser.py for the
+syntax) on the compact positional index( see positional_index.py)
+
+A query is compiled into a tree of iterators. Every iterator walks the docs
+matching its part of the query in increasing order of doc id, like the
+postings cursors of postings_cursor.py
+iterator.doc             -> the doc id it is on( END once it is exhausted)
+iterator.next()          -> moves to the next matching doc
+iterator.advance(target) -> moves to the first matching doc >= target
+iterator.score()         -> the score of the current doc
+iterator.cost()          -> an upper bound on the number of docs it matches
+
+The planner orders the children of every AND on their cost, the rarest one
+leads and the others are only advanced to its docs. NOT is never evaluated
+on its own: the NOTs under an AND are pushed down as filters that are only
+checked on the docs matched by the other children
+
+Scores
+    term                          -> the term frequency in the doc
+    phrase, ordered proximity, NEAR -> the number of matching windows
+    AND, OR                       -> the sum of the scores of the children
+                                     that match the doc
+    NOT                           -> 0
+
+The best match, exact match and ordered proximity match runs of the CACM
+queries are three queries of this language
+best_match    -> t1 OR t2 OR t3 ...
+exact_match   -> "t1 t2 t3 ..."
+ordered_match -> "t1 t2 t3 ..."/N
+
+>>> python query_engine.py -j all_paths.json -m best_match
+>>> python query_engine.py -j all_paths.json -m query -q '"parallel algorithms" NOT sorting' -e True
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from baseline_runs import sort_dict_according_to_scores, write_top_100_scores_to_txt, DEFAULT_TOP_K
+from parse_queries import parse_query_text_file
+from positional_index import PositionalIndex
+from positional_operators import phrase_positions, ordered_window_count, unordered_window_count
+from postings_cursor import END, PostingsCursor, union_docs
+from query_parser import parse_query
+
+
+# Output path keys( all_paths.json) of the runs over the CACM queries
+RUN_OUTPUT_KEYS = {"best_match": "extra_credit_output_best_match",
+                   "exact_match": "extra_credit_output_exact_match",
+                   "ordered_match": "extra_credit_output_ordered_match"}
+
+
+class TermIterator(PostingsCursor):
+    """
+    The docs containing a term
+    """
+
+    # The score of a term is its term frequency
+    score = PostingsCursor.freq
+
+    def cost(self):
+        return len(self)
+
+    def describe(self):
+        return "TERM " + self.term
+
+
+class AllDocsIterator:
+    """
+    All the docs of the collection( the docs a NOT is applied to when there
+    is nothing else to filter)
+    """
+
+    def __init__(self, num_docs):
+        """
+        :param num_docs: the number of docs of the collection
+        """
+        self.num_docs = num_docs
+        self.doc = END
+        self.children = []
+        self.filters = []
+        self.advance(0)
+
+    def next(self):
+        return self.advance(self.doc + 1)
+
+    def advance(self, target):
+        if self.doc != END and self.doc >= target:
+            return self.doc
+        self.doc = target if target < self.num_docs else END
+        return self.doc
+
+    def score(self):
+        return 0
+
+    def cost(self):
+        return self.num_docs
+
+    def describe(self):
+        return "ALL DOCS"
+
+
+class AndIterator:
+    """
+    The docs matched by all the children and by none of the filters
+    """
+
+    def __init__(self, children, filters=()):
+        """
+        :param children: the iterators that must match, in increasing order
+        of cost( the first one leads)
+        :param filters: the iterators that must not match( the pushed down
+        NOTs)
+        """
+        self.children = list(children)
+        self.filters = list(filters)
+        self.doc = END
+        self._find(self.children[0].doc)
+
+    def accept(self, doc):
+        """
+        Function which is called on every doc matched by all the children and
+        none of the filters, the positional iterators check the positions
+        :return: True if the doc matches
+        """
+        return True
+
+    def _find(self, target):
+        """
+        Helper function which moves to the first matching doc >= target
+        """
+        lead = self.children[0]
+        while True:
+            doc = lead.advance(target)
+            if doc == END:
+                self.doc = END
+                return
+
+            # The other children are only advanced to the docs of the lead
+            target = doc
+            for child in self.children[1:]:
+                child_doc = child.advance(doc)
+                if child_doc != doc:
+                    target = child_doc
+                    break
+
+            if target == END:
+                self.doc = END
+                return
+            if target != doc:
+                continue
+
+            # The filters are only checked on the docs matched by the children
+            if not any(doc_filter.advance(doc) == doc for doc_filter in self.filters) and self.accept(doc):
+                self.doc = doc
+                return
+            target = doc + 1
+
+    def next(self):
+        self._find(self.doc + 1)
+        return self.doc
+
+    def advance(self, target):
+        if self.doc < target:
+            self._find(target)
+        return self.doc
+
+    def score(self):
+        return sum(child.score() for child in self.children)
+
+    def cost(self):
+        return self.children[0].cost()
+
+    def describe(self):
+        return "AND"
+
+
+class OrIterator:
+    """
+    The docs matched by any of the children
+    The children are walked with union_docs( see postings_cursor.py): they
+    are kept in a min heap keyed on their current doc id, so a doc costs
+    log(number of children) instead of a scan of all the children
+    """
+
+    def __init__(self, children):
+        """
+        :param children: the iterators
+        """
+        self.children = list(children)
+        self.filters = []
+        self._restart()
+
+    def _restart(self):
+        """
+        Helper function which builds the heap from the current docs of the
+        children and moves to the smallest one
+        """
+        self._union = union_docs(self.children)
+        self.next()
+
+    def next(self):
+        # The matched children are moved to their next doc when the union is
+        # resumed
+        self.doc, self._matched = next(self._union, (END, []))
+        return self.doc
+
+    def advance(self, target):
+        if self.doc < target:
+            # Note: The children jump straight to target, the heap is rebuilt
+            # instead of walking the docs in between
+            for child in self.children:
+                child.advance(target)
+            self._restart()
+        return self.doc
+
+    def score(self):
+        return sum([child.score() for child in self._matched])
+
+    def cost(self):
+        return sum(child.cost() for child in self.children)
+
+    def describe(self):
+        return "OR"
+
+
+class PositionalIterator(AndIterator):
+    """
+    The docs in which the terms match a positional operator( phrase, ordered
+    or unordered window, see positional_operators.py)
+    The docs containing all the terms are found like an AND, the positions
+    are only decoded for them
+    """
+
+    def __init__(self, positional_index, terms, window, count_function, name):
+        """
+        :param positional_index: the PositionalIndex
+        :param terms: the terms, in the order of the query
+        :param window: the window of the operator( None for a phrase)
+        :param count_function: function(positional_index, terms, window, doc)
+        which returns the number of matches of the operator in a doc
+        :param name: the name shown by describe
+        """
+        self.positional_index = positional_index
+        self.terms = terms
+        self.window = window
+        self.count_function = count_function
+        self.name = name
+        self._count = 0
+
+        cursors = [TermIterator.for_term(positional_index, term) for term in dict.fromkeys(terms)]
+        super().__init__(sorted(cursors, key=lambda cursor: cursor.cost()))
+
+    def accept(self, doc):
+        self._count = self.count_function(self.positional_index, self.terms, self.window, doc)
+        return self._count > 0
+
+    def score(self):
+        return self._count
+
+    def describe(self):
+        return self.name + " " + " ".join(self.terms)
+
+
+def phrase_count(positional_index, terms, window, doc):
+    """
+    Helper function which counts the occurrences of a phrase in a doc
+    """
+    return len(phrase_positions(positional_index, terms, doc))
+
+
+def flatten(node, kind):
+    """
+    Helper function which returns the children of nested nodes of the same
+    kind as one list( (a AND b) AND c -> a, b, c)
+    """
+    children = []
+    for child in node[1]:
+        if child[0] == kind:
+            children.extend(flatten(child, kind))
+        else:
+            children.append(child)
+    return children
+
+
+def plan(node, positional_index):
+    """
+    Function which compiles a query tree( see query_parser.py) into a tree of
+    iterators
+    :param node: the query tree
+    :param positional_index: the PositionalIndex
+    :return: the root iterator
+    """
+    kind = node[0]
+
+    if kind == "term":
+        return TermIterator.for_term(positional_index, node[1])
+
+    if kind in ("phrase", "near"):
+        terms, window = node[1], node[2]
+        if len(terms) == 1:
+            return TermIterator.for_term(positional_index, terms[0])
+        if kind == "near":
+            # At most window other words inside the window of the terms
+            return PositionalIterator(positional_index, terms, len(terms) + window,
+                                      unordered_window_count, "NEAR/" + str(window))
+        if window is None:
+            return PositionalIterator(positional_index, terms, None, phrase_count, "PHRASE")
+        # At most window words between two consecutive terms
+        return PositionalIterator(positional_index, terms, window + 1, ordered_window_count,
+                                  "ORDERED/" + str(window))
+
+    if kind == "or":
+        children = [plan(child, positional_index) for child in flatten(node, "or")]
+        return OrIterator(sorted(children, key=lambda child: child.cost()))
+
+    if kind == "not":
+        # NOT NOT a is a
+        if node[1][0] == "not":
+            return plan(node[1][1], positional_index)
+        # A NOT on its own filters all the docs
+        return AndIterator([AllDocsIterator(len(positional_index.doc_table()))],
+                           [plan(node[1], positional_index)])
+
+    # AND: the NOTs are pushed down as filters of the other children
+    children, filters = [], []
+    for child in flatten(node, "and"):
+        if child[0] == "not" and child[1][0] == "not":
+            children.append(plan(child[1][1], positional_index))
+        elif child[0] == "not":
+            filters.append(plan(child[1], positional_index))
+        else:
+            children.append(plan(child, positional_index))
+
+    if not children:
+        children.append(AllDocsIterator(len(positional_index.doc_table())))
+
+    # The rarest child leads. The most frequent filters are checked first,
+    # they are the most likely to drop a doc
+    children.sort(key=lambda child: child.cost())
+    filters.sort(key=lambda doc_filter: -doc_filter.cost())
+    if len(children) == 1 and not filters:
+        return children[0]
+    return AndIterator(children, filters)
+
+
+def explain(iterator, depth=0):
+    """
+    Function which describes a tree of iterators, one line per iterator with
+    its estimated cost
+    :return: the list of lines
+    """
+    lines = ["  " * depth + iterator.describe() + " (cost " + str(iterator.cost()) + ")"]
+    if not isinstance(iterator, PositionalIterator):
+        for child in getattr(iterator, "children", []):
+            lines.extend(explain(child, depth + 1))
+    for doc_filter in getattr(iterator, "filters", []):
+        lines.append("  " * (depth + 1) + "NOT")
+        lines.extend(explain(doc_filter, depth + 2))
+    return lines
+
+
+def evaluate(iterator):
+    """
+    Function which runs a tree of iterators
+    :return: a dictionary {doc_id : score} of the matching docs, in
+    increasing order of doc id
+    """
+    doc_scores = {}
+    # Note: The methods are looked up once, the loop runs once per matching
+    # doc( most of the corpus for a wide OR)
+    score, next_doc = iterator.score, iterator.next
+    doc = iterator.doc
+    while doc != END:
+        doc_scores[doc] = score()
+        doc = next_doc()
+    return doc_scores
+
+
+def search(positional_index, query):
+    """
+    Function which runs a structured query
+    :param positional_index: the PositionalIndex
+    :param query: the query string( see query_parser.py) or an already
+    parsed query tree
+    :return: a dictionary {doc_id : score} of the matching docs
+    """
+    if isinstance(query, str):
+        query = parse_query(query)
+    return evaluate(plan(query, positional_index))
+
+
+def cacm_query_tree(mode, query_text, N=None):
+    """
+    Function which turns a CACM query into the query tree of a run
+    :param mode: best_match, exact_match or ordered_match
+    :param query_text: the parsed query
+    :param N: the window of ordered_match( words between two consecutive
+    query terms)
+    :return: the query tree, None if the query has no terms
+    """
+    terms = query_text.split()
+    if not terms:
+        return None
+    if mode == "best_match":
+        return "or", [("term", term) for term in sorted(set(terms))]
+    if mode == "exact_match":
+        return "phrase", terms, None
+    return "phrase", terms, N
+
+
+def run_cacm_queries(positional_index, query_text_file, mode, N=None, top_k=DEFAULT_TOP_K):
+    """
+    Function which scores the CACM queries with one of the runs
+    :param positional_index: the PositionalIndex
+    :param query_text_file: the path to the CACM query file
+    :param mode: best_match, exact_match or ordered_match
+    :param N: the window of ordered_match
+    :return: a dictionary {query_id : [(doc_id, score), ...]} sorted on the
+    score
+    """
+    scores = {}
+    for i in range(1, 65):
+        scores[i] = {}
+
+    query_dict = parse_query_text_file(query_text_file)
+    for q in query_dict:
+        query_tree = cacm_query_tree(mode, query_dict[q], N)
+        if query_tree is not None:
+            scores[q] = search(positional_index, query_tree)
+
+    sort_dict_according_to_scores(scores, top_k)
+    return scores
+
+
+def print_query_results(positional_index, query, show_plan=False, top_k=10):
+    """
+    Function which runs a structured query and prints the top docs
+    :param positional_index: the PositionalIndex
+    :param query: the query string
+    :param show_plan: if True the plan of the query is printed first
+    :param top_k: the number of docs printed
+    """
+    root = plan(parse_query(query), positional_index)
+    if show_plan:
+        print("\n".join(explain(root)))
+
+    doc_scores = evaluate(root)
+    print(len(doc_scores), "matching documents")
+
+    doc_table = positional_index.doc_table()
+    ranked = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    for rank, (doc, score) in enumerate(ranked, start=1):
+        print(rank, doc_table.doc_name(doc), score)
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-m", "--mode", help="Enter best_match, exact_match or ordered_match to score the CACM "
+                                         "queries, or query to run the query given with -q",
+                    choices=["best_match", "exact_match", "ordered_match", "query"], required=True)
+
+    ap.add_argument("-N", "--window_size", type=int, default=0,
+                    help="Enter the number of words allowed between two consecutive query terms of "
+                         "ordered_match( default 0)", required=False)
+
+    ap.add_argument("-q", "--query", help="Enter the structured query( Example: "
+                                          "'\"parallel algorithms\" NOT sorting')", required=False)
+
+    ap.add_argument("-e", "--explain", help="Enter True to print the plan of the query",
+                    default=False, required=False)
+
+    ap.add_argument("-k", "--top_k", type=int, default=10,
+                    help="Enter the number of docs printed for a query( default 10)", required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    # NOTE: We have already created the positional index with the script
+    # generate_position_based_index.py, which also wrote the compact
+    # positional index used here
+    positional_index_json_fname = Path(os.path.realpath(".") + all_paths_dict["positional_index"])
+
+    with PositionalIndex(positional_index_json_fname) as positional_index:
+        doc_table = positional_index.doc_table()
+        mode = user_args["mode"]
+
+        if mode == "query":
+            if not user_args["query"]:
+                raise ValueError("Enter the query with -q")
+
+            print_query_results(positional_index, user_args["query"], str(user_args["explain"]) == "True",
+                                user_args["top_k"])
+        else:
+            query_text_fname = Path(os.path.realpath(".") + all_paths_dict["test_data"]["query_text_file"])
+            output_fname = Path(os.path.realpath(".") + all_paths_dict[RUN_OUTPUT_KEYS[mode]])
+
+            run_scores = run_cacm_queries(positional_index, query_text_fname, mode, user_args["window_size"])
+
+            method_name = mode
+            if mode == "ordered_match":
+                method_name = mode + "_" + str(user_args["window_size"])
+            write_top_100_scores_to_txt(run_scores, output_fname, method_name, doc_table)
@@ -0,0 +1,182 @@
+"""
+Python file which parses the structured query language of query_engine.py
+
+Syntax( the operators are upper case, the terms are lower cased like the
+cleaned corpus)
+    term            -> a document containing the term
+    "t1 t2 t3"      -> phrase, the terms next to each other in this order
+    "t1 t2 t3"/N    -> ordered proximity, the terms in this order with at most
+                       N words between two consecutive terms
+    t1 NEAR/N t2    -> unordered proximity, the terms in any order with at
+                       most N other words inside their window
+                       ( t1 NEAR/N t2 NEAR/N t3 is one window of the 3 terms)
+    a AND b, a b    -> both( AND is implied between two operands)
+    a OR b          -> any of them
+    NOT a           -> the documents not matching a
+    ( ... )         -> grouping
+
+Precedence, from the tightest: NOT, NEAR/N, AND, OR
+Example: "parallel algorithms" OR (sorting NEAR/3 networks) NOT survey
+
+The parser returns a tree of tuples
+    ("term", term)
+    ("phrase", [term_1, term_2, ...], N)   -> N is None for an exact phrase
+    ("near", [term_1, term_2, ...], N)
+    ("and", [child_1, child_2, ...])
+    ("or", [child_1, child_2, ...])
+    ("not", child)
+"""
+
+import re
+
+
+# Tokens of the query language: parentheses, quoted phrases with an optional
+# /N, NEAR/N and the words( terms and AND, OR, NOT)
+TOKEN_PATTERN = re.compile(r'\(|\)|"[^"]*"(?:/\d+)?|NEAR/\d+|[^\s()"]+')
+
+BOOLEAN_OPERATORS = ("AND", "OR", "NOT")
+
+
+def tokenize(query):
+    """
+    Function which splits a query into tokens
+    :param query: the query string
+    :return: the list of tokens
+    """
+    if query.count('"') % 2:
+        raise ValueError("The query " + query + " has an unterminated phrase")
+    return TOKEN_PATTERN.findall(query)
+
+
+def phrase_node(token):
+    """
+    Helper function which turns a quoted token into a phrase node
+    :param token: the token( Example: "parallel algorithms"/2)
+    :return: a ("phrase", terms, N) tuple, a ("term", term) tuple for a one
+    word exact phrase
+    """
+    text, _, window = token[1:].rpartition('"')
+    terms = text.lower().split()
+    if not terms:
+        raise ValueError("The phrase " + token + " is empty")
+
+    slop = int(window[1:]) if window else None
+    if len(terms) == 1:
+        return "term", terms[0]
+    return "phrase", terms, slop
+
+
+class QueryParser:
+    """
+    A recursive descent parser over the tokens of a query
+    """
+
+    def __init__(self, query):
+        """
+        :param query: the query string
+        """
+        self.query = query
+        self.tokens = tokenize(query)
+        self.position = 0
+
+    def peek(self):
+        """
+        Function which returns the current token, None at the end
+        """
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self):
+        """
+        Function which returns the current token and moves past it
+        """
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def error(self, message):
+        raise ValueError("Can not parse the query " + self.query + ": " + message)
+
+    def parse(self):
+        """
+        Function which parses the whole query
+        :return: the tree of the query
+        """
+        if not self.tokens:
+            self.error("the query is empty")
+
+        node = self.parse_or()
+        if self.peek() is not None:
+            self.error("unexpected " + self.peek())
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_near()]
+        while self.peek() is not None and self.peek() not in (")", "OR"):
+            # AND is implied between two operands
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_near())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_near(self):
+        node = self.parse_unary()
+        if self.peek() is None or not self.peek().startswith("NEAR/"):
+            return node
+
+        terms = [node]
+        window = self.near_window(self.peek())
+        while self.peek() is not None and self.peek().startswith("NEAR/"):
+            if self.near_window(self.take()) != window:
+                self.error("a chain of NEAR must use the same window")
+            terms.append(self.parse_unary())
+
+        if any(term[0] != "term" for term in terms):
+            self.error("NEAR only takes terms")
+        return "near", [term[1] for term in terms], window
+
+    def near_window(self, token):
+        """
+        Function which returns the window N of a NEAR/N token
+        """
+        # Note: NEAR/x or NEAR/ are read as words by the tokenizer
+        window = token[len("NEAR/"):]
+        if not (window.isascii() and window.isdigit()):
+            self.error("NEAR needs a number, Example: NEAR/3")
+        return int(window)
+
+    def parse_unary(self):
+        token = self.take()
+        if token is None:
+            self.error("the query ends with an operator")
+
+        if token == "NOT":
+            return "not", self.parse_unary()
+        if token == "(":
+            node = self.parse_or()
+            if self.take() != ")":
+                self.error("missing )")
+            return node
+        if token.startswith('"'):
+            return phrase_node(token)
+        if token == ")" or token in BOOLEAN_OPERATORS or token.startswith("NEAR/"):
+            self.error("unexpected " + token)
+        return "term", token.lower()
+
+
+def parse_query(query):
+    """
+    Function which parses a structured query
+    :param query: the query string
+    ( Example: "parallel algorithms" OR (sorting NEAR/3 networks) NOT survey)
+    :return: the tree of the query( see the top of this file)
+    """
+    return QueryParser(query).parse()
@@ -0,0 +1,859 @@
+"""
+Python file which maintains an incremental, segment based inverted index
+
+Instead of re-building the whole index when a document is added or changed,
+the index is made of segments
+    delta segment  -> the documents added since the last flush, kept in memory
+                      and searchable right away
+    disk segments  -> immutable binary indexes( binary_index.py), one per flush
+                      or per merge
+    tombstones     -> the documents that were deleted( or replaced by a newer
+                      version), they stay in their segment until it is merged
+
+Every document gets a global doc id in the order it was added. Changing a
+document deletes the old version and adds the new one with a new global id
+
+The segments are merged by a size tiered policy: the segments are grouped in
+tiers of similar sizes and merge_factor segments of the same tier are merged
+into one segment of the next tier. The merges run on a background thread and
+drop the deleted documents
+
+The scorers never see the segments, a snapshot of the index
+( SegmentedIndexView) behaves like one BinaryInvertedIndex keyed on dense
+integer doc ids 0, 1, 2 .. of the live documents, in the order they were
+added, with its own DocTable and CollectionStats
+
+All the segment files and the manifest( segments.json) are stored in one
+directory. The manifest is of the form
+{"doc_names" : [doc name of every global doc id],
+"doc_lengths" : [length of every global doc id],
+"deleted" : [global doc ids of the deleted documents],
+"stop_words" : [the stop words] or null,
+"next_segment" : number of the next segment file,
+"segments" : [{"name" : "segment_0", "doc_ids" : [global doc ids]}, ...]}
+"""
+
+import argparse
+import array
+import bisect
+import collections
+import json
+import math
+import os
+import errno
+import threading
+from pathlib import Path
+from binary_index import BinaryInvertedIndex, write_binary_index
+from collection_stats import CollectionStats, max_bm25_saturation
+from corpus_stream import iter_corpus
+from doc_table import DocTable
+
+
+# Name of the manifest file in the index directory
+MANIFEST_FNAME = "segments.json"
+
+# Number of documents the delta segment holds before it is written to disk
+DEFAULT_MAX_BUFFERED_DOCS = 500
+
+# Number of segments of the same tier that are merged together
+DEFAULT_MERGE_FACTOR = 4
+
+# Segments up to this number of documents are all in the lowest tier
+DEFAULT_MIN_SEGMENT_DOCS = 100
+
+
+def tokenize_document(text, stop_words=None):
+    """
+    Function which counts the terms of a cleaned document
+    ( Same tokenization as create_index.py)
+    :param text: the cleaned contents of the document
+    :param stop_words: the stop words, they are not indexed
+    :return: a tuple of a dictionary {term : frequency} and the number of words
+    in the document( the stop words are counted)
+    """
+    words = text.split()
+
+    term_freqs = {}
+    for word in words:
+        if stop_words and word in stop_words:
+            continue
+        term_freqs[word] = term_freqs.get(word, 0) + 1
+
+    return term_freqs, len(words)
+
+
+class MemorySegment:
+    """
+    The delta segment, postings of the documents added since the last flush
+    """
+
+    def __init__(self):
+        # global doc ids of the documents of the segment, in increasing order
+        self.doc_ids = []
+
+        # {term : {global doc id : frequency}}
+        self.inv_index = {}
+
+        # (tombstones, statistics) of the last segment_term_stats call, only
+        # set on the frozen copies of the delta segment
+        self.term_stats = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def frozen_copy(self):
+        """
+        Function which copies the segment for a snapshot, the copy does not
+        change when documents are added to this segment later
+        :return: a MemorySegment
+        """
+        segment = MemorySegment()
+        segment.doc_ids = list(self.doc_ids)
+        segment.inv_index = {term: dict(postings) for term, postings in self.inv_index.items()}
+        return segment
+
+    def add(self, doc_id, term_freqs):
+        """
+        Function which adds a document to the segment
+        :param doc_id: the global doc id, larger than all the doc ids of the
+        segment
+        :param term_freqs: dictionary of the form {term : frequency}
+        """
+        self.doc_ids.append(doc_id)
+        for term, freq in term_freqs.items():
+            if term in self.inv_index:
+                self.inv_index[term][doc_id] = freq
+            else:
+                self.inv_index[term] = {doc_id: freq}
+
+    def terms(self):
+        return self.inv_index.keys()
+
+    def postings(self, term):
+        """
+        Function which returns the postings of a term
+        :return: an iterable of (global doc id, frequency) tuples in
+        increasing order of doc id
+        """
+        return self.inv_index.get(term, {}).items()
+
+
+class DiskSegment:
+    """
+    An immutable segment written to a binary index file
+    The binary index is keyed on local doc ids 0, 1, 2 .., the i'th local doc
+    id is the i'th global doc id in doc_ids
+    """
+
+    def __init__(self, name, fname, doc_ids):
+        """
+        :param name: the name of the segment( Example: segment_3)
+        :param fname: the path to the binary index of the segment
+        :param doc_ids: the global doc ids of the documents of the segment,
+        in increasing order
+        """
+        self.name = name
+        self.fname = str(fname)
+        self.doc_ids = array.array("I", doc_ids)
+        self.index = BinaryInvertedIndex(fname, int_doc_ids=True)
+
+        # (tombstones, statistics) of the last segment_term_stats call
+        self.term_stats = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id):
+        position = bisect.bisect_left(self.doc_ids, doc_id)
+        return position < len(self.doc_ids) and self.doc_ids[position] == doc_id
+
+    def terms(self):
+        return iter(self.index)
+
+    def postings(self, term):
+        """
+        Function which returns the postings of a term
+        :return: an iterable of (global doc id, frequency) tuples in
+        increasing order of doc id
+        """
+        local_ids, freqs = self.index.postings(term)
+        doc_ids = self.doc_ids
+        return ((doc_ids[local_id], freq) for local_id, freq in zip(local_ids, freqs))
+
+
+def segment_term_stats(segment, live_doc_lengths):
+    """
+    Function which computes the statistics of the live postings of a segment
+    The segments never change( the delta segment is frozen in the snapshots),
+    so the statistics are only computed again when the tombstones of the
+    segment changed
+    :param segment: a DiskSegment or a frozen MemorySegment
+    :param live_doc_lengths: dictionary of the form {global doc id : doc length}
+    of the live documents
+    :return: a dictionary of the form {term : (df, cf, frontier)} where the
+    frontier is the list of the (frequency, doc length) of the live postings
+    of the term that no other posting beats on both( a larger frequency and
+    a smaller doc length), the BM25 max saturation of the term is reached on
+    one of them
+    """
+    tombstones = frozenset(doc_id for doc_id in segment.doc_ids if doc_id not in live_doc_lengths)
+    if segment.term_stats is not None and segment.term_stats[0] == tombstones:
+        return segment.term_stats[1]
+
+    term_stats = {}
+    for term in segment.terms():
+        postings = [(freq, live_doc_lengths[doc_id]) for doc_id, freq in segment.postings(term)
+                    if doc_id not in tombstones]
+        if not postings:
+            continue
+
+        # Shortest documents first, and the largest frequency first for the
+        # same doc length
+        frontier = []
+        for freq, doc_length in sorted(postings, key=lambda x: (x[1], -x[0])):
+            if not frontier or freq > frontier[-1][0]:
+                frontier.append((freq, doc_length))
+
+        term_stats[term] = (len(postings), sum(freq for freq, _ in postings), frontier)
+
+    segment.term_stats = (tombstones, term_stats)
+    return term_stats
+
+
+class SizeTieredMergePolicy:
+    """
+    Picks the segments to merge: a segment of n live documents is in tier 0
+    if n <= min_segment_docs, else in tier 1 + log_merge_factor(n / min_segment_docs)
+    As soon as a tier holds merge_factor segments, its merge_factor smallest
+    segments are merged
+    """
+
+    def __init__(self, merge_factor=DEFAULT_MERGE_FACTOR, min_segment_docs=DEFAULT_MIN_SEGMENT_DOCS):
+        self.merge_factor = merge_factor
+        self.min_segment_docs = min_segment_docs
+
+    def tier(self, num_docs):
+        """
+        Function which returns the tier of a segment of num_docs documents
+        """
+        if num_docs <= self.min_segment_docs:
+            return 0
+        return 1 + int(math.log(num_docs / self.min_segment_docs, self.merge_factor))
+
+    def find_merge(self, segment_sizes):
+        """
+        Function which picks the next segments to merge
+        :param segment_sizes: a list of (segment, number of live documents)
+        :return: the list of segments to merge, None if there is nothing to
+        merge
+        """
+        tiers = collections.defaultdict(list)
+        for segment, num_docs in segment_sizes:
+            tiers[self.tier(num_docs)].append((num_docs, segment))
+
+        # Merge the smallest segments first
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                smallest = sorted(tiers[tier], key=lambda x: x[0])[:self.merge_factor]
+                return [segment for _, segment in smallest]
+        return None
+
+
+class SegmentedIndex:
+    """
+    An index made of an in-memory delta segment and of disk segments, with
+    tombstones for the deleted documents and background merges
+    """
+
+    def __init__(self, index_dir, stop_words=None, max_buffered_docs=DEFAULT_MAX_BUFFERED_DOCS,
+                 merge_policy=None, background_merges=True):
+        """
+        :param index_dir: the directory of the segments and of the manifest
+        If it already holds an index, the index is opened
+        :param stop_words: the stop words, only used for a new index( the
+        stop words of an existing index are stored in its manifest)
+        :param max_buffered_docs: number of documents the delta segment holds
+        before it is flushed to disk
+        :param merge_policy: a SizeTieredMergePolicy( by default the default
+        SizeTieredMergePolicy)
+        :param background_merges: If True, the merges run on a background
+        thread, else they run right after the flush
+        """
+        self.index_dir = Path(index_dir)
+        self.max_buffered_docs = max_buffered_docs
+        self.merge_policy = merge_policy if merge_policy is not None else SizeTieredMergePolicy()
+        self.background_merges = background_merges
+
+        # Every global doc id has a doc name and a doc length
+        self.doc_names = []
+        self.doc_lengths = []
+        self.deleted = set()
+        self.stop_words = stop_words
+        self._stop_word_set = set(stop_words or [])
+        self.segments = []
+        self.next_segment = 0
+
+        # {doc name : global doc id} of the live documents
+        self.live_ids = {}
+
+        self.delta = MemorySegment()
+
+        # Guards the segments, the delta segment and the tombstones
+        # Note: A merge only holds the lock to pick its segments and to
+        # replace them, not while the merged segment is written
+        self._lock = threading.RLock()
+        self._merge_thread = None
+
+        # Segment files replaced by a merge that could not be removed yet
+        # ( a memory mapped file can not be removed on Windows)
+        self._obsolete_files = []
+
+        # Every change of the index bumps the generation, the snapshot is
+        # only rebuilt when the generation changed
+        self._generation = 0
+        self._snapshot = None
+
+        if os.path.exists(self.index_dir / MANIFEST_FNAME):
+            self._load_manifest()
+
+    def _load_manifest(self):
+        """
+        Helper function which opens the segments listed in the manifest
+        """
+        with open(self.index_dir / MANIFEST_FNAME) as fd:
+            manifest = json.load(fd)
+
+        self.doc_names = manifest["doc_names"]
+        self.doc_lengths = manifest["doc_lengths"]
+        self.deleted = set(manifest["deleted"])
+        self.stop_words = manifest["stop_words"]
+        self._stop_word_set = set(self.stop_words or [])
+        self.next_segment = manifest["next_segment"]
+        self.segments = [DiskSegment(segment["name"], self._segment_fname(segment["name"]), segment["doc_ids"])
+                         for segment in manifest["segments"]]
+
+        for segment in self.segments:
+            for doc_id in segment.doc_ids:
+                if doc_id not in self.deleted:
+                    self.live_ids[self.doc_names[doc_id]] = doc_id
+
+    def _save_manifest(self):
+        """
+        Helper function which writes the manifest( the delta segment is not
+        part of it until it is flushed)
+        """
+        if not os.path.exists(self.index_dir):
+            try:
+                os.makedirs(self.index_dir)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+
+        manifest = {"doc_names": self.doc_names,
+                    "doc_lengths": self.doc_lengths,
+                    "deleted": sorted(self.deleted),
+                    "stop_words": self.stop_words,
+                    "next_segment": self.next_segment,
+                    "segments": [{"name": segment.name, "doc_ids": segment.doc_ids.tolist()}
+                                 for segment in self.segments]}
+
+        # Write the new manifest next to the old one and swap them, so that
+        # the manifest is never half written
+        tmp_fname = self.index_dir / (MANIFEST_FNAME + ".tmp")
+        with open(tmp_fname, "w+") as o_fd:
+            json.dump(manifest, o_fd)
+        os.replace(tmp_fname, self.index_dir / MANIFEST_FNAME)
+
+    def _segment_fname(self, name):
+        return self.index_dir / (name + ".bin")
+
+    def _changed(self):
+        self._generation += 1
+        self._snapshot = None
+
+    def add_document(self, doc_name, text):
+        """
+        Function which adds a document to the delta segment, it is searchable
+        right away. If a document with the same name is already indexed, it
+        is replaced
+        :param doc_name: the doc name( Example: CACM-0074)
+        :param text: the cleaned contents of the document
+        :return: the global doc id of the document
+        """
+        term_freqs, doc_length = tokenize_document(text, self._stop_word_set)
+
+        with self._lock:
+            self.delete_document(doc_name)
+
+            doc_id = len(self.doc_names)
+            self.doc_names.append(doc_name)
+            self.doc_lengths.append(doc_length)
+            self.live_ids[doc_name] = doc_id
+            self.delta.add(doc_id, term_freqs)
+            self._changed()
+
+            if len(self.delta) >= self.max_buffered_docs:
+                self.flush()
+
+        return doc_id
+
+    def delete_document(self, doc_name):
+        """
+        Function which deletes a document( adds a tombstone)
+        :param doc_name: the doc name
+        :return: True if the document was indexed
+        """
+        with self._lock:
+            doc_id = self.live_ids.pop(doc_name, None)
+            if doc_id is None:
+                return False
+            self.deleted.add(doc_id)
+            self._changed()
+            return True
+
+    def flush(self):
+        """
+        Function which writes the delta segment to a new disk segment and
+        starts the merges picked by the merge policy
+        """
+        with self._lock:
+            delta = self.delta
+            if not len(delta):
+                return
+
+            self.delta = MemorySegment()
+            segment = self._write_segment([delta], set(self.deleted))
+            if segment is not None:
+                self.segments.append(segment)
+            self._changed()
+            self._save_manifest()
+
+        self.maybe_merge()
+
+    def commit(self):
+        """
+        Function which flushes the delta segment and writes the manifest
+        """
+        with self._lock:
+            self.flush()
+            self._save_manifest()
+            self._remove_obsolete_files()
+
+    def _write_segment(self, segments, deleted):
+        """
+        Helper function which writes the live documents of some segments to a
+        new disk segment
+        :param segments: the segments( memory or disk) to write
+        :param deleted: the global doc ids to leave out
+        :return: the DiskSegment, None if all the documents were deleted
+        """
+        doc_ids = sorted(doc_id for segment in segments for doc_id in segment.doc_ids
+                         if doc_id not in deleted)
+        if not doc_ids:
+            return None
+
+        # The binary index is keyed on the doc names, in increasing order of
+        # global doc id
+        # Note: The live documents all have different names
+        inv_index = {}
+        for segment in segments:
+            for term in segment.terms():
+                for doc_id, freq in segment.postings(term):
+                    if doc_id in deleted:
+                        continue
+                    if term in inv_index:
+                        inv_index[term][self.doc_names[doc_id]] = freq
+                    else:
+                        inv_index[term] = {self.doc_names[doc_id]: freq}
+
+        with self._lock:
+            name = "segment_" + str(self.next_segment)
+            self.next_segment += 1
+
+        fname = self._segment_fname(name)
+        write_binary_index(inv_index, fname,
+                           doc_names=[self.doc_names[doc_id] for doc_id in doc_ids],
+                           doc_lengths=[self.doc_lengths[doc_id] for doc_id in doc_ids])
+        return DiskSegment(name, fname, doc_ids)
+
+    def maybe_merge(self):
+        """
+        Function which runs the merges picked by the merge policy, on a
+        background thread if background_merges is True
+        """
+        if not self.background_merges:
+            self._merge_loop()
+            return
+
+        with self._lock:
+            if self._merge_thread is not None:
+                # The running merge thread looks for new merges once it is done
+                return
+            self._merge_thread = threading.Thread(target=self._merge_loop, daemon=True)
+            self._merge_thread.start()
+
+    def _merge_loop(self):
+        """
+        Helper function which merges segments until the merge policy finds
+        nothing to merge
+        """
+        while True:
+            with self._lock:
+                segment_sizes = [(segment, sum(1 for doc_id in segment.doc_ids if doc_id not in self.deleted))
+                                 for segment in self.segments]
+                to_merge = self.merge_policy.find_merge(segment_sizes)
+                if to_merge is None:
+                    # Note: Cleared under the lock, so a flush after this
+                    # point starts a new merge thread
+                    self._merge_thread = None
+                    return
+                deleted = set(self.deleted)
+
+            # The documents deleted while the merge runs stay in the merged
+            # segment as tombstones
+            merged = self._write_segment(to_merge, deleted)
+
+            with self._lock:
+                position = self.segments.index(to_merge[0])
+                self.segments = [segment for segment in self.segments if segment not in to_merge]
+                if merged is not None:
+                    self.segments.insert(position, merged)
+                self._obsolete_files.extend(segment.fname for segment in to_merge)
+
+                # The tombstones of the documents that are in no segment
+                # anymore are not needed
+                delta_doc_ids = set(self.delta.doc_ids)
+                self.deleted = {doc_id for doc_id in self.deleted
+                                if doc_id in delta_doc_ids or
+                                any(doc_id in segment for segment in self.segments)}
+                self._changed()
+                self._save_manifest()
+                self._remove_obsolete_files()
+
+    def wait_for_merges(self):
+        """
+        Function which waits for the background merges to finish
+        """
+        with self._lock:
+            merge_thread = self._merge_thread
+        if merge_thread is not None and merge_thread is not threading.current_thread():
+            merge_thread.join()
+
+    def _remove_obsolete_files(self):
+        """
+        Helper function which removes the segment files replaced by merges
+        Note: The snapshots taken before the merge keep reading the removed
+        files through their memory map( except on Windows where the files are
+        removed later)
+        """
+        remaining = []
+        for fname in self._obsolete_files:
+            try:
+                os.remove(fname)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                remaining.append(fname)
+        self._obsolete_files = remaining
+
+    def snapshot(self):
+        """
+        Function which returns a consistent view of the index for the scorers
+        The view does not change when documents are added or deleted later
+        :return: a SegmentedIndexView
+        """
+        with self._lock:
+            if self._snapshot is None:
+                live_doc_ids = sorted(self.live_ids.values())
+                segments = list(self.segments)
+                if len(self.delta):
+                    # The delta segment keeps changing, the view gets a copy
+                    segments.append(self.delta.frozen_copy())
+                self._snapshot = SegmentedIndexView(segments, live_doc_ids, self.doc_names, self.doc_lengths)
+            return self._snapshot
+
+    def segment_summary(self):
+        """
+        Function which returns a list of (segment name, number of documents,
+        number of deleted documents) for every segment, the delta segment last
+        """
+        with self._lock:
+            summary = [(segment.name, len(segment), sum(1 for doc_id in segment.doc_ids if doc_id in self.deleted))
+                       for segment in self.segments]
+            summary.append(("delta", len(self.delta), sum(1 for doc_id in self.delta.doc_ids if doc_id in self.deleted)))
+        return summary
+
+
+class SegmentedIndexView:
+    """
+    A read only view of the live documents of some segments
+    It behaves like a BinaryInvertedIndex keyed on integer doc ids( term in
+    index, index[term], index.postings(term), for term in index), the doc ids
+    are the dense ids 0, 1, 2 .. of the live documents in increasing order
+    of global doc id
+    """
+
+    def __init__(self, segments, live_doc_ids, doc_names, doc_lengths):
+        """
+        :param segments: the segments( memory or disk) of the view
+        :param live_doc_ids: the global doc ids of the live documents, sorted
+        :param doc_names: the doc name of every global doc id
+        :param doc_lengths: the doc length of every global doc id
+        """
+        self.segments = segments
+
+        # {global doc id : dense doc id}
+        self._dense_ids = {doc_id: i for i, doc_id in enumerate(live_doc_ids)}
+        self._doc_names = [doc_names[doc_id] for doc_id in live_doc_ids]
+        self.doc_lengths = [doc_lengths[doc_id] for doc_id in live_doc_ids]
+        self.num_docs = len(live_doc_ids)
+
+        self._terms = None
+        self._postings_cache = {}
+        self._dict_cache = {}
+        self._collection_stats = None
+
+    def doc_names(self):
+        return self._doc_names
+
+    def doc_name(self, doc_id):
+        return self._doc_names[doc_id]
+
+    def doc_table(self):
+        """
+        Function which returns the DocTable of the dense doc ids
+        """
+        return DocTable(self._doc_names)
+
+    def collection_stats(self, k1=1.2, b=0.75):
+        """
+        Function which computes the CollectionStats of the live documents from
+        the statistics of every segment( computed once per view, with the k1
+        and b of the first call)
+        :param k1: BM25 parameter used for the max saturation of the terms
+        :param b: BM25 parameter used for the max saturation of the terms
+        """
+        if self._collection_stats is None:
+            live_doc_lengths = {doc_id: self.doc_lengths[dense_id] for doc_id, dense_id in self._dense_ids.items()}
+            avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths)
+
+            df = {}
+            cf = {}
+            frontiers = {}
+            for segment in self.segments:
+                for term, (n_i, c_i, frontier) in segment_term_stats(segment, live_doc_lengths).items():
+                    df[term] = df.get(term, 0) + n_i
+                    cf[term] = cf.get(term, 0) + c_i
+                    frontiers.setdefault(term, []).extend(frontier)
+
+            # Same order of the terms as the view
+            terms = sorted(df, key=lambda t: t.encode("utf-8"))
+            self._collection_stats = CollectionStats(list(self.doc_lengths),
+                                                     {term: df[term] for term in terms},
+                                                     {term: cf[term] for term in terms},
+                                                     avg_doc_length=avg_doc_length,
+                                                     bm25_max_saturation={term: max_bm25_saturation(frontiers[term], avg_doc_length, k1, b)
+                                                                          for term in terms},
+                                                     bm25_k1=k1, bm25_b=b)
+        return self._collection_stats
+
+    def postings(self, term):
+        """
+        Function which returns the live postings of a term across all the
+        segments
+        :return: a tuple (doc_ids, freqs) of integer arrays in increasing
+        order of dense doc id. Both are empty if no live document has the term
+        """
+        if term in self._postings_cache:
+            return self._postings_cache[term]
+
+        dense_ids = self._dense_ids
+        postings = []
+        num_segments = 0
+        for segment in self.segments:
+            before = len(postings)
+            for doc_id, freq in segment.postings(term):
+                # Deleted documents and documents added after the view was
+                # taken have no dense doc id
+                dense_id = dense_ids.get(doc_id)
+                if dense_id is not None:
+                    postings.append((dense_id, freq))
+            if len(postings) > before:
+                num_segments += 1
+
+        # The postings of every segment are sorted, the segments can hold
+        # interleaved doc ids after merges
+        if num_segments > 1:
+            postings.sort()
+
+        result = (array.array("I", [doc_id for doc_id, _ in postings]),
+                  array.array("I", [freq for _, freq in postings]))
+        self._postings_cache[term] = result
+        return result
+
+    def document_frequency(self, term):
+        return len(self.postings(term)[0])
+
+    def __contains__(self, term):
+        return self.document_frequency(term) > 0
+
+    def __getitem__(self, term):
+        if term in self._dict_cache:
+            return self._dict_cache[term]
+
+        doc_ids, freqs = self.postings(term)
+        if not len(doc_ids):
+            raise KeyError(term)
+
+        postings = dict(zip(doc_ids, freqs))
+        self._dict_cache[term] = postings
+        return postings
+
+    def get(self, term, default=None):
+        if term in self:
+            return self[term]
+        return default
+
+    def terms(self):
+        """
+        Function which returns the sorted list of the terms with at least one
+        live posting
+        """
+        if self._terms is None:
+            all_terms = set()
+            for segment in self.segments:
+                all_terms.update(segment.terms())
+            self._terms = [term for term in sorted(all_terms, key=lambda t: t.encode("utf-8")) if term in self]
+        return self._terms
+
+    def __len__(self):
+        return len(self.terms())
+
+    def __iter__(self):
+        return iter(self.terms())
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for term in self:
+            yield term, self[term]
+
+
+def build_segmented_index(collection_data_json_file, index_dir, stop_words=None, max_buffered_docs=DEFAULT_MAX_BUFFERED_DOCS):
+    """
+    Function which builds a new segmented index from the cleaned corpus
+    The documents are added one at a time, the delta segment is flushed every
+    max_buffered_docs documents and the segments are merged as they are written
+    :param collection_data_json_file: the .jsonl file of the cleaned corpus
+    :param index_dir: the directory of the index, the segments of an older
+    index in this directory are removed
+    :param stop_words: the stop words, they are not indexed
+    :return: the SegmentedIndex
+    """
+    if os.path.exists(Path(index_dir) / MANIFEST_FNAME):
+        old_index = SegmentedIndex(index_dir)
+        for segment in old_index.segments:
+            segment.index.close()
+            os.remove(segment.fname)
+        os.remove(Path(index_dir) / MANIFEST_FNAME)
+
+    index = SegmentedIndex(index_dir, stop_words=stop_words, max_buffered_docs=max_buffered_docs)
+    for doc, text in iter_corpus(collection_data_json_file):
+        index.add_document(doc, text)
+    index.commit()
+    return index
+
+
+def open_segmented_index(index_dir):
+    """
+    Function which opens a segmented index and takes a snapshot for the scorers
+    :param index_dir: the directory of the index
+    :return: a tuple (doc_table, collection_stats, indexed_data) that can be
+    passed to the scorers like the ones loaded for the monolithic index
+    """
+    view = SegmentedIndex(index_dir).snapshot()
+    return view.doc_table(), view.collection_stats(), view
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-b", "--build",
+                    help="Enter True to build a new segmented index "
+                         "from the cleaned corpus", required=False)
+
+    ap.add_argument("-c", "--use_common_words",
+                    help="Enter True if you want to use stopwords "
+                         "( only when the index is built)", required=False)
+
+    ap.add_argument("-a", "--add", nargs="+", default=[],
+                    help="Enter the paths to the HTML files to add( or "
+                         "replace if a document with the same name is "
+                         "already indexed)", required=False)
+
+    ap.add_argument("-r", "--remove", nargs="+", default=[],
+                    help="Enter the names of the documents to delete "
+                         "( Example: CACM-0074)", required=False)
+
+    ap.add_argument("-f", "--max_buffered_docs",
+                    help="Enter the number of documents held in memory "
+                         "before they are flushed to a segment",
+                    type=int, default=DEFAULT_MAX_BUFFERED_DOCS, required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    from create_collection_data_dict import parse_html_file
+
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    segmented_index_dir = Path(os.path.realpath(".") + all_paths_dict["segmented_index_dir"])
+
+    if user_args["build"] == "True":
+        common_words = None
+        if user_args["use_common_words"] == "True":
+            common_words_fname = Path(os.path.realpath(".") + all_paths_dict["test_data"]["common_words_file"])
+            with open(common_words_fname) as common_words_fd:
+                common_words = [line.rstrip() for line in common_words_fd]
+
+        collection_json_fname = Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"])
+        segmented_index = build_segmented_index(collection_json_fname, segmented_index_dir, common_words,
+                                                user_args["max_buffered_docs"])
+    else:
+        segmented_index = SegmentedIndex(segmented_index_dir, max_buffered_docs=user_args["max_buffered_docs"])
+
+    for html_fname in user_args["add"]:
+        html_fname = Path(html_fname)
+        doc, parsed_text = parse_html_file(html_fname.parent, html_fname.name)
+        if parsed_text is None:
+            print("Skipping ", html_fname)
+            continue
+        segmented_index.add_document(doc, parsed_text)
+        print("Added ", doc)
+
+    for doc in user_args["remove"]:
+        if segmented_index.delete_document(doc):
+            print("Deleted ", doc)
+        else:
+            print("The document ", doc, "is not indexed")
+
+    segmented_index.commit()
+    segmented_index.wait_for_merges()
+
+    for name, num_docs, num_deleted in segmented_index.segment_summary():
+        print(name, ":", num_docs, "documents,", num_deleted, "deleted")
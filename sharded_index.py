@@ -0,0 +1,412 @@
+"""
+Python file which splits the collection into document partitioned shards and
+runs the queries on all the shards at once( scatter-gather)
+
+Build -> the cleaned corpus is cut into num_shards ranges of consecutive
+documents, every shard is a small index of its own written to the shard
+directory
+    shard_0.bin, shard_0_doc_table.json, shard_0_stats.json
+    shard_1.bin, ...
+    shards.json -> {"num_shards" : n, "shards" : [{"name" : "shard_0",
+                    "first_doc_id" : 0, "num_docs" : 801}, ...]}
+The statistics of a shard are local( doc lengths, df and cf of the documents
+of the shard only)
+
+Query -> a ShardCoordinator starts one worker process per shard, every worker
+memory maps its own shard only. The local statistics of the shards are summed
+into the global statistics( N, |C|, avgdl, df, cf) which are sent to every
+worker, so a shard scores its documents exactly like the unsharded index
+would. The queries are sent to all the shards( scatter), every shard returns
+its top k and the coordinator merges them into the global top k( gather)
+
+The global doc id of a document is the first doc id of its shard plus its
+doc id in the shard, i.e its doc id in the unsharded index. Documents with
+equal scores are merged in the same order as the unsharded scorers rank them,
+so the run files are the same as task_1_main.py
+
+Note: Only BM25( without relevance information) and JM-QLM are supported
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import errno
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from baseline_runs import new_bm25_scores, jm_likelihood_scores, write_top_100_scores_to_txt, parse_normal_query_text_file, select_queries, DEFAULT_TOP_K
+from binary_index import load_inverted_index, write_binary_index
+from collection_stats import CollectionStats, build_collection_stats, write_collection_stats, load_collection_stats, collection_stats_fname
+from corpus_stream import iter_corpus
+from create_index import map_frequency_chunk
+from doc_table import DocTable, write_doc_table, load_doc_table, doc_table_fname
+from parallel_queries import get_query_ids
+from parse_queries import parse_query_text_file
+
+
+SHARDS_MANIFEST_FNAME = "shards.json"
+
+# Default number of shards
+DEFAULT_NUM_SHARDS = 4
+
+# The scorers a shard can run
+SHARD_SCORERS = {"bm25": new_bm25_scores, "jm_qlm": jm_likelihood_scores}
+
+
+def shard_fname(shard_dir, name):
+    """
+    Helper function which returns the path of the index of a shard
+    Note: Only the binary index( shard_0.bin) is written, the doc table and
+    the statistics are named after this path like for the other indexes
+    :param shard_dir: the directory of the shards
+    :param name: the name of the shard( Example: shard_0)
+    :return: the path shard_dir/shard_0.json
+    """
+    return Path(shard_dir) / (name + ".json")
+
+
+def build_shards(collection_data_json_file, shard_dir, num_shards=DEFAULT_NUM_SHARDS, stop_words=None):
+    """
+    Function which builds the shards of the index from the cleaned corpus
+    Only the postings of one shard are in memory at a time
+    :param collection_data_json_file: the .jsonl file of the cleaned corpus
+    :param shard_dir: the directory where the shards are written
+    :param num_shards: the number of shards
+    :param stop_words: the stop words, they are not indexed
+    :return: the shard manifest( the content of shards.json)
+    """
+
+    if not os.path.exists(shard_dir):
+        try:
+            os.makedirs(shard_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    # Remove the shards of an older build
+    if os.path.exists(Path(shard_dir) / SHARDS_MANIFEST_FNAME):
+        for shard in read_shards_manifest(shard_dir)["shards"]:
+            fname = shard_fname(shard_dir, shard["name"])
+            for old_fname in (fname.with_suffix(".bin"), doc_table_fname(fname), collection_stats_fname(fname)):
+                if os.path.exists(old_fname):
+                    os.remove(old_fname)
+
+    # The shards get the same number of documents( give or take one)
+    num_docs = sum(1 for _ in iter_corpus(collection_data_json_file))
+    num_shards = max(1, min(num_shards, num_docs))
+    shard_sizes = [num_docs // num_shards + (1 if i < num_docs % num_shards else 0) for i in range(num_shards)]
+
+    documents = iter_corpus(collection_data_json_file)
+    manifest = {"num_shards": num_shards, "shards": []}
+    first_doc_id = 0
+    for i, shard_size in enumerate(shard_sizes):
+        name = "shard_" + str(i)
+        fname = shard_fname(shard_dir, name)
+
+        # Same helper as create_index.py, on the next range of documents
+        inv_index, doc_lengths = map_frequency_chunk(itertools.islice(documents, shard_size), stop_words)
+
+        doc_table = DocTable(doc_lengths)
+        write_doc_table(doc_table, doc_table_fname(fname))
+
+        # The local statistics of the shard
+        local_stats = build_collection_stats(doc_lengths, inv_index, doc_table)
+        write_collection_stats(local_stats, collection_stats_fname(fname))
+
+        write_binary_index(inv_index, fname.with_suffix(".bin"), doc_names=doc_table.doc_names,
+                           doc_lengths=local_stats.doc_lengths)
+
+        manifest["shards"].append({"name": name, "first_doc_id": first_doc_id, "num_docs": shard_size})
+        first_doc_id += shard_size
+
+    with open(Path(shard_dir) / SHARDS_MANIFEST_FNAME, "w+") as o_fd:
+        json.dump(manifest, o_fd, indent=4)
+
+    return manifest
+
+
+def merge_shard_stats(shard_stats):
+    """
+    Function which sums the local statistics of the shards into the
+    statistics of the whole collection
+    :param shard_stats: the CollectionStats of every shard, in shard order
+    :return: a CollectionStats( the doc lengths are indexed on the global doc
+    ids). The BM25 max saturation is not merged, it depends on avgdl
+    """
+    doc_lengths = []
+    df = {}
+    cf = {}
+    for stats in shard_stats:
+        doc_lengths.extend(stats.doc_lengths)
+        for term, n in stats.df.items():
+            df[term] = df.get(term, 0) + n
+        for term, n in stats.cf.items():
+            cf[term] = cf.get(term, 0) + n
+
+    return CollectionStats(doc_lengths, df, cf)
+
+
+class ShardCollectionStats(CollectionStats):
+    """
+    The collection statistics a shard scores with: the doc lengths of the
+    documents of the shard( local doc ids) and the global N, |C|, avgdl, df
+    and cf
+    """
+
+    def __init__(self, local_doc_lengths, global_stats):
+        """
+        :param local_doc_lengths: the doc lengths of the shard, indexed on
+        the doc ids of the shard
+        :param global_stats: the CollectionStats of the whole collection
+        """
+        super().__init__(local_doc_lengths, global_stats.df, global_stats.cf,
+                         total_terms=global_stats.total_terms,
+                         avg_doc_length=global_stats.avg_doc_length)
+        self.num_docs = global_stats.num_docs
+
+    def doc_ids(self):
+        """
+        Function which returns the doc ids of the documents of the shard
+        """
+        return range(len(self.doc_lengths))
+
+
+# The shard opened by a shard worker process( see open_shard)
+_shard = None
+
+
+def open_shard(fname, global_stats):
+    """
+    Function run once in a shard worker process, opens the shard
+    :param fname: the path to the index of the shard( see shard_fname)
+    :param global_stats: the CollectionStats of the whole collection
+    """
+    global _shard
+
+    doc_table = load_doc_table(doc_table_fname(fname))
+    local_stats = load_collection_stats(collection_stats_fname(fname))
+    _shard = (doc_table, ShardCollectionStats(local_stats.doc_lengths, global_stats),
+              load_inverted_index(fname, doc_table))
+
+
+def search_shard(method, query_text_file_name, relevant_docs_fname, query_ids, top_k, normal_query_file=False):
+    """
+    Function run by a shard worker process, scores the queries on its shard
+    :param method: "bm25" or "jm_qlm"
+    :param query_text_file_name: The path to the file containing all the queries
+    :param relevant_docs_fname: The text file containing the relevance file
+    i.e cacm.rel.txt( only read by bm25, the relevance information is not used)
+    :param query_ids: the ids of the queries to score
+    :param top_k: Number of top scoring documents of the shard to return
+    :param normal_query_file: If True, the query file has one query per line
+    :return: a tuple of a dictionary {query_id : [(score, tie, doc_id), ...]}
+    sorted on the score, doc_id is the doc id in the shard, and of the time the
+    shard spent on the queries( in seconds)
+    Note: tie orders the documents with equal scores like the unsharded
+    scorer. new_bm25_scores ranks them in the order they were first scored,
+    i.e on the position of their first query term then on the doc id.
+    jm_likelihood_scores ranks them on the doc id( tie is always 0)
+    """
+    start = time.perf_counter()
+    doc_table, collection_stats, indexed_data = _shard
+
+    if method == "bm25":
+        scores = new_bm25_scores(collection_stats, indexed_data, query_text_file_name, relevant_docs_fname,
+                                 normal_query_file=normal_query_file, doc_table=doc_table,
+                                 top_k=top_k, query_ids=query_ids)
+    else:
+        scores = SHARD_SCORERS[method](collection_stats, indexed_data, query_text_file_name,
+                                       normal_query_file=normal_query_file, top_k=top_k, query_ids=query_ids)
+
+    if not normal_query_file:
+        query_dict = parse_query_text_file(query_text_file_name)
+    else:
+        query_dict = parse_normal_query_text_file(query_text_file_name)
+    query_dict = select_queries(query_dict, query_ids)
+
+    shard_scores = {}
+    for q in query_dict:
+        if method != "bm25":
+            shard_scores[q] = [(score, 0, doc) for doc, score in scores[q]]
+            continue
+
+        # The position of the first query term of every returned document
+        postings = [indexed_data.get(term, {}) for term in query_dict[q].split()]
+        shard_scores[q] = [(score, next(position for position, term_postings in enumerate(postings)
+                                        if doc in term_postings), doc)
+                           for doc, score in scores[q]]
+
+    return shard_scores, time.perf_counter() - start
+
+
+def read_shards_manifest(shard_dir):
+    """
+    Function which reads the manifest of the shards
+    :param shard_dir: the directory of the shards
+    :return: a dictionary of the form {"num_shards" : n, "shards" : [...]}
+    """
+    with open(Path(shard_dir) / SHARDS_MANIFEST_FNAME) as fd:
+        return json.load(fd)
+
+
+class ShardCoordinator:
+    """
+    Sends the queries to one worker process per shard and merges their top k
+    """
+
+    def __init__(self, shard_dir):
+        """
+        :param shard_dir: the directory of the shards( see build_shards)
+        """
+        self.shard_dir = Path(shard_dir)
+        self.shards = read_shards_manifest(shard_dir)["shards"]
+
+        # The coordinator only reads the doc tables and the statistics of
+        # the shards, the postings are only opened by the workers
+        doc_names = []
+        self.shard_stats = []
+        for shard in self.shards:
+            fname = shard_fname(shard_dir, shard["name"])
+            doc_names.extend(load_doc_table(doc_table_fname(fname)).doc_names)
+            self.shard_stats.append(load_collection_stats(collection_stats_fname(fname)))
+
+        self.doc_table = DocTable(doc_names)
+        self.collection_stats = merge_shard_stats(self.shard_stats)
+
+        # The time every shard spent on the last search( see search_shard)
+        self.shard_seconds = [0.0] * len(self.shards)
+
+        # A single worker per executor, so that every shard stays open in the
+        # same process for all the queries
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=open_shard,
+                                              initargs=(shard_fname(shard_dir, shard["name"]),
+                                                        self.collection_stats))
+                          for shard in self.shards]
+
+    def search(self, method, query_text_file_name, relevant_docs_fname=None, query_ids=None,
+               top_k=DEFAULT_TOP_K, normal_query_file=False):
+        """
+        Function which scores the queries on all the shards
+        :param method: "bm25" or "jm_qlm"
+        :param query_text_file_name: The path to the file containing all the queries
+        :param relevant_docs_fname: The text file containing the relevance file
+        i.e cacm.rel.txt, needed by bm25
+        :param query_ids: the ids of the queries to score, all of them by default
+        :param top_k: Number of top scoring documents to keep for every query
+        :param normal_query_file: If True, the query file has one query per line
+        :return: the same dictionary as the scorers, keyed on the global doc ids
+        {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
+        """
+        if method not in SHARD_SCORERS:
+            raise ValueError("The sharded index can not score " + str(method) +
+                             ", use one of " + ", ".join(SHARD_SCORERS))
+
+        if query_ids is None:
+            query_ids = get_query_ids(query_text_file_name, normal_query_file)
+
+        # Scatter
+        futures = [executor.submit(search_shard, method, query_text_file_name, relevant_docs_fname, query_ids,
+                                   top_k, normal_query_file)
+                   for executor in self.executors]
+
+        # Gather, every shard returns at most top_k documents per query
+        shard_results = [future.result() for future in futures]
+        shard_scores = [scores for scores, _ in shard_results]
+        self.shard_seconds = [seconds for _, seconds in shard_results]
+
+        scores_dict = {}
+        for i in range(1, 65):
+            scores_dict[i] = []
+
+        for q in query_ids:
+            # Every list is sorted on (-score, tie, global doc id), the doc
+            # ids of a shard are all smaller than the ones of the next shard
+            ranked_lists = [[(-score, tie, shard["first_doc_id"] + doc, score) for score, tie, doc in scores.get(q, [])]
+                            for shard, scores in zip(self.shards, shard_scores)]
+            merged = heapq.merge(*ranked_lists)
+            scores_dict[q] = [(doc, score) for _, _, doc, score in itertools.islice(merged, top_k)]
+
+        return scores_dict
+
+    def close(self):
+        """
+        Function which stops the shard worker processes
+        """
+        for executor in self.executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-b", "--build",
+                    help="Enter True to build the shards "
+                         "from the cleaned corpus", required=False)
+
+    ap.add_argument("-n", "--num_shards",
+                    help="Enter the number of shards( only when the shards are built)",
+                    type=int, default=DEFAULT_NUM_SHARDS, required=False)
+
+    ap.add_argument("-c", "--use_common_words",
+                    help="Enter True if you want to use stopwords "
+                         "( only when the shards are built)", required=False)
+
+    ap.add_argument("-m", "--method",
+                    help="Enter the model to run on the shards, bm25 or jm_qlm",
+                    required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    sharded_index_dir = Path(os.path.realpath(".") + all_paths_dict["sharded_index_dir"])
+
+    if user_args["build"] == "True":
+        common_words = None
+        if user_args["use_common_words"] == "True":
+            common_words_fname = Path(os.path.realpath(".") + all_paths_dict["test_data"]["common_words_file"])
+            with open(common_words_fname) as common_words_fd:
+                common_words = [line.rstrip() for line in common_words_fd]
+
+        collection_json_fname = Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"])
+        shards_manifest = build_shards(collection_json_fname, sharded_index_dir, user_args["num_shards"], common_words)
+        for shard in shards_manifest["shards"]:
+            print(shard["name"], ":", shard["num_docs"], "documents from doc id", shard["first_doc_id"])
+
+    if user_args["method"]:
+        method = user_args["method"]
+        output_keys = {"bm25": "bm_25_score_output_text_file",
+                       "jm_qlm": "jm_qlm_score_output_text_file"}
+
+        query_text_file = Path(os.path.realpath(".") + all_paths_dict["test_data"]["query_text_file"])
+        relevance_text_file = Path(os.path.realpath(".") + all_paths_dict["test_data"]["relevance_text_file"])
+
+        with ShardCoordinator(sharded_index_dir) as coordinator:
+            print("Running ", method, " model on ", len(coordinator.shards), " shards")
+            method_scores = coordinator.search(method, query_text_file, relevance_text_file)
+
+            output_text_fname = Path(os.path.realpath(".") + all_paths_dict[output_keys[method]])
+            write_top_100_scores_to_txt(method_scores, output_text_fname, method, coordinator.doc_table)
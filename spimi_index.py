@@ -0,0 +1,276 @@
+"""
+Python file which builds the inverted index with a bounded amount of memory
+( single pass in-memory indexing, SPIMI)
+
+The documents are read one at a time( iter_corpus) and their postings are
+added to an in-memory dictionary {term : (doc_ids, freqs)}. When the estimated
+size of the dictionary goes over the memory budget, it is written to disk as a
+sorted run and a new dictionary is started. The runs are then merged term by
+term( k-way merge) into the same files create_index.py writes
+    inverted_index_corpus.json           -> {term : {doc : freq}}
+    inverted_index_corpus.bin            -> binary index( binary_index.py)
+    inverted_index_corpus_doc_table.json -> doc table
+    inverted_index_corpus_stats.json     -> collection statistics
+Only the postings of one term, the doc table and the per term statistics are
+in memory during the merge
+
+A run is a JSON lines file, one line per term in increasing order of term
+["term", [doc_id_1, doc_id_2, ...], [freq_1, freq_2, ...]]
+The doc ids are the integer doc ids of the doc table, every run holds the
+postings of a range of documents that comes after the range of the previous run
+
+Note: The terms of the json index are written in sorted order( create_index.py
+writes them in the order they first occur), the postings are the same
+
+Credits -> https://nlp.stanford.edu/IR-book/html/htmledition/single-pass-in-memory-indexing-1.html
+"""
+
+import array
+import heapq
+import itertools
+import json
+import os
+import errno
+import shutil
+import tempfile
+from pathlib import Path
+from binary_index import BinaryIndexWriter, binary_index_fname
+from collection_stats import CollectionStats, max_bm25_saturation, write_collection_stats, collection_stats_fname
+from corpus_stream import iter_corpus
+from doc_table import DocTable, write_doc_table, doc_table_fname
+
+
+# Default memory budget of the in-memory dictionary, in MB
+DEFAULT_MEMORY_BUDGET_MB = 64
+
+# Estimated size of the in-memory dictionary( measured on CACM with
+# tracemalloc): every term costs its dictionary entry, its string and two
+# arrays, every posting costs two 4 byte integers and the growth of the arrays
+BYTES_PER_TERM = 320
+BYTES_PER_POSTING = 9
+
+# Largest number of runs merged at once, more runs are first merged into
+# bigger runs( one open file per run)
+MAX_MERGE_FAN_IN = 64
+
+
+def write_run(term_postings, run_fname):
+    """
+    Function which writes an in-memory dictionary to a sorted run
+    :param term_postings: dictionary of the form {term : (doc_ids, freqs)}
+    :param run_fname: the path to the run file
+    """
+    with open(run_fname, "w+") as o_fd:
+        for term in sorted(term_postings):
+            doc_ids, freqs = term_postings[term]
+            o_fd.write(json.dumps([term, doc_ids.tolist(), freqs.tolist()]) + "\n")
+
+
+def read_run(run_fname, run_number):
+    """
+    Generator which reads a run one term at a time
+    :param run_fname: the path to the run file
+    :param run_number: the position of the run, keeps the postings of the
+    same term in the order of the runs during the merge
+    :return: yields (term, run_number, doc_ids, freqs) tuples in increasing
+    order of term
+    """
+    with open(run_fname) as fd:
+        for line in fd:
+            term, doc_ids, freqs = json.loads(line)
+            yield term, run_number, doc_ids, freqs
+
+
+def merge_runs(run_fnames):
+    """
+    Generator which merges sorted runs( k-way merge with a heap)
+    :param run_fnames: the paths to the runs, in the order of their documents
+    :return: yields (term, doc_ids, freqs) tuples in increasing order of term,
+    the doc ids of every term in increasing order
+    """
+    runs = [read_run(run_fname, run_number) for run_number, run_fname in enumerate(run_fnames)]
+
+    # Note: Python compares the strings on their code points, which is the
+    # order of their utf-8 bytes( the order of the binary index)
+    merged = heapq.merge(*runs, key=lambda x: (x[0], x[1]))
+    for term, term_runs in itertools.groupby(merged, key=lambda x: x[0]):
+        doc_ids = []
+        freqs = []
+        for _, _, run_doc_ids, run_freqs in term_runs:
+            doc_ids.extend(run_doc_ids)
+            freqs.extend(run_freqs)
+        yield term, doc_ids, freqs
+
+
+def reduce_runs(run_fnames, run_dir, fan_in=MAX_MERGE_FAN_IN):
+    """
+    Function which merges the runs into bigger runs until there are at most
+    fan_in runs left
+    :param run_fnames: the paths to the runs, in the order of their documents
+    :param run_dir: the directory of the runs
+    :param fan_in: largest number of runs merged at once
+    :return: the paths to the remaining runs, in the order of their documents
+    """
+    merge_pass = 0
+    while len(run_fnames) > fan_in:
+        merged_fnames = []
+        for start in range(0, len(run_fnames), fan_in):
+            group = run_fnames[start: start + fan_in]
+            merged_fname = os.path.join(run_dir, "merge_" + str(merge_pass) + "_" + str(len(merged_fnames)) + ".jsonl")
+            with open(merged_fname, "w+") as o_fd:
+                for term, doc_ids, freqs in merge_runs(group):
+                    o_fd.write(json.dumps([term, doc_ids, freqs]) + "\n")
+            for run_fname in group:
+                os.remove(run_fname)
+            merged_fnames.append(merged_fname)
+        run_fnames = merged_fnames
+        merge_pass += 1
+    return run_fnames
+
+
+def spimi_invert(documents, run_dir, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, stop_words=None):
+    """
+    Function which reads the documents and writes sorted runs whenever the
+    in-memory dictionary goes over the memory budget
+    :param documents: an iterable of (doc_id, cleaned_contents) tuples
+    ( Example: the generator iter_corpus)
+    :param run_dir: the directory where the runs are written
+    :param memory_budget_mb: the memory budget of the in-memory dictionary
+    :param stop_words: the stop words, they are not indexed
+    :return: a tuple (doc_names, doc_lengths, run_fnames, largest estimated
+    size of the in-memory dictionary in bytes)
+    """
+    memory_budget = memory_budget_mb * 1024 * 1024
+    stop_words = set(stop_words or [])
+
+    doc_names = []
+    doc_lengths = []
+    run_fnames = []
+    term_postings = {}
+    num_postings = 0
+    peak_size = 0
+
+    def flush():
+        run_fname = os.path.join(run_dir, "run_" + str(len(run_fnames)) + ".jsonl")
+        write_run(term_postings, run_fname)
+        run_fnames.append(run_fname)
+
+    for doc, doc_contents in documents:
+        doc_id = len(doc_names)
+        doc_names.append(doc)
+
+        # Note: The stop words are counted in the doc length, like
+        # create_index.py does
+        doc_content_list = doc_contents.split()
+        doc_lengths.append(len(doc_content_list))
+
+        term_freqs = {}
+        for item in doc_content_list:
+            if item in stop_words:
+                continue
+            term_freqs[item] = term_freqs.get(item, 0) + 1
+
+        for term, freq in term_freqs.items():
+            if term not in term_postings:
+                term_postings[term] = (array.array("I"), array.array("I"))
+            doc_ids, freqs = term_postings[term]
+            doc_ids.append(doc_id)
+            freqs.append(freq)
+        num_postings += len(term_freqs)
+
+        size = len(term_postings) * BYTES_PER_TERM + num_postings * BYTES_PER_POSTING
+        peak_size = max(peak_size, size)
+        if size >= memory_budget:
+            flush()
+            term_postings = {}
+            num_postings = 0
+
+    if term_postings or not run_fnames:
+        flush()
+
+    return doc_names, doc_lengths, run_fnames, peak_size
+
+
+def json_postings_chunk(term, postings):
+    """
+    Helper function which formats one term of the json index the way
+    json.dump(inv_index, fd, indent=4) does
+    :param term: the term
+    :param postings: dictionary of the form {doc : freq}
+    :return: the string "    "term": {...}" without the trailing comma
+    """
+    return "    " + json.dumps(term) + ": " + json.dumps(postings, indent=4).replace("\n", "\n    ")
+
+
+def create_spimi_index(collection_data_json_file, out_fname, stop_words=None,
+                       memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, fan_in=MAX_MERGE_FAN_IN, k1=1.2, b=0.75):
+    """
+    Function that creates the inverted index with a bounded amount of memory
+    Writes the same files as create_index.create_inverted_index
+    :param collection_data_json_file: Is the .jsonl file of the cleaned corpus
+    :param out_fname: The path to the json file of the inverted index
+    :param stop_words: The list of stop words( by default it is None)
+    :param memory_budget_mb: the memory budget of the in-memory dictionary
+    :param fan_in: largest number of runs merged at once
+    :param k1: BM25 parameter used for the max saturation of the terms
+    :param b: BM25 parameter used for the max saturation of the terms
+    """
+
+    out_fname = Path(out_fname)
+    if not os.path.exists(os.path.dirname(out_fname)):
+        try:
+            os.makedirs(os.path.dirname(out_fname))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    # The runs are written next to the index and removed once merged
+    run_dir = tempfile.mkdtemp(prefix=out_fname.stem + "_runs_", dir=os.path.dirname(out_fname))
+    try:
+        doc_names, doc_lengths, run_fnames, peak_size = spimi_invert(iter_corpus(collection_data_json_file), run_dir,
+                                                                     memory_budget_mb, stop_words)
+        if not doc_names:
+            raise ValueError("The corpus " + str(collection_data_json_file) + " has no documents, "
+                             "run create_collection_data_dict.py first")
+        num_runs = len(run_fnames)
+        run_fnames = reduce_runs(run_fnames, run_dir, fan_in)
+
+        # Write the doc table which maps the doc names to integer doc ids
+        # The integer doc ids follow the order of the docs in the collection
+        doc_table = DocTable(doc_names)
+        write_doc_table(doc_table, doc_table_fname(out_fname))
+
+        avg_doc_length = sum(doc_lengths) / len(doc_lengths)
+        df = {}
+        cf = {}
+        max_saturation = {}
+
+        # Merge the runs and write every term to the json index, to the binary
+        # index and to the statistics as soon as it is merged
+        with open(out_fname, "w+") as o_fd, \
+                BinaryIndexWriter(binary_index_fname(out_fname), doc_names, doc_lengths) as writer:
+            o_fd.write("{")
+            separator = "\n"
+            for term, doc_ids, freqs in merge_runs(run_fnames):
+                o_fd.write(separator + json_postings_chunk(term, {doc_names[doc_id]: freq
+                                                                  for doc_id, freq in zip(doc_ids, freqs)}))
+                separator = ",\n"
+
+                writer.add_term(term, doc_ids, freqs)
+
+                df[term] = len(doc_ids)
+                cf[term] = sum(freqs)
+                max_saturation[term] = max_bm25_saturation(((freq, doc_lengths[doc_id])
+                                                            for doc_id, freq in zip(doc_ids, freqs)),
+                                                           avg_doc_length, k1, b)
+            o_fd.write("\n}" if df else "}")
+
+        # Write the collection statistics( doc lengths, avgdl, |C|, df, cf)
+        write_collection_stats(CollectionStats(doc_lengths, df, cf, avg_doc_length=avg_doc_length,
+                                               bm25_max_saturation=max_saturation, bm25_k1=k1, bm25_b=b),
+                               collection_stats_fname(out_fname))
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    print("SPIMI: ", len(doc_names), "documents,", num_runs, "runs, largest in-memory dictionary ~",
+          round(peak_size / (1024 * 1024), 2), "MB( budget", memory_budget_mb, "MB)")
@@ -6,7 +6,7 @@ import json
 import os
 from pathlib import Path
 from create_index import create_inverted_index
-import errno
+from corpus_stream import write_corpus
 
 
 def read_json_document(json_file_name):
@@ -193,16 +193,8 @@ stemmed_corpus_output_json_fname = Path(os.path.realpath(".") +
 print("The stemmed corpus output file name is ",
       stemmed_corpus_output_json_fname)
 
-if not os.path.exists(os.path.dirname(stemmed_corpus_output_json_fname)):
-    try:
-        os.makedirs(os.path.dirname(stemmed_corpus_output_json_fname))
-    except OSError as exc:
-        if exc.errno != errno.EEXIST:
-            raise
-
-# We will write this parsed_corpus to a json file
-with open(stemmed_corpus_output_json_fname, "w+") as stem_out:
-    json.dump(parsed_corpus, stem_out, indent=4)
+# We will write this parsed_corpus to a .jsonl file, one record per document
+write_corpus(parsed_corpus.items(), stemmed_corpus_output_json_fname)
 
 # We will create an index out of this and write to a json file as well
 stemmed_corpus_inverted_index_fname = Path(os.path.realpath(".") +
@@ -7,6 +7,13 @@ import json
 from pathlib import Path
 import os
 from baseline_runs import write_top_100_scores_to_txt, new_bm25_scores, tf_idf, jm_likelihood_scores
+from bm25_engine import numpy_bm25_scores
+from dynamic_pruning import pruned_bm25_scores
+from batch_scoring import batch_scores
+from parallel_queries import parallel_scores, get_query_ids
+from binary_index import load_inverted_index, write_index_sidecars
+from doc_table import load_doc_table, doc_table_fname
+from collection_stats import load_collection_stats, collection_stats_fname
 
 
 def read_json_document(json_file_name):
@@ -48,93 +55,145 @@ def parse_user_args():
     ap = argparse.ArgumentParser()
 
     ap.add_argument("-m", "--method", help="Enter the type of baseline run, "
-                                           "bm_25, tf_idf or jm_qlm", required=True)
+                                           "bm25, bm25_numpy, bm25_wand, bm25_maxscore, bm25_bmw, "
+                                           "tf_idf, jm_qlm, "
+                                           "bm25_batch, tf_idf_batch or jm_qlm_batch", required=True)
 
     ap.add_argument("-j", "--json_fname", help="Enter the path to the json "
                                                "filename containing"
                                                "all the paths to the "
                                                "test_collection", required=True)
 
-    return vars(ap.parse_args())
-
-
-# Get the user arguments
-user_args = parse_user_args()
-baseline = user_args["method"]
-json_fname_relative_paths = user_args["json_fname"]
-
-# Note the file "all_paths.json" has all the relative paths
-# We will read this file and store the json file in a dictionary
-all_paths_dict = read_json_document(json_fname_relative_paths)
-
-print("Running ", baseline, " model")
-
-# Create Index
-# To create index we first need to parse all the 3204 documents
-# NOTE: We have already parsed all the 3204 documents and stored it in
-# a json file( using the script create_collection_data_dict.py)
+    ap.add_argument("-w", "--workers", help="Enter the number of worker "
+                                            "processes the queries are "
+                                            "split across( default 1)",
+                    type=int, default=1, required=False)
 
+    ap.add_argument("-v", "--verbose", help="Enter True to print the postings "
+                                            "and blocks skipped for every query "
+                                            "( bm25_wand, bm25_maxscore, bm25_bmw)",
+                    required=False)
 
-# Now we will load this json file into a dictionary
-# Note: url_text_dict is of the form
-# {CACM_file_1 : parsed_tokenized_text_file_1,
-# CACM_file_2 : parsed_tokenized_text_file_2}
-
-collection_data_fname = Path(os.path.realpath(".") +
-                             all_paths_dict[
-                                 "stemmed_corpus_json_fname"])
+    return vars(ap.parse_args())
 
-with open(collection_data_fname) as c_fd:
-    url_text_dict = json.load(c_fd)
 
+if __name__ == "__main__":
 
-# Now that we have received a dictionary containing all the doc_IDs as keys
-# and their contents parsed as values, we will create the inverted index
-# The inverted index is of the form
-# {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
-# term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
+    # Get the user arguments
+    user_args = parse_user_args()
+    baseline = user_args["method"]
+    json_fname_relative_paths = user_args["json_fname"]
+    workers = user_args["workers"]
+    verbose = user_args["verbose"] == "True"
 
-# NOTE: We have already created the index and stored it in the json file
-# stopped_queries_output.json( Done by script create_index.py)
+    # Note the file "all_paths.json" has all the relative paths
+    # We will read this file and store the json file in a dictionary
+    all_paths_dict = read_json_document(json_fname_relative_paths)
 
+    print("Running ", baseline, " model")
 
-stemmed_queries_inverted_index = Path(os.path.realpath(".") +
-                             all_paths_dict[
-                                 "stemmed_inverted_index"])
+    # Create Index
+    # To create index we first need to parse all the 3204 documents
+    # NOTE: We have already parsed all the 3204 documents and stored it in
+    # a json file( using the script create_collection_data_dict.py)
 
 
-with open(stemmed_queries_inverted_index) as inv_fd:
-    inverted_index = json.load(inv_fd)
+    # NOTE: The scorers do not need the cleaned corpus, the statistics they
+    # need( doc lengths, avgdl, |C|, df, cf) are stored next to the index
 
-# We will use this inverted index to score the documents
-# Get the non-OS dependent path to the query text file
-query_text_file = convert_to_non_os_specific_path(all_paths_dict["test_data"]["stem_queries"])
-print("the query text file is ", query_text_file)
 
-# Get the non-OS dependent path to the query text file
-relevance_text_file = convert_to_non_os_specific_path(all_paths_dict["test_data"]["relevance_text_file"])
-print("the relevenace text file is ", relevance_text_file)
+    # Now that we have received a dictionary containing all the doc_IDs as keys
+    # and their contents parsed as values, we will create the inverted index
+    # The inverted index is of the form
+    # {term_1 : {doc_1 : term_1_freq_in_doc_1, doc_2 : term_1_freq_in_doc_2},
+    # term_2 : {doc_1 : term2_freq_in_doc_1, doc_2 : term2_freq_in_doc_2} .....}
 
+    # NOTE: We have already created the index and stored it in the json file
+    # stopped_queries_output.json( Done by script create_index.py)
 
-# Get the BM25 scores in a dictionary
-if baseline == "bm25":
-    bm_25_scores = new_bm25_scores(url_text_dict, inverted_index, query_text_file, relevance_text_file, normal_query_file=True)
 
-    # Writing the results to a text filerelevant_json_fname
-    output_text_fname = Path(os.path.realpath(".") +
-                                 all_paths_dict[
-                                     "bm25_stem_queries"])
-    write_top_100_scores_to_txt(bm_25_scores, output_text_fname, "bm25")
-elif baseline == "tf_idf":
-    tf_idf_scores = tf_idf(url_text_dict, inverted_index, query_text_file, normal_query_file=True)
-    tf_idf_output_text_fname = Path(os.path.realpath(".") +
+    stemmed_queries_inverted_index = Path(os.path.realpath(".") +
                                  all_paths_dict[
-                                     "tf_idf_stem_queries"])
-    write_top_100_scores_to_txt(tf_idf_scores, tf_idf_output_text_fname, "tf_idf")
-
-elif baseline == "jm_qlm":
-    jm_qlm_scores = jm_likelihood_scores(url_text_dict, inverted_index, query_text_file, normal_query_file=True)
-    jm_qlm_score_output_text_file = Path(os.path.realpath(".") +
-                                         all_paths_dict["jm_qlm_stem_queries"])
-
-    write_top_100_scores_to_txt(jm_qlm_scores, jm_qlm_score_output_text_file,"jm_qlm")
\ No newline at end of file
+                                     "stemmed_inverted_index"])
+
+
+    # Indexes built before the doc table and the collection statistics were
+    # written at indexing time get them from the corpus the index was built from
+    write_index_sidecars(stemmed_queries_inverted_index, Path(os.path.realpath(".") + all_paths_dict["stemmed_corpus_json_fname"]))
+
+    # Load the doc table written at indexing time, all the scoring is done on
+    # the integer doc ids of this table
+    doc_table = load_doc_table(doc_table_fname(stemmed_queries_inverted_index))
+
+    # Load the collection statistics written at indexing time
+    collection_stats = load_collection_stats(collection_stats_fname(stemmed_queries_inverted_index))
+
+    # Memory maps the binary index if present, else loads the json index
+    inverted_index = load_inverted_index(stemmed_queries_inverted_index, doc_table)
+
+    # We will use this inverted index to score the documents
+    # Get the non-OS dependent path to the query text file
+    query_text_file = convert_to_non_os_specific_path(all_paths_dict["test_data"]["stem_queries"])
+    print("the query text file is ", query_text_file)
+
+    # Get the non-OS dependent path to the query text file
+    relevance_text_file = convert_to_non_os_specific_path(all_paths_dict["test_data"]["relevance_text_file"])
+    print("the relevenace text file is ", relevance_text_file)
+
+    # The ids of all the queries, the queries are split across the worker
+    # processes on these ids
+    query_ids = get_query_ids(query_text_file, normal_query_file=True)
+
+
+    # Get the BM25 scores in a dictionary
+    if baseline == "bm25":
+        bm_25_scores = parallel_scores(workers, query_ids, new_bm25_scores, collection_stats, inverted_index, query_text_file, relevance_text_file, normal_query_file=True, doc_table=doc_table)
+
+        # Writing the results to a text filerelevant_json_fname
+        output_text_fname = Path(os.path.realpath(".") +
+                                     all_paths_dict[
+                                         "bm25_stem_queries"])
+        write_top_100_scores_to_txt(bm_25_scores, output_text_fname, "bm25", doc_table)
+    elif baseline == "bm25_numpy":
+        # Same BM25 scores, computed with the vectorized term at a time engine
+        bm_25_scores = parallel_scores(workers, query_ids, numpy_bm25_scores, collection_stats, inverted_index, query_text_file, relevance_text_file, normal_query_file=True, doc_table=doc_table)
+
+        # Writing the results to a text filerelevant_json_fname
+        output_text_fname = Path(os.path.realpath(".") +
+                                     all_paths_dict[
+                                         "bm25_stem_queries"])
+        write_top_100_scores_to_txt(bm_25_scores, output_text_fname, "bm25", doc_table)
+    elif baseline in ("bm25_wand", "bm25_maxscore", "bm25_bmw"):
+        # Same top 100 BM25 scores, computed document at a time with dynamic pruning
+        strategy = baseline[len("bm25_"):]
+        bm_25_scores = parallel_scores(workers, query_ids, pruned_bm25_scores, collection_stats, inverted_index, query_text_file, relevance_text_file, normal_query_file=True, doc_table=doc_table, strategy=strategy, verbose=verbose)
+
+        # Writing the results to a text file
+        output_text_fname = Path(os.path.realpath(".") +
+                                     all_paths_dict[
+                                         "bm25_stem_queries"])
+        write_top_100_scores_to_txt(bm_25_scores, output_text_fname, "bm25", doc_table)
+    elif baseline == "tf_idf":
+        tf_idf_scores = parallel_scores(workers, query_ids, tf_idf, collection_stats, inverted_index, query_text_file, normal_query_file=True)
+        tf_idf_output_text_fname = Path(os.path.realpath(".") +
+                                     all_paths_dict[
+                                         "tf_idf_stem_queries"])
+        write_top_100_scores_to_txt(tf_idf_scores, tf_idf_output_text_fname, "tf_idf", doc_table)
+
+    elif baseline == "jm_qlm":
+        jm_qlm_scores = parallel_scores(workers, query_ids, jm_likelihood_scores, collection_stats, inverted_index, query_text_file, normal_query_file=True)
+        jm_qlm_score_output_text_file = Path(os.path.realpath(".") +
+                                             all_paths_dict["jm_qlm_stem_queries"])
+
+        write_top_100_scores_to_txt(jm_qlm_scores, jm_qlm_score_output_text_file,"jm_qlm", doc_table)
+
+    elif baseline in ("bm25_batch", "tf_idf_batch", "jm_qlm_batch"):
+        # Same models, all the queries are scored at once with sparse matrix products
+        method = baseline[:-len("_batch")]
+        output_keys = {"bm25": "bm25_stem_queries",
+                       "tf_idf": "tf_idf_stem_queries",
+                       "jm_qlm": "jm_qlm_stem_queries"}
+        batch_method_scores = parallel_scores(workers, query_ids, batch_scores, method, collection_stats, inverted_index, query_text_file, relevance_text_file, normal_query_file=True, doc_table=doc_table)
+
+        output_text_fname = Path(os.path.realpath(".") + all_paths_dict[output_keys[method]])
+        write_top_100_scores_to_txt(batch_method_scores, output_text_fname, method, doc_table)
@@ -0,0 +1,490 @@
+"""
+Python file which splits the vocabulary of the inverted index across worker
+processes( term partitioning) and compares this layout with the document
+partitioned shards of sharded_index.py
+
+Build -> every term of the inverted index( create_index.py) is owned by one
+partition, chosen with a hash of the term. A partition holds the complete
+postings of its terms
+    partition_0.bin, partition_0_doc_table.json, partition_0_stats.json
+    partition_1.bin, ...
+    partitions.json -> {"num_partitions" : n, "partitions" : [{"name" :
+                        "partition_0", "num_terms" : 2510, "num_postings" :
+                        45033}, ...]}
+Every partition has the doc table and the doc lengths of the whole collection
+and the df / cf of its own terms, since it holds all their postings these are
+the global values
+
+Query -> a TermPartitionCoordinator starts one worker process per partition.
+The terms of the queries are sent to their owner, which returns the partial
+score vector of every term( the doc ids of its postings and the contribution
+of the term to the score of these docs). The coordinator accumulates the
+vectors in the order of the query terms, with the same expressions as
+baseline_runs.new_bm25_scores and baseline_runs.jm_likelihood_scores, so the
+scores and the ranking are the same as task_1_main.py
+
+Run this file to time both layouts on the same queries, the load of every
+worker( postings scored and busy time) and the load imbalance( largest load
+over the average load) are printed
+>>> python term_partitioned_index.py -j all_paths.json -b True -n 4 -m bm25
+
+Note: Only BM25( without relevance information) and JM-QLM are supported
+"""
+
+import argparse
+import json
+import math
+import os
+import errno
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from baseline_runs import parse_normal_query_text_file, select_queries, sort_dict_according_to_scores, rank_with_background_score, DEFAULT_TOP_K
+from bm25_engine import BM25Engine, postings_arrays
+from binary_index import BinaryIndexWriter, load_inverted_index, binary_index_fname
+from collection_stats import CollectionStats, write_collection_stats, load_collection_stats, collection_stats_fname
+from doc_table import write_doc_table, load_doc_table, doc_table_fname
+from parallel_queries import get_query_ids
+from parse_queries import parse_query_text_file
+from postings_cursor import postings_lists
+from sharded_index import ShardCoordinator, build_shards
+
+
+PARTITIONS_MANIFEST_FNAME = "partitions.json"
+
+# Default number of partitions
+DEFAULT_NUM_PARTITIONS = 4
+
+# The models a partition can score
+PARTITION_METHODS = ("bm25", "jm_qlm")
+
+
+def partition_fname(partition_dir, name):
+    """
+    Helper function which returns the path of the index of a partition
+    Note: Only the binary index( partition_0.bin) is written, the doc table
+    and the statistics are named after this path like for the other indexes
+    :param partition_dir: the directory of the partitions
+    :param name: the name of the partition( Example: partition_0)
+    :return: the path partition_dir/partition_0.json
+    """
+    return Path(partition_dir) / (name + ".json")
+
+
+def term_owner(term, num_partitions):
+    """
+    Function which returns the partition owning a term
+    Note: crc32 is used instead of hash(), which is not the same in every
+    process
+    :param term: the term
+    :param num_partitions: the number of partitions
+    :return: the number of the partition
+    """
+    return zlib.crc32(term.encode("utf-8")) % num_partitions
+
+
+def build_term_partitions(inverted_index_json_fname, partition_dir, num_partitions=DEFAULT_NUM_PARTITIONS):
+    """
+    Function which splits an inverted index into term partitions
+    :param inverted_index_json_fname: the path to the inverted index written
+    by create_index.py( the binary index is used if present)
+    :param partition_dir: the directory where the partitions are written
+    :param num_partitions: the number of partitions
+    :return: the partition manifest( the content of partitions.json)
+    """
+
+    if not os.path.exists(partition_dir):
+        try:
+            os.makedirs(partition_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    doc_table = load_doc_table(doc_table_fname(inverted_index_json_fname))
+    collection_stats = load_collection_stats(collection_stats_fname(inverted_index_json_fname))
+    indexed_data = load_inverted_index(inverted_index_json_fname, doc_table)
+
+    names = ["partition_" + str(i) for i in range(num_partitions)]
+    fnames = [partition_fname(partition_dir, name) for name in names]
+    writers = [BinaryIndexWriter(binary_index_fname(fname), doc_table.doc_names, collection_stats.doc_lengths)
+               for fname in fnames]
+    partition_df = [{} for _ in range(num_partitions)]
+    partition_cf = [{} for _ in range(num_partitions)]
+    num_postings = [0] * num_partitions
+
+    try:
+        # The terms are added in the order of the binary index, every
+        # partition gets a sorted subsequence of the terms
+        for term in sorted(collection_stats.df, key=lambda t: t.encode("utf-8")):
+            owner = term_owner(term, num_partitions)
+            doc_ids, freqs = postings_lists(indexed_data, term)
+            writers[owner].add_term(term, doc_ids, freqs)
+            partition_df[owner][term] = collection_stats.document_frequency(term)
+            partition_cf[owner][term] = collection_stats.collection_frequency(term)
+            num_postings[owner] += len(doc_ids)
+    except BaseException:
+        for writer in writers:
+            writer.discard()
+        raise
+
+    manifest = {"num_partitions": num_partitions, "partitions": []}
+    for i, (name, fname, writer) in enumerate(zip(names, fnames, writers)):
+        writer.close()
+        write_doc_table(doc_table, doc_table_fname(fname))
+        write_collection_stats(CollectionStats(collection_stats.doc_lengths, partition_df[i], partition_cf[i],
+                                               total_terms=collection_stats.total_terms,
+                                               avg_doc_length=collection_stats.avg_doc_length),
+                               collection_stats_fname(fname))
+        manifest["partitions"].append({"name": name, "num_terms": len(partition_df[i]),
+                                       "num_postings": num_postings[i]})
+
+    with open(Path(partition_dir) / PARTITIONS_MANIFEST_FNAME, "w+") as o_fd:
+        json.dump(manifest, o_fd, indent=4)
+
+    return manifest
+
+
+# The partition opened by a partition worker process( see open_partition)
+_partition = None
+
+
+def open_partition(fname):
+    """
+    Function run once in a partition worker process, opens the partition
+    :param fname: the path to the index of the partition( see partition_fname)
+    """
+    global _partition
+
+    doc_table = load_doc_table(doc_table_fname(fname))
+    _partition = (load_collection_stats(collection_stats_fname(fname)), load_inverted_index(fname, doc_table))
+
+
+def partial_score_vectors(method, requests, k1=1.2, b=0.75, k2=100, lam=0.35):
+    """
+    Function run by a partition worker process, computes the partial score
+    vectors of its terms
+    :param method: "bm25" or "jm_qlm"
+    :param requests: for bm25 a list of (term, q_fi) tuples where q_fi is the
+    frequency of the term in the query, for jm_qlm a list of terms
+    :param k1: BM25 parameter
+    :param b: BM25 parameter
+    :param k2: BM25 parameter
+    :param lam: JM-QLM smoothing parameter
+    :return: a tuple of a dictionary {request : (doc_ids, contributions,
+    background)}, of the number of postings scored and of the time spent( in
+    seconds). background is the contribution of the term to the docs not in
+    its postings( jm_qlm only, None if it does not contribute)
+    """
+    start = time.perf_counter()
+    collection_stats, indexed_data = _partition
+
+    # The BM25 contributions are computed by the term at a time engine, they
+    # are the same as the ones of new_bm25_scores( without relevance
+    # information)
+    engine = BM25Engine(collection_stats, k1, b, k2) if method == "bm25" else None
+    C = collection_stats.total_terms
+
+    vectors = {}
+    num_postings = 0
+    for request in requests:
+        if method == "bm25":
+            term, q_fi = request
+        else:
+            term = request
+        doc_ids, freqs = postings_arrays(indexed_data, term)
+        num_postings += len(doc_ids)
+
+        background = None
+        if method == "bm25":
+            contributions = engine.term_scores(doc_ids, freqs, q_fi).tolist()
+        else:
+            # Same expressions as baseline_runs.jm_likelihood_scores
+            contributions = []
+            second_term = (lam * collection_stats.collection_frequency(term)) / C
+            for doc, f_qi_D in zip(doc_ids.tolist(), freqs.tolist()):
+                first_term = ((1 - lam) * f_qi_D / collection_stats.doc_length(doc))
+                contributions.append(math.log(first_term + second_term))
+            if second_term != 0:
+                background = math.log(second_term)
+
+        vectors[request] = (doc_ids.tolist(), contributions, background)
+
+    return vectors, num_postings, time.perf_counter() - start
+
+
+def read_partitions_manifest(partition_dir):
+    """
+    Function which reads the manifest of the partitions
+    :param partition_dir: the directory of the partitions
+    :return: a dictionary of the form {"num_partitions" : n, "partitions" : [...]}
+    """
+    with open(Path(partition_dir) / PARTITIONS_MANIFEST_FNAME) as fd:
+        return json.load(fd)
+
+
+class TermPartitionCoordinator:
+    """
+    Sends the query terms to the worker process owning them and accumulates
+    the partial score vectors
+    """
+
+    def __init__(self, partition_dir):
+        """
+        :param partition_dir: the directory of the partitions( see
+        build_term_partitions)
+        """
+        self.partition_dir = Path(partition_dir)
+        self.partitions = read_partitions_manifest(partition_dir)["partitions"]
+
+        fnames = [partition_fname(partition_dir, partition["name"]) for partition in self.partitions]
+        self.doc_table = load_doc_table(doc_table_fname(fnames[0]))
+
+        # The postings scored and the time spent by every partition on the
+        # last search( see partial_score_vectors)
+        self.partition_postings = [0] * len(self.partitions)
+        self.partition_seconds = [0.0] * len(self.partitions)
+
+        # A single worker per executor, so that every partition stays open in
+        # the same process for all the queries
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=open_partition, initargs=(fname,))
+                          for fname in fnames]
+
+    def search(self, method, query_text_file_name, query_ids=None, top_k=DEFAULT_TOP_K, normal_query_file=False,
+               dedupe=True, k1=1.2, b=0.75, k2=100, lam=0.35):
+        """
+        Function which scores the queries with the partial score vectors of
+        the partitions
+        :param method: "bm25" or "jm_qlm"
+        :param query_text_file_name: The path to the file containing all the queries
+        :param query_ids: the ids of the queries to score, all of them by default
+        :param top_k: Number of top scoring documents to keep for every query
+        :param normal_query_file: If True, the query file has one query per line
+        :param dedupe: If True, every distinct request of all the queries is
+        scored once, else every query term of every query is scored( the same
+        work as the shards)
+        :param k1: BM25 parameter
+        :param b: BM25 parameter
+        :param k2: BM25 parameter
+        :param lam: JM-QLM smoothing parameter
+        :return: the same dictionary as the scorers
+        {query_id : [(doc_1, doc_1_score), (doc_2, doc_2_score)....]
+        """
+        if method not in PARTITION_METHODS:
+            raise ValueError("The term partitioned index can not score " + str(method) +
+                             ", use one of " + ", ".join(PARTITION_METHODS))
+
+        if not normal_query_file:
+            query_dict = parse_query_text_file(query_text_file_name)
+        else:
+            query_dict = parse_normal_query_text_file(query_text_file_name)
+        if query_ids is None:
+            query_ids = get_query_ids(query_text_file_name, normal_query_file)
+        query_dict = select_queries(query_dict, query_ids)
+
+        # Every request is sent to the owner of its term, once if dedupe is
+        # True else once for every occurrence in every query
+        num_partitions = len(self.partitions)
+        requests = [[] for _ in range(num_partitions)]
+        for q in query_dict:
+            query_terms = query_dict[q].split()
+            for term in query_terms:
+                request = (term, query_terms.count(term)) if method == "bm25" else term
+                requests[term_owner(term, num_partitions)].append(request)
+        if dedupe:
+            requests = [list(dict.fromkeys(partition_requests)) for partition_requests in requests]
+
+        # Scatter
+        futures = [executor.submit(partial_score_vectors, method, partition_requests, k1, b, k2, lam)
+                   for executor, partition_requests in zip(self.executors, requests)]
+
+        # Gather
+        vectors = {}
+        for i, future in enumerate(futures):
+            partition_vectors, self.partition_postings[i], self.partition_seconds[i] = future.result()
+            vectors.update(partition_vectors)
+
+        # Accumulate the vectors in the order of the query terms
+        if method == "bm25":
+            scores_dict = {}
+            for i in range(1, 65):
+                scores_dict[i] = {}
+
+            for q in query_dict:
+                query_terms = query_dict[q].split()
+                for term in query_terms:
+                    doc_ids, contributions, _ = vectors[(term, query_terms.count(term))]
+                    for doc, temp_score in zip(doc_ids, contributions):
+                        if doc in scores_dict[q]:
+                            scores_dict[q][doc] += temp_score
+                        else:
+                            scores_dict[q][doc] = temp_score
+
+            sort_dict_according_to_scores(scores_dict, top_k)
+            return scores_dict
+
+        scores_dict = {}
+        for i in range(1, 65):
+            scores_dict[i] = []
+
+        for q in query_dict:
+            query_terms = query_dict[q].split()
+            term_vectors = [vectors[term] for term in query_terms]
+
+            background_score = 0
+            for _, _, background in term_vectors:
+                if background is not None:
+                    background_score += background
+
+            term_scores = [dict(zip(doc_ids, contributions)) for doc_ids, contributions, _ in term_vectors]
+            matched_docs = set()
+            for doc_ids, _, _ in term_vectors:
+                matched_docs.update(doc_ids)
+
+            doc_scores = {}
+            for doc in sorted(matched_docs):
+                score = 0
+                for doc_term_scores, (_, _, background) in zip(term_scores, term_vectors):
+                    if doc in doc_term_scores:
+                        score += doc_term_scores[doc]
+                    elif background is not None:
+                        score += background
+                doc_scores[doc] = score
+
+            scores_dict[q] = rank_with_background_score(doc_scores, background_score,
+                                                        range(len(self.doc_table)), top_k)
+
+        return scores_dict
+
+    def close(self):
+        """
+        Function which stops the partition worker processes
+        """
+        for executor in self.executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def load_report(name, loads):
+    """
+    Helper function which formats the load of the workers of a layout
+    :param name: the name of the load( Example: postings)
+    :param loads: the load of every worker
+    :return: a string with the loads and the load imbalance( largest load
+    over the average load, 1.0 is a perfect balance)
+    """
+    average = sum(loads) / len(loads)
+    imbalance = max(loads) / average if average else 1.0
+    return name + " " + str([round(load, 3) for load in loads]) + ", imbalance " + str(round(imbalance, 2))
+
+
+def benchmark_layouts(shard_dir, partition_dir, method, query_text_file_name, relevant_docs_fname, top_k=DEFAULT_TOP_K):
+    """
+    Function which runs the same queries on the document partitioned shards
+    and on the term partitions and prints the time and the load of every worker
+    :param shard_dir: the directory of the shards( see sharded_index.py)
+    :param partition_dir: the directory of the term partitions
+    :param method: "bm25" or "jm_qlm"
+    :param query_text_file_name: The path to the file containing all the queries
+    :param relevant_docs_fname: The text file containing the relevance file
+    i.e cacm.rel.txt, needed by bm25 on the shards
+    :param top_k: Number of top scoring documents to keep for every query
+    """
+    if method not in PARTITION_METHODS:
+        raise ValueError("Can not benchmark " + str(method) + ", use one of " + ", ".join(PARTITION_METHODS))
+
+    query_dict = parse_query_text_file(query_text_file_name)
+    print("The machine has", os.cpu_count(), "cores,", len(query_dict), "queries")
+
+    with ShardCoordinator(shard_dir) as shard_coordinator:
+        # Note: The first search also starts the worker processes
+        start = time.perf_counter()
+        shard_scores = shard_coordinator.search(method, query_text_file_name, relevant_docs_fname, top_k=top_k)
+        shard_time = time.perf_counter() - start
+
+        # A shard scores the postings of every query term in its documents
+        shard_postings = [sum(stats.document_frequency(term) for q in query_dict for term in query_dict[q].split())
+                          for stats in shard_coordinator.shard_stats]
+
+        print("document partitioned,", len(shard_coordinator.shards), "shards :", round(shard_time, 3), "s")
+        print("    ", load_report("postings", shard_postings))
+        print("    ", load_report("busy seconds", shard_coordinator.shard_seconds))
+
+    # The shards score every query on its own, the term partitions are timed
+    # the same way( every query term of every query) and then with the
+    # requests shared by the queries scored once
+    with TermPartitionCoordinator(partition_dir) as partition_coordinator:
+        same_ranking = True
+        for dedupe, label in ((False, "per query"), (True, "shared requests")):
+            start = time.perf_counter()
+            partition_scores = partition_coordinator.search(method, query_text_file_name, top_k=top_k, dedupe=dedupe)
+            partition_time = time.perf_counter() - start
+            same_ranking = same_ranking and shard_scores == partition_scores
+
+            print("term partitioned,", len(partition_coordinator.partitions), "partitions,", label, ":",
+                  round(partition_time, 3), "s")
+            print("    ", load_report("postings", partition_coordinator.partition_postings))
+            print("    ", load_report("busy seconds", partition_coordinator.partition_seconds))
+
+    print("same ranking :", same_ranking)
+
+
+def parse_user_arguments():
+    """
+    Helper function to parse user arguments
+    :return: a dictionary containing user arguments as key value pairs
+    """
+
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument("-j", "--all_paths_json_fname",
+                    help="Enter the path to the json file "
+                         "which stores all the relative paths", required=True)
+
+    ap.add_argument("-b", "--build",
+                    help="Enter True to build the term partitions from the "
+                         "inverted index and the shards from the cleaned corpus",
+                    required=False)
+
+    ap.add_argument("-n", "--num_workers",
+                    help="Enter the number of term partitions and of shards"
+                         "( only when they are built)",
+                    type=int, default=DEFAULT_NUM_PARTITIONS, required=False)
+
+    ap.add_argument("-m", "--method",
+                    help="Enter the model to benchmark, bm25 or jm_qlm",
+                    default="bm25", required=False)
+
+    return vars(ap.parse_args())
+
+
+if __name__ == "__main__":
+    # Accept the user arguments
+    user_args = parse_user_arguments()
+
+    with open(user_args["all_paths_json_fname"]) as all_paths_fd:
+        all_paths_dict = json.load(all_paths_fd)
+
+    sharded_index_dir = Path(os.path.realpath(".") + all_paths_dict["sharded_index_dir"])
+    term_partitioned_index_dir = Path(os.path.realpath(".") + all_paths_dict["term_partitioned_index_dir"])
+
+    if user_args["build"] == "True":
+        inverted_index_json_fname = Path(os.path.realpath(".") + all_paths_dict["indexer_output_json_file"])
+        partitions_manifest = build_term_partitions(inverted_index_json_fname, term_partitioned_index_dir,
+                                                    user_args["num_workers"])
+        for partition in partitions_manifest["partitions"]:
+            print(partition["name"], ":", partition["num_terms"], "terms,", partition["num_postings"], "postings")
+
+        collection_json_fname = Path(os.path.realpath(".") + all_paths_dict["parsed_tokenized_output_json_file"])
+        build_shards(collection_json_fname, sharded_index_dir, user_args["num_workers"])
+
+    query_text_file = Path(os.path.realpath(".") + all_paths_dict["test_data"]["query_text_file"])
+    relevance_text_file = Path(os.path.realpath(".") + all_paths_dict["test_data"]["relevance_text_file"])
+
+    benchmark_layouts(sharded_index_dir, term_partitioned_index_dir, user_args["method"], query_text_file,
+                      relevance_text_file)
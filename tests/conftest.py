@@ -0,0 +1,9 @@
+"""
+The scripts of the project are flat modules in the parent folder, the tests
+import them from there
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,161 @@
+"""
+The positional operators( positional_operators.py) against brute force
+references on small position lists
+"""
+
+import itertools
+import random
+import pytest
+import positional_index
+from positional_index import PositionalIndex, write_positional_index, positions_fname
+from positional_operators import ordered_window_count, unordered_window_count, ordered_intervals, \
+    unordered_intervals, phrase_positions, phrase_matches, ordered_window_matches, unordered_window_matches
+
+
+def positional_doc(doc, term_positions):
+    """
+    Helper function which builds a positional index of one doc
+    {term : {doc : [freq, [positions]]}}
+    """
+    return {term: {doc: [len(positions), positions]} for term, positions in term_positions.items()}
+
+
+def assignments(term_positions, terms):
+    """
+    Helper function which yields every way of picking one position for every
+    query term, a position is never picked twice
+    """
+    for picked in itertools.product(*[term_positions[term] for term in terms]):
+        if len(set(picked)) == len(picked):
+            yield picked
+
+
+def minimal_spans(spans):
+    """
+    Helper function which keeps the spans with no other span inside them
+    """
+    spans = set(spans)
+    return {(start, end) for start, end in spans
+            if not any(start <= other_start and other_end <= end and (other_start, other_end) != (start, end)
+                       for other_start, other_end in spans)}
+
+
+def brute_force_ordered_count(term_positions, terms, window):
+    ordered = [picked for picked in assignments(term_positions, terms)
+               if all(picked[t] < picked[t + 1] for t in range(len(picked) - 1))]
+    fitting = {(picked[0], picked[-1]) for picked in ordered
+               if all(picked[t + 1] - picked[t] <= window for t in range(len(picked) - 1))}
+    return sum(1 for span in minimal_spans((picked[0], picked[-1]) for picked in ordered) if span in fitting)
+
+
+def brute_force_unordered_count(term_positions, terms, window):
+    spans = minimal_spans((min(picked), max(picked)) for picked in assignments(term_positions, terms))
+    return sum(1 for start, end in spans if end - start + 1 <= window)
+
+
+def random_doc(rng, terms, doc_length):
+    """
+    Helper function which places the distinct terms at random distinct
+    positions of a doc
+    """
+    distinct_terms = sorted(set(terms))
+    words = [rng.choice(distinct_terms + ["other"]) for _ in range(doc_length)]
+    for term, position in zip(distinct_terms, rng.sample(range(doc_length), len(distinct_terms))):
+        words[position] = term
+    return {term: [i for i, word in enumerate(words) if word == term] for term in distinct_terms}
+
+
+def test_ordered_window_looks_at_every_chain_of_the_interval():
+    # The tightest chain 0, 3, 4 does not fit #od2, the chain 0, 2, 4 does
+    index = positional_doc(0, {"a": [0], "b": [2, 3], "c": [4]})
+    assert ordered_window_count(index, ["a", "b", "c"], 2, 0) == 1
+
+    # Picking the earliest position of b( 1) leaves c out of reach, b at 2
+    # fits
+    index = positional_doc(0, {"a": [0], "b": [1, 2], "c": [4]})
+    assert ordered_window_count(index, ["a", "b", "c"], 2, 0) == 1
+    assert ordered_window_count(index, ["a", "b", "c"], 1, 0) == 0
+
+
+def test_intervals_are_minimal_and_in_order():
+    assert ordered_intervals([[0, 5], [2, 6], [4, 7]]) == [[0, 2, 4], [5, 6, 7]]
+    assert unordered_intervals([[0, 5], [2, 6]]) == [(0, 2), (2, 5), (5, 6)]
+
+
+@pytest.mark.parametrize("terms", [["a", "b"], ["a", "b", "c"], ["a", "b", "a"], ["c", "a", "b", "c"]])
+@pytest.mark.parametrize("window", [1, 2, 3, 5, 8])
+def test_window_counts_match_brute_force(terms, window):
+    rng = random.Random(window * 31 + len(terms))
+    for _ in range(60):
+        term_positions = random_doc(rng, terms, rng.randrange(4, 12))
+        index = positional_doc(7, term_positions)
+
+        assert ordered_window_count(index, terms, window, 7) == \
+            brute_force_ordered_count(term_positions, terms, window), term_positions
+        assert unordered_window_count(index, terms, window, 7) == \
+            brute_force_unordered_count(term_positions, terms, window), term_positions
+
+
+def test_phrase_positions():
+    index = positional_doc(0, {"a": [0, 4, 9], "b": [1, 5, 7], "c": [2, 8]})
+    assert phrase_positions(index, ["a", "b"], 0) == [0, 4]
+    assert phrase_positions(index, ["a", "b", "c"], 0) == [0]
+    assert phrase_positions(index, ["b", "a"], 0) == []
+
+
+@pytest.mark.parametrize("terms", [["a"], ["a", "b"], ["a", "b", "a"], ["b", "b"], ["c", "a", "b"]])
+def test_phrase_positions_match_brute_force(terms):
+    rng = random.Random(len(terms) * 13 + terms.count("b"))
+    for _ in range(100):
+        term_positions = random_doc(rng, terms, rng.randrange(4, 15))
+        words = {position: term for term, positions in term_positions.items() for position in positions}
+        expected = [start for start in range(max(words) + 1)
+                    if all(words.get(start + offset) == term for offset, term in enumerate(terms))]
+
+        assert phrase_positions(positional_doc(3, term_positions), terms, 3) == expected, term_positions
+
+
+def test_operators_on_a_positional_index(tmp_path):
+    docs = {"CACM-0001": "the type of the type",
+            "CACM-0002": "is the type",
+            "CACM-0003": "type the is"}
+    inv_index = {}
+    for doc, text in docs.items():
+        for position, word in enumerate(text.split()):
+            postings = inv_index.setdefault(word, {})
+            if doc in postings:
+                postings[doc][0] += 1
+                postings[doc][1].append(position)
+            else:
+                postings[doc] = [1, [position]]
+
+    json_fname = tmp_path / "positional_index.json"
+    doc_names = list(docs)
+    write_positional_index(inv_index, json_fname, doc_names, [len(docs[doc].split()) for doc in doc_names])
+
+    with PositionalIndex(json_fname) as positional_index:
+        assert phrase_matches(positional_index, ["the", "type"]) == [(0, 2), (1, 1)]
+        assert phrase_matches(positional_index, ["is", "the", "type"]) == [(1, 1)]
+        assert ordered_window_matches(positional_index, ["the", "type"], 2) == [(0, 2), (1, 1)]
+        assert ordered_window_matches(positional_index, ["is", "type"], 2) == [(1, 1)]
+        assert unordered_window_matches(positional_index, ["is", "type"], 3) == [(1, 1), (2, 1)]
+        assert phrase_matches(positional_index, ["missing", "type"]) == []
+
+
+def test_positions_too_large_for_the_offsets(tmp_path, monkeypatch):
+    inv_index = {"type": {"CACM-0001": [3, [0, 200, 70000]]}, "the": {"CACM-0002": [1, [5]]}}
+    json_fname = tmp_path / "positional_index.json"
+    write_positional_index(inv_index, json_fname, ["CACM-0001", "CACM-0002"])
+    assert positions_fname(json_fname).exists()
+
+    # 1 + 2 + 3 bytes of positions for "type", 1 byte for "the"
+    monkeypatch.setattr(positional_index, "MAX_POSITIONS_BYTES", 6)
+    with pytest.raises(ValueError, match="can only address 6"):
+        write_positional_index(inv_index, json_fname, ["CACM-0001", "CACM-0002"])
+    assert not positions_fname(json_fname).exists()
+
+    monkeypatch.setattr(positional_index, "MAX_POSITIONS_BYTES", 7)
+    write_positional_index(inv_index, json_fname, ["CACM-0001", "CACM-0002"])
+    with PositionalIndex(json_fname) as index:
+        assert index["type"][0] == [3, [0, 200, 70000]]
+        assert index["the"][1] == [1, [5]]
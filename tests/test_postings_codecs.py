@@ -0,0 +1,89 @@
+"""
+Round trips of the postings codecs( postings_codecs.py) and of the compressed
+index( compressed_index.py)
+"""
+
+import numpy as np
+import pytest
+import postings_codecs
+from postings_codecs import CODECS, CODEC_NAMES, gaps_from_doc_ids, doc_ids_from_gaps
+from compressed_index import CompressedInvertedIndex, write_compressed_index
+
+
+# Lengths around the PForDelta block size and the vectorized sizes
+LENGTHS = [0, 1, 2, 3, 7, 63, 64, 95, 96, 127, 128, 129, 255, 256, 257, 1000]
+
+# Largest value of the generated values( the codecs take 32 bit values)
+HIGHS = [1, 2, 10, 1000, 2 ** 32]
+
+
+@pytest.mark.parametrize("codec", CODEC_NAMES)
+@pytest.mark.parametrize("count", LENGTHS)
+@pytest.mark.parametrize("high", HIGHS)
+def test_codec_round_trip(codec, count, high):
+    encode, decode = CODECS[codec]
+    values = np.random.default_rng(count * 7 + high % 97).integers(0, high, count)
+
+    encoded = encode(values)
+
+    # The decoders get the bytes of the next postings after the codes
+    decoded, used = decode(encoded + b"\xff\x00\x81", count)
+    assert decoded.dtype == np.uint32
+    assert decoded.tolist() == values.tolist()
+    assert used == len(encoded)
+
+
+# The length under which every codec decodes one value at a time
+MIN_VECTORIZED = {"vbyte": "MIN_VECTORIZED_VBYTE_VALUES",
+                  "gamma": "MIN_VECTORIZED_CODES",
+                  "delta": "MIN_VECTORIZED_CODES",
+                  "pfor": "MIN_VECTORIZED_PFOR_VALUES"}
+
+
+@pytest.mark.parametrize("codec", CODEC_NAMES)
+@pytest.mark.parametrize("min_vectorized", [0, 10 ** 9])
+def test_codecs_decode_the_same_both_ways(codec, min_vectorized, monkeypatch):
+    # The short lists are decoded one value at a time, the long ones with numpy
+    monkeypatch.setattr(postings_codecs, MIN_VECTORIZED[codec], min_vectorized)
+    encode, decode = CODECS[codec]
+    rng = np.random.default_rng(3)
+    values = rng.geometric(0.05, 300) - 1
+    # Some large values, the PForDelta exceptions
+    values[rng.integers(0, 300, 20)] = rng.integers(1000, 2 ** 32, 20)
+
+    encoded = encode(values) + encode([5, 0, 2 ** 32 - 1])
+    decoded, used = decode(encoded, len(values))
+    assert decoded.tolist() == values.tolist()
+
+    decoded, _ = decode(encoded[used:], 3)
+    assert decoded.tolist() == [5, 0, 2 ** 32 - 1]
+
+
+def test_gaps_round_trip():
+    doc_ids = [0, 3, 4, 90, 3203]
+    assert gaps_from_doc_ids(doc_ids).tolist() == [0, 3, 1, 86, 3113]
+    assert doc_ids_from_gaps(gaps_from_doc_ids(doc_ids)).tolist() == doc_ids
+
+
+@pytest.mark.parametrize("codec", CODEC_NAMES)
+def test_compressed_index_round_trip(codec, tmp_path):
+    inv_index = {"computer": {0: 2, 2: 1, 3: 7},
+                 "algebra": {1: 1},
+                 "égalité": {3: 300}}
+    doc_names = ["CACM-0001", "CACM-0002", "CACM-0003", "CACM-0004"]
+    fname = tmp_path / ("index_" + codec + ".cidx")
+    write_compressed_index(inv_index, doc_names, fname, codec)
+
+    with CompressedInvertedIndex(fname, int_doc_ids=True) as index:
+        assert sorted(index) == sorted(inv_index)
+        for term, postings in inv_index.items():
+            doc_ids, freqs = index.postings(term)
+            assert list(doc_ids) == sorted(postings)
+            assert list(freqs) == [postings[doc] for doc in sorted(postings)]
+            assert index[term] == postings
+            assert index.document_frequency(term) == len(postings)
+        assert "missing" not in index
+        assert list(index.postings("missing")[0]) == []
+
+    with CompressedInvertedIndex(fname) as index:
+        assert index["algebra"] == {"CACM-0002": 1}
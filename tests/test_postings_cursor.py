@@ -0,0 +1,40 @@
+"""
+The document at a time union of the postings cursors( postings_cursor.py)
+against a set union
+"""
+
+import random
+import pytest
+from postings_cursor import END, PostingsCursor, BlockMaxCursor, union_docs
+
+
+def random_postings(rng, num_docs, num_postings):
+    doc_ids = sorted(rng.sample(range(num_docs), num_postings))
+    return doc_ids, [rng.randint(1, 9) for _ in doc_ids]
+
+
+@pytest.mark.parametrize("sizes", [[], [0], [0, 0], [1], [50], [3, 40], [10, 10, 10], [1, 200, 7, 0, 60]])
+@pytest.mark.parametrize("cursor_class", ["postings", "block_max"])
+def test_union_docs_matches_the_set_union(sizes, cursor_class):
+    rng = random.Random(len(sizes) * 1000 + sum(sizes))
+    for _ in range(10):
+        postings = [random_postings(rng, 300, size) for size in sizes]
+        if cursor_class == "postings":
+            cursors = [PostingsCursor("t" + str(i), *p) for i, p in enumerate(postings)]
+        else:
+            inv_index = {"t" + str(i): dict(zip(*p)) for i, p in enumerate(postings)}
+            cursors = [BlockMaxCursor.for_term(inv_index, "t" + str(i), [1] * 300) for i in range(len(postings))]
+
+        expected = sorted(set().union(*(doc_ids for doc_ids, _ in postings)))
+        visited = []
+        for doc, matched in union_docs(cursors):
+            visited.append(doc)
+
+            # Every cursor on the doc is matched, in the order of the cursors
+            assert matched == [cursor for cursor in cursors if cursor.doc == doc]
+            for cursor in matched:
+                doc_ids, freqs = postings[cursors.index(cursor)]
+                assert cursor.freq() == freqs[doc_ids.index(doc)]
+
+        assert visited == expected
+        assert all(cursor.doc == END for cursor in cursors)
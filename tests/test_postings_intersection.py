@@ -0,0 +1,78 @@
+"""
+The galloping and skip pointer intersections( postings_intersection.py)
+against the linear merge
+"""
+
+import bisect
+import random
+import pytest
+from binary_index import BinaryInvertedIndex, write_binary_index
+from postings_intersection import gallop, merge_intersect, gallop_intersect, skip_intersect, skip_pointers, \
+    intersect_postings
+
+
+def sorted_doc_ids(rng, num_docs, num_postings):
+    return sorted(rng.sample(range(num_docs), num_postings))
+
+
+def test_gallop_finds_the_first_item_not_below_the_target():
+    rng = random.Random(5)
+    sequence = sorted_doc_ids(rng, 500, 120)
+    for target in range(-1, 502):
+        for lo in (0, 7, 60, 119, 120):
+            expected = max(lo, bisect.bisect_left(sequence, target))
+            assert gallop(sequence, target, lo) == expected
+    assert gallop(sequence, sequence[50], 0, 40) == 40
+    assert gallop([], 3) == 0
+
+
+@pytest.mark.parametrize("num_rare, num_common", [(0, 10), (1, 1), (3, 400), (40, 900), (200, 200), (5, 31),
+                                                  (5, 32), (5, 33)])
+@pytest.mark.parametrize("block_size", [1, 4, 32])
+def test_intersections_match_the_merge(num_rare, num_common, block_size):
+    rng = random.Random(num_rare * 1000 + num_common + block_size)
+    for _ in range(20):
+        rare = sorted_doc_ids(rng, 1000, num_rare)
+        common = sorted_doc_ids(rng, 1000, num_common)
+        expected = merge_intersect(rare, common)
+        assert expected == sorted(set(rare) & set(common))
+
+        assert gallop_intersect(rare, common) == expected
+        block_last_docs = [common[min(start + block_size, len(common)) - 1]
+                           for start in range(0, len(common), block_size)]
+        assert skip_intersect(rare, common, block_size, block_last_docs) == expected
+
+
+def test_skip_pointers_of_a_dictionary_index():
+    doc_ids = list(range(0, 200, 3))
+    block_size, block_last_docs = skip_pointers({"term": dict.fromkeys(doc_ids, 1)}, "term", doc_ids)
+    assert block_last_docs == [doc_ids[min(start + block_size, len(doc_ids)) - 1]
+                               for start in range(0, len(doc_ids), block_size)]
+
+
+def test_intersect_postings_of_many_terms():
+    rng = random.Random(11)
+    index = {term: dict.fromkeys(sorted_doc_ids(rng, 300, num_postings), 1)
+             for term, num_postings in (("rare", 12), ("mid", 90), ("common", 250), ("all", 300))}
+
+    assert intersect_postings(index, ["common", "rare", "mid"]) == \
+        sorted(set(index["rare"]) & set(index["mid"]) & set(index["common"]))
+    assert intersect_postings(index, ["all", "rare", "rare"]) == sorted(index["rare"])
+    assert intersect_postings(index, ["rare", "missing"]) == []
+    assert intersect_postings(index, []) == []
+
+
+def test_intersect_postings_with_the_skip_pointers_of_a_binary_index(tmp_path):
+    rng = random.Random(12)
+    doc_names = ["CACM-" + str(i).zfill(4) for i in range(1, 401)]
+    inv_index = {term: {doc_names[doc_id]: 1 for doc_id in sorted_doc_ids(rng, 400, num_postings)}
+                 for term, num_postings in (("rare", 30), ("mid", 150), ("common", 330))}
+    fname = tmp_path / "index.bin"
+    write_binary_index(inv_index, fname, doc_names, block_size=8)
+
+    expected = sorted({doc_names.index(doc) for doc in inv_index["rare"]} &
+                      {doc_names.index(doc) for doc in inv_index["mid"]} &
+                      {doc_names.index(doc) for doc in inv_index["common"]})
+    with BinaryInvertedIndex(fname, int_doc_ids=True) as index:
+        assert skip_pointers(index, "common", None)[0] == 8
+        assert intersect_postings(index, ["common", "mid", "rare"]) == expected
@@ -0,0 +1,78 @@
+"""
+The precedence and the errors of the structured query parser( query_parser.py)
+"""
+
+import pytest
+from query_parser import parse_query, tokenize
+
+
+def test_tokenize():
+    assert tokenize('"Parallel algorithms"/2 OR (sorting NEAR/3 networks) NOT survey') == \
+        ['"Parallel algorithms"/2', "OR", "(", "sorting", "NEAR/3", "networks", ")", "NOT", "survey"]
+
+
+@pytest.mark.parametrize("query, tree", [
+    ("Sorting", ("term", "sorting")),
+    ('"parallel algorithms"', ("phrase", ["parallel", "algorithms"], None)),
+    ('"parallel algorithms"/2', ("phrase", ["parallel", "algorithms"], 2)),
+    ('"sorting"', ("term", "sorting")),
+    ("sorting NEAR/3 networks", ("near", ["sorting", "networks"], 3)),
+    ("a NEAR/1 b NEAR/1 c", ("near", ["a", "b", "c"], 1)),
+    # AND is implied between two operands
+    ("a b", ("and", [("term", "a"), ("term", "b")])),
+    ("a AND b c", ("and", [("term", "a"), ("term", "b"), ("term", "c")])),
+    # NOT binds tighter than AND, AND tighter than OR
+    ("NOT a b", ("and", [("not", ("term", "a")), ("term", "b")])),
+    ("a OR b c", ("or", [("term", "a"), ("and", [("term", "b"), ("term", "c")])])),
+    ("a b OR c", ("or", [("and", [("term", "a"), ("term", "b")]), ("term", "c")])),
+    ("a OR b OR c", ("or", [("term", "a"), ("term", "b"), ("term", "c")])),
+    ("NOT a OR b", ("or", [("not", ("term", "a")), ("term", "b")])),
+    ("NOT NOT a", ("not", ("not", ("term", "a")))),
+    # NEAR binds tighter than AND and OR
+    ("x a NEAR/2 b OR c", ("or", [("and", [("term", "x"), ("near", ["a", "b"], 2)]), ("term", "c")])),
+    # Parentheses group
+    ("(a OR b) c", ("and", [("or", [("term", "a"), ("term", "b")]), ("term", "c")])),
+    ("NOT (a OR b)", ("not", ("or", [("term", "a"), ("term", "b")]))),
+    ("((a))", ("term", "a")),
+    ('"parallel algorithms" OR (sorting NEAR/3 networks) NOT survey',
+     ("or", [("phrase", ["parallel", "algorithms"], None),
+             ("and", [("near", ["sorting", "networks"], 3), ("not", ("term", "survey"))])])),
+])
+def test_parse_query(query, tree):
+    assert parse_query(query) == tree
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "   ",
+    '"parallel algorithms',
+    '""',
+    '"  "/2',
+    "a AND",
+    "a OR",
+    "NOT",
+    "OR a",
+    "AND a",
+    "a OR OR b",
+    "(a OR b",
+    "a OR b)",
+    "()",
+    "NEAR/2 a",
+    "a NEAR/2",
+    "a NEAR/2 b NEAR/3 c",
+    '"a b" NEAR/2 c',
+    "(a OR b) NEAR/2 c",
+    "a NEAR/2 NOT b",
+    "a NEAR/x b",
+    "a NEAR/ b",
+    "a NEAR/2 b NEAR/x c",
+])
+def test_parse_query_errors(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_near_needs_a_number():
+    for query in ("a NEAR/x b", "a NEAR/ b"):
+        with pytest.raises(ValueError, match="^Can not parse the query .*: NEAR needs a number, Example: NEAR/3$"):
+            parse_query(query)
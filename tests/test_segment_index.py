@@ -0,0 +1,136 @@
+"""
+The segmented index( segment_index.py) against an index rebuilt from the live
+documents: after adds, deletes, replacements, flushes and merges, the scorers
+must rank the same documents with the same scores
+"""
+
+import random
+import pytest
+from baseline_runs import new_bm25_scores, tf_idf, jm_likelihood_scores
+from binary_index import load_inverted_index
+from collection_stats import load_collection_stats, collection_stats_fname
+from corpus_stream import write_corpus
+from create_index import create_inverted_index
+from doc_table import load_doc_table, doc_table_fname
+from dynamic_pruning import pruned_bm25_scores
+from segment_index import SegmentedIndex, SizeTieredMergePolicy
+
+
+VOCABULARY = ["computer", "system", "algorithm", "parallel", "sorting", "data", "language", "programming",
+              "network", "matrix", "compiler", "memory", "graph", "search", "time", "sharing", "list",
+              "tree", "code", "file"]
+
+QUERIES = ["parallel sorting algorithm", "time sharing system", "matrix", "compiler code memory graph",
+           "search tree list file data", "unknown words only"]
+
+
+def random_document(rng):
+    # Zipf like term frequencies, so the terms have very different dfs
+    num_words = rng.randint(1, 40)
+    return " ".join(VOCABULARY[min(int(rng.paretovariate(1.0)) - 1, len(VOCABULARY) - 1)]
+                    if rng.random() < 0.7 else rng.choice(VOCABULARY) for _ in range(num_words))
+
+
+def run_scorers(tmp_path, collection_stats, indexed_data, doc_table):
+    """
+    Helper function which runs the scorers and returns their rankings keyed
+    on the doc names
+    """
+    query_fname = tmp_path / "queries.txt"
+    query_fname.write_text("\n".join(QUERIES) + "\n")
+    rel_fname = tmp_path / "rel.txt"
+    rel_fname.write_text("")
+
+    runs = {
+        "bm25": new_bm25_scores(collection_stats, indexed_data, query_fname, rel_fname,
+                                normal_query_file=True, doc_table=doc_table),
+        "bm25_bmw": pruned_bm25_scores(collection_stats, indexed_data, query_fname, rel_fname,
+                                       normal_query_file=True, doc_table=doc_table, strategy="bmw"),
+        "tf_idf": tf_idf(collection_stats, indexed_data, query_fname, normal_query_file=True),
+        "jm_qlm": jm_likelihood_scores(collection_stats, indexed_data, query_fname, normal_query_file=True),
+    }
+    return {method: {q: [(doc_table.doc_name(doc), score) for doc, score in ranking]
+                     for q, ranking in scores.items()}
+            for method, scores in runs.items()}
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_segmented_index_scores_like_a_rebuilt_index(tmp_path, seed):
+    rng = random.Random(seed)
+    documents = {"CACM-" + str(i).zfill(4): random_document(rng) for i in range(1, 161)}
+
+    index = SegmentedIndex(tmp_path / "segments", max_buffered_docs=7,
+                           merge_policy=SizeTieredMergePolicy(merge_factor=3, min_segment_docs=10),
+                           background_merges=False)
+    names = list(documents)
+    for name in names[:120]:
+        index.add_document(name, documents[name])
+
+    # Deletes spread over the merged segments, the flushed segments and the
+    # delta segment, then replacements and more documents, so the merges
+    # drop tombstones and new segments still have some
+    for name in names[3:120:5] + ["CACM-9999"]:
+        index.delete_document(name)
+    for name in names[10:60:9]:
+        documents[name] = random_document(rng)
+        index.add_document(name, documents[name])
+    for name in names[120:]:
+        index.add_document(name, documents[name])
+    for name in names[121:160:6]:
+        index.delete_document(name)
+    index.commit()
+    index.wait_for_merges()
+
+    view = index.snapshot()
+    live_names = view.doc_names()
+    assert sorted(live_names) == sorted(name for name in index.live_ids)
+    assert any(deleted for _, _, deleted in index.segment_summary())
+    assert len(index.segments) < 160 // 7
+
+    # The merges dropped the tombstones of the documents they left out
+    assert len(index.deleted) < len(index.doc_names) - len(live_names)
+    assert all(any(doc_id in segment.doc_ids for segment in index.segments) for doc_id in index.deleted)
+
+    # The index rebuilt from the live documents, in the order of the view
+    corpus_fname = tmp_path / "corpus.jsonl"
+    write_corpus(((name, documents[name]) for name in live_names), corpus_fname)
+    index_fname = tmp_path / "index" / "inverted_index.json"
+    create_inverted_index(corpus_fname, index_fname)
+    doc_table = load_doc_table(doc_table_fname(index_fname))
+    collection_stats = load_collection_stats(collection_stats_fname(index_fname))
+    rebuilt = load_inverted_index(index_fname, doc_table)
+
+    assert view.collection_stats().to_dict() == collection_stats.to_dict()
+    for term in rebuilt:
+        assert list(view.postings(term)[0]) == list(rebuilt.postings(term)[0])
+        assert list(view.postings(term)[1]) == list(rebuilt.postings(term)[1])
+    assert list(view) == list(rebuilt)
+
+    expected = run_scorers(tmp_path, collection_stats, rebuilt, doc_table)
+    assert run_scorers(tmp_path, view.collection_stats(), view, view.doc_table()) == expected
+
+    # The index opened again from its manifest gets the live documents from
+    # the tombstones
+    reopened = SegmentedIndex(tmp_path / "segments").snapshot()
+    assert reopened.doc_names() == live_names
+    assert run_scorers(tmp_path, reopened.collection_stats(), reopened, reopened.doc_table()) == expected
+
+
+def test_snapshot_does_not_change(tmp_path):
+    index = SegmentedIndex(tmp_path, max_buffered_docs=3, background_merges=False)
+    for i in range(5):
+        index.add_document("CACM-" + str(i), "parallel sorting " * (i + 1))
+    view = index.snapshot()
+    postings = view.postings("sorting")
+
+    index.add_document("CACM-9", "sorting networks")
+    index.delete_document("CACM-1")
+    index.commit()
+
+    assert view.postings("sorting") == postings
+    assert view.num_docs == 5
+    assert index.snapshot().num_docs == 5
+    assert index.snapshot().doc_names() == ["CACM-0", "CACM-2", "CACM-3", "CACM-4", "CACM-9"]
+
+    # An index opened from the committed manifest sees the same live documents
+    assert SegmentedIndex(tmp_path).snapshot().doc_names() == index.snapshot().doc_names()
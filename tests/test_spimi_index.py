@@ -0,0 +1,62 @@
+"""
+The SPIMI index( spimi_index.py) against the in-memory index of
+create_index.py, with budgets small enough for multi-pass merges of the runs
+"""
+
+import json
+import random
+import re
+import pytest
+from collection_stats import load_collection_stats, collection_stats_fname
+from corpus_stream import write_corpus
+from create_index import create_inverted_index
+from binary_index import binary_index_fname
+from doc_table import doc_table_fname
+from spimi_index import create_spimi_index
+
+
+def random_corpus(rng, num_docs):
+    vocabulary = ["w" + str(i) for i in range(300)] + ["café", "naïve", "über"]
+    return [("CACM-" + str(i).zfill(4),
+             " ".join(rng.choice(vocabulary[:rng.randint(5, len(vocabulary))]) for _ in range(rng.randint(0, 60))))
+            for i in range(1, num_docs + 1)]
+
+
+def read_json(fname):
+    with open(fname) as fd:
+        return json.load(fd)
+
+
+@pytest.mark.parametrize("memory_budget_mb, fan_in", [(0.002, 3), (0.002, 2), (0.01, 4), (64, 64)])
+@pytest.mark.parametrize("stop_words", [None, ["w0", "w1", "w2"]])
+def test_spimi_index_matches_create_index(tmp_path, capsys, memory_budget_mb, fan_in, stop_words):
+    corpus_fname = tmp_path / "corpus.jsonl"
+    write_corpus(random_corpus(random.Random(fan_in), 120), corpus_fname)
+
+    expected_fname = tmp_path / "memory" / "inverted_index.json"
+    create_inverted_index(corpus_fname, expected_fname, stop_words)
+    spimi_fname = tmp_path / "spimi" / "inverted_index.json"
+    create_spimi_index(corpus_fname, spimi_fname, stop_words, memory_budget_mb=memory_budget_mb, fan_in=fan_in)
+
+    num_runs = int(re.search(r"documents, (\d+) runs", capsys.readouterr().out).group(1))
+    if memory_budget_mb < 1:
+        # More runs than two merge passes can reduce to fan_in runs
+        assert num_runs > fan_in ** 2
+
+    assert binary_index_fname(spimi_fname).read_bytes() == binary_index_fname(expected_fname).read_bytes()
+    assert read_json(doc_table_fname(spimi_fname)) == read_json(doc_table_fname(expected_fname))
+    assert load_collection_stats(collection_stats_fname(spimi_fname)).to_dict() == \
+        load_collection_stats(collection_stats_fname(expected_fname)).to_dict()
+    assert read_json(spimi_fname) == read_json(expected_fname)
+
+    # Only the index files are left, the runs are removed
+    assert sorted(path.name for path in (tmp_path / "spimi").iterdir()) == \
+        sorted(path.name for path in (tmp_path / "memory").iterdir())
+
+
+def test_spimi_index_of_an_empty_corpus(tmp_path):
+    corpus_fname = tmp_path / "corpus.jsonl"
+    write_corpus([], corpus_fname)
+    with pytest.raises(ValueError, match="has no documents"):
+        create_spimi_index(corpus_fname, tmp_path / "spimi" / "inverted_index.json")
+    assert list((tmp_path / "spimi").iterdir()) == []